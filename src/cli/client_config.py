@@ -13,6 +13,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from src.core.client_config import ClientConfigGenerator
 from src.core.keys import WireGuardKeyManager
+from src.core.ipam import IPAMStore, IPAM_DB_NAME
+from src.core.qr_render import QR_FORMATS
 
 
 def load_server_public_key(key_file: str) -> str:
@@ -34,10 +36,12 @@ def load_server_public_key(key_file: str) -> str:
 @click.option('--allowed-ips', default='0.0.0.0/0', help='Traffic to route through VPN (default: all)')
 @click.option('--output', '-o', default='./clients', help='Output directory (default: ./clients)')
 @click.option('--no-qr', is_flag=True, help='Skip QR code generation')
+@click.option('--qr-format', type=click.Choice(QR_FORMATS),
+              help='QR image format (default: png, or pil without numpy)')
 @click.option('--keys-dir', default='/etc/wireguard', help='Directory containing keys (default: /etc/wireguard)')
 @click.option('--preshared-key', help='Path to preshared key file for additional security')
 def main(name, server_key, server_ip, server_port, client_ip, network, dns, 
-         allowed_ips, output, no_qr, keys_dir, preshared_key):
+         allowed_ips, output, no_qr, qr_format, keys_dir, preshared_key):
     """
     WireGuard Client Configuration Generator
     
@@ -94,7 +98,8 @@ def main(name, server_key, server_ip, server_port, client_ip, network, dns,
             server_public_key=server_public_key,
             server_endpoint=server_ip,
             server_port=server_port,
-            network_base=network
+            network_base=network,
+            ipam=IPAMStore(Path(keys_dir) / IPAM_DB_NAME)
         )
         
         # Generate client package
@@ -105,13 +110,18 @@ def main(name, server_key, server_ip, server_port, client_ip, network, dns,
             client_private_key=client_private_key,
             output_dir=output,
             generate_qr=not no_qr,
+            qr_format=qr_format,
             client_ip=client_ip,
             dns_servers=dns_servers,
             allowed_ips=allowed_ips,
             preshared_key=psk
         )
         
+        if psk:
+            key_manager.save_client_preshared_key(name, psk)
+        
         click.echo("✅ Client configuration generated successfully!")
+        click.echo(f"   Client IP: {result['client_ip']}")
         click.echo(f"   Configuration file: {result['config_file']}")
         
         if not no_qr:
@@ -120,11 +130,12 @@ def main(name, server_key, server_ip, server_port, client_ip, network, dns,
         # Display server-side configuration
         server_config = config_gen.generate_server_config_section(
             client_public_key=client_public_key,
-            client_ip=client_ip or config_gen.allocated_ips.pop(),
+            client_ip=result['client_ip'],
             preshared_key=psk
         )
         
-        click.echo("\n📋 Add this to your server configuration (/etc/wireguard/wg0.conf):")
+        click.echo("\n📋 Add this to your server configuration (/etc/wireguard/wg0.conf),")
+        click.echo("   or run `vpn.py server sync` to apply it without a restart:")
         click.echo(server_config)
         
         click.echo(f"\n📱 To connect:")
@@ -12,7 +12,12 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import click
-from jinja2 import Template
+import sys
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.templates import get_registry
 
 
 class HIPAAComplianceReporter:
@@ -440,11 +445,11 @@ For questions about this compliance report or VPN system:
         
         # Generate report
         if output_format == "html":
-            template = Template(self.report_templates["full_report"])
+            template = get_registry().from_string(self.report_templates["full_report"])
             content = template.render(**report_data)
             filename = f"HIPAA_Compliance_Report_{client_name}_{datetime.now().strftime('%Y%m%d')}.html"
         else:
-            template = Template(self.report_templates["summary_report"])
+            template = get_registry().from_string(self.report_templates["summary_report"])
             content = template.render(**report_data)
             filename = f"HIPAA_Summary_{client_name}_{datetime.now().strftime('%Y%m%d')}.md"
         
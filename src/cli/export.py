@@ -0,0 +1,55 @@
+"""
+Client Export CLI
+
+Writes client configurations and QR codes to a single ZIP archive.
+"""
+
+import click
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.export import resolve_clients, write_client_archive
+from src.core.qr_cache import QRCodeCache, QR_CACHE_DIR_NAME
+
+
+@click.command()
+@click.option('--clients-dir', default='./clients', help='Directory containing client packages (default: ./clients)')
+@click.option('--client', '-c', 'clients', multiple=True, help='Client to export (can specify multiple, default: all)')
+@click.option('--output', '-o', help="Archive path, or '-' for stdout (default: vpn-clients-<date>.zip)")
+@click.option('--no-qr', is_flag=True, help='Do not render QR codes that are missing on disk')
+def export(clients_dir, clients, output, no_qr):
+    """
+    Export client packages as a ZIP archive.
+
+    The archive is streamed straight to its destination, so exporting
+    hundreds of clients needs no extra memory or temporary files.
+    """
+    try:
+        names = resolve_clients(clients_dir, clients)
+    except KeyError as e:
+        click.echo(f"❌ {e.args[0]}", err=True)
+        sys.exit(1)
+
+    if not names:
+        click.echo(f"❌ No clients found in: {clients_dir}", err=True)
+        sys.exit(1)
+
+    qr_cache = None if no_qr else QRCodeCache(Path(clients_dir) / QR_CACHE_DIR_NAME)
+
+    if output == '-':
+        write_client_archive(click.get_binary_stream('stdout'), clients_dir, names, qr_cache)
+        return
+
+    output = output or f"vpn-clients-{datetime.now().strftime('%Y%m%d')}.zip"
+    with open(output, 'wb') as f:
+        size = write_client_archive(f, clients_dir, names, qr_cache)
+
+    click.echo(f"✅ Exported {len(names)} clients to {output} ({size / 1024:.1f} KB)")
+
+
+if __name__ == '__main__':
+    export()
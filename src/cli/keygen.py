@@ -13,6 +13,10 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from src.core.keys import WireGuardKeyManager, check_wireguard_installation
+from src.core.client_config import ClientConfigGenerator
+from src.core.ipam import IPAMStore, IPAM_DB_NAME
+from src.core.provisioning import BulkProvisioner, load_roster
+from src.core.qr_render import QR_FORMATS
 
 
 @click.command()
@@ -23,21 +27,39 @@ from src.core.keys import WireGuardKeyManager, check_wireguard_installation
 @click.option('--encrypt', is_flag=True, help='Encrypt private key with password')
 @click.option('--password', help='Password for encryption (will prompt if not provided)')
 @click.option('--name', default='server', help='Server name/identifier (default: server)')
-def main(server, client, output, encrypt, password, name):
+@click.option('--backend', type=click.Choice(['auto', 'cryptography', 'wg']), default='auto',
+              help='Key generation backend (default: auto, in-process)')
+@click.option('--clients-from', type=click.Path(exists=True, dir_okay=False),
+              help='Provision every client listed in a CSV/JSON roster')
+@click.option('--server-ip', help='Server public IP address (required with --clients-from)')
+@click.option('--server-port', default=51820, help='Server port (default: 51820)')
+@click.option('--server-key', help='Path to server public key file (default: <output>/server_public.key)')
+@click.option('--network', default='10.0.0.0/24', help='VPN network range (default: 10.0.0.0/24)')
+@click.option('--dns', multiple=True, help='DNS servers for roster clients (can specify multiple)')
+@click.option('--allowed-ips', default='0.0.0.0/0', help='Traffic to route through VPN (default: all)')
+@click.option('--configs-dir', default='./clients', help='Output directory for roster configs (default: ./clients)')
+@click.option('--no-qr', is_flag=True, help='Skip QR code generation for roster clients')
+@click.option('--qr-format', type=click.Choice(QR_FORMATS),
+              help='QR image format for roster clients (default: png, or pil without numpy)')
+@click.option('--workers', type=int, help='Worker processes for QR rendering (default: CPU count)')
+@click.option('--rekey', is_flag=True, help='Regenerate keys for roster clients that already have them')
+def main(server, client, output, encrypt, password, name, backend, clients_from,
+         server_ip, server_port, server_key, network, dns, allowed_ips, configs_dir,
+         no_qr, qr_format, workers, rekey):
     """
     WireGuard Key Generation Tool
     
     Generate secure WireGuard keys for servers and clients.
     """
-    # Check if WireGuard is installed
-    if not check_wireguard_installation():
+    # The wg tools are only needed when explicitly selected as the backend
+    if backend == 'wg' and not check_wireguard_installation():
         click.echo("❌ Error: WireGuard tools not found. Please install WireGuard first.")
         click.echo("   Ubuntu/Debian: sudo apt install wireguard")
         click.echo("   macOS: brew install wireguard-tools")
         sys.exit(1)
     
     try:
-        key_manager = WireGuardKeyManager(output)
+        key_manager = WireGuardKeyManager(output, backend=backend)
         
         if server:
             click.echo(f"🔐 Generating server keys...")
@@ -75,8 +97,47 @@ def main(server, client, output, encrypt, password, name):
             click.echo(f"   Private key file: {result['private_file']}")
             click.echo(f"   Public key file: {result['public_file']}")
             
+        elif clients_from:
+            if not server_ip:
+                click.echo("❌ --server-ip is required with --clients-from")
+                sys.exit(1)
+            
+            server_key_file = Path(server_key) if server_key else Path(output) / "server_public.key"
+            if not server_key_file.exists():
+                click.echo(f"❌ Server public key not found: {server_key_file}")
+                sys.exit(1)
+            
+            roster = load_roster(clients_from)
+            click.echo(f"🔐 Provisioning {len(roster)} clients from: {clients_from}")
+            
+            config_gen = ClientConfigGenerator(
+                server_public_key=server_key_file.read_text().strip(),
+                server_endpoint=server_ip,
+                server_port=server_port,
+                network_base=network,
+                ipam=IPAMStore(Path(output) / IPAM_DB_NAME)
+            )
+            provisioner = BulkProvisioner(key_manager, config_gen,
+                                          output_dir=configs_dir, workers=workers,
+                                          qr_format=qr_format)
+            manifest = provisioner.provision(
+                roster,
+                generate_qr=not no_qr,
+                dns_servers=list(dns) if dns else None,
+                allowed_ips=allowed_ips,
+                rekey=rekey
+            )
+            
+            click.echo(f"✅ Provisioned {manifest['provisioned']}/{manifest['total']} clients "
+                       f"in {manifest['elapsed_seconds']}s")
+            click.echo(f"   Manifest: {manifest['manifest_file']}")
+            click.echo(f"   Server peers: {manifest['server_peers_file']}")
+            
+            for error in manifest['errors']:
+                click.echo(f"   ⚠️  {error['name']}: {error['error']}")
+            
         else:
-            click.echo("❌ Please specify either --server or --client <name>")
+            click.echo("❌ Please specify --server, --client <name> or --clients-from <file>")
             sys.exit(1)
             
     except PermissionError:
@@ -0,0 +1,110 @@
+"""
+Keystore CLI
+
+Unlocks and re-encrypts password-protected private keys, asking for the
+password once per command invocation.
+"""
+
+import click
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from cryptography.fernet import InvalidToken
+
+from src.core.keystore import KeystoreSession, PartialReplaceError, is_encrypted_key, replace_files
+
+_SESSION_KEY = "vpn.keystore_session"
+
+
+def keystore_session(password: Optional[str] = None, **kwargs) -> KeystoreSession:
+    """
+    Return the keystore session for the current CLI invocation.
+
+    The password is prompted for on first use; later calls in the same
+    invocation reuse the session, which is wiped when the command exits.
+    """
+    ctx = click.get_current_context()
+    root = ctx.find_root()
+    session = root.meta.get(_SESSION_KEY)
+    if session is None or session.closed:
+        if password is None:
+            password = click.prompt('Keystore password', hide_input=True)
+        session = KeystoreSession(password, **kwargs)
+        root.meta[_SESSION_KEY] = session
+        root.call_on_close(session.close)
+    return session
+
+
+def _encrypted_key_files(keys_dir: str):
+    return sorted(path for path in Path(keys_dir).rglob("*private.key")
+                  if is_encrypted_key(path.read_text()))
+
+
+@click.group()
+def keys():
+    """Unlock and manage password-encrypted private keys."""
+    pass
+
+
+@keys.command("unlock")
+@click.option('--keys-dir', default='/etc/wireguard', help='Directory containing keys (default: /etc/wireguard)')
+@click.option('--password', help='Keystore password (will prompt if not provided)')
+@click.option('--workers', type=int, help='Worker processes for key derivation (default: CPU count)')
+def unlock_keys(keys_dir, password, workers):
+    """Verify that every encrypted private key unlocks with the password."""
+    files = _encrypted_key_files(keys_dir)
+    if not files:
+        click.echo(f"ℹ️  No encrypted private keys in {keys_dir}")
+        return
+
+    session = keystore_session(password, workers=workers)
+    start = time.perf_counter()
+    try:
+        session.unlock_files(files)
+    except InvalidToken:
+        click.echo("❌ Wrong password for one or more keys")
+        sys.exit(1)
+
+    click.echo(f"🔓 Unlocked {len(files)} keys with {session.derivations} derivations "
+               f"in {time.perf_counter() - start:.2f}s")
+
+
+@keys.command("passwd")
+@click.option('--keys-dir', default='/etc/wireguard', help='Directory containing keys (default: /etc/wireguard)')
+@click.option('--workers', type=int, help='Worker processes for key derivation (default: CPU count)')
+def change_password(keys_dir, workers):
+    """Re-encrypt every encrypted private key under a new password."""
+    files = _encrypted_key_files(keys_dir)
+    if not files:
+        click.echo(f"ℹ️  No encrypted private keys in {keys_dir}")
+        return
+
+    try:
+        unlocked = keystore_session(workers=workers).unlock_files(files)
+    except InvalidToken:
+        click.echo("❌ Wrong password for one or more keys")
+        sys.exit(1)
+
+    new_password = click.prompt('New keystore password', hide_input=True, confirmation_prompt=True)
+    with KeystoreSession(new_password, workers=workers) as new_session:
+        encrypted = {path: new_session.encrypt(private_key) for path, private_key in unlocked.items()}
+
+    # All keys switch to the new password together, or none do
+    try:
+        replace_files(encrypted)
+    except PartialReplaceError as e:
+        click.echo(f"❌ Re-encryption interrupted: {e}")
+        click.echo("   These keys now use the new password:")
+        for path in e.replaced:
+            click.echo(f"   - {path}")
+        sys.exit(1)
+    except OSError as e:
+        click.echo(f"❌ Could not write new keys, all keys keep the old password: {e}")
+        sys.exit(1)
+
+    click.echo(f"✅ Re-encrypted {len(files)} keys")
@@ -5,17 +5,31 @@ Professional monitoring solution for healthcare VPN deployments.
 Generates compliance reports, tracks usage patterns, and provides alerts.
 """
 
+import asyncio
 import json
+import signal
+import sys
 import time
 import subprocess
 import smtplib
 from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from typing import Dict, List, Optional
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import click
 
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, PrometheusExporter
+from src.core.monitor_engine import MonitoringEngine
+from src.core.procstats import SystemStats
+from src.core.rollups import ROLLUP_DB_NAME, RollupStore, rate_series
+from src.core.tsdb import TSDB_DIR_NAME, MetricsStore, to_epoch
+from src.core.wg_status import WireGuardPoller, wireguard_source
+
 
 class VPNMonitor:
     """Professional VPN monitoring and alerting system."""
@@ -25,6 +39,10 @@ class VPNMonitor:
         self.config = self._load_config()
         self.data_dir = Path("monitoring_data")
         self.data_dir.mkdir(exist_ok=True)
+        self.store = MetricsStore(self.data_dir / TSDB_DIR_NAME)
+        self.rollups = RollupStore(self.data_dir / ROLLUP_DB_NAME)
+        self.wireguard = wireguard_source(self.config["interfaces"])
+        self.system_stats: Optional[SystemStats] = None
     
     def _load_config(self) -> Dict:
         """Load monitoring configuration."""
@@ -34,6 +52,7 @@ class VPNMonitor:
             "smtp_port": 587,
             "smtp_username": "",
             "smtp_password": "",
+            "smtp_timeout": 30,
             "check_interval": 300,  # 5 minutes
             "offline_threshold": 600,  # 10 minutes
             "data_retention_days": 90,
@@ -65,97 +84,90 @@ class VPNMonitor:
             "system": self._get_system_metrics()
         }
         
+        # One snapshot of every interface, however many are configured
+        try:
+            snapshot = self.wireguard.read()
+            missing = "Interface not found"
+        except (subprocess.SubprocessError, OSError) as e:
+            snapshot = {}
+            missing = str(e) or type(e).__name__
+        
+        now = time.time()
+        threshold = self.config["offline_threshold"]
         for interface in self.config["interfaces"]:
-            try:
-                # Get WireGuard interface stats
-                result = subprocess.run(
-                    ["wg", "show", interface, "dump"],
-                    capture_output=True, text=True, check=True
-                )
-                
-                interface_data = {
-                    "status": "active",
-                    "peers": [],
-                    "total_rx": 0,
-                    "total_tx": 0
-                }
-                
-                lines = result.stdout.strip().split('\n')
-                for line in lines[1:]:  # Skip header
-                    if line.strip():
-                        parts = line.split('\t')
-                        if len(parts) >= 6:
-                            peer_data = {
-                                "public_key": parts[0][:16] + "...",  # Truncated for privacy
-                                "endpoint": parts[2] if parts[2] != "(none)" else None,
-                                "allowed_ips": parts[3],
-                                "latest_handshake": parts[4],
-                                "rx_bytes": int(parts[5]) if parts[5].isdigit() else 0,
-                                "tx_bytes": int(parts[6]) if parts[6].isdigit() else 0,
-                                "connected": self._is_peer_connected(parts[4])
-                            }
-                            
-                            interface_data["peers"].append(peer_data)
-                            interface_data["total_rx"] += peer_data["rx_bytes"]
-                            interface_data["total_tx"] += peer_data["tx_bytes"]
-                
-                metrics["interfaces"][interface] = interface_data
-                
-            except subprocess.CalledProcessError:
-                metrics["interfaces"][interface] = {"status": "inactive", "error": "Interface not found"}
+            state = snapshot.get(interface)
+            if state is None:
+                metrics["interfaces"][interface] = {"status": "inactive", "error": missing}
+                continue
+            
+            interface_data = {
+                "status": "active",
+                "peers": [],
+                "total_rx": 0,
+                "total_tx": 0
+            }
+            
+            for peer in state.peers:
+                interface_data["peers"].append({
+                    "public_key": peer.public_key[:16] + "...",  # Truncated for privacy
+                    "endpoint": peer.endpoint,
+                    "allowed_ips": ",".join(peer.allowed_ips) or "(none)",
+                    "latest_handshake": str(peer.latest_handshake),
+                    "rx_bytes": peer.rx_bytes,
+                    "tx_bytes": peer.tx_bytes,
+                    "connected": peer.is_connected(now, threshold)
+                })
+                interface_data["total_rx"] += peer.rx_bytes
+                interface_data["total_tx"] += peer.tx_bytes
+            
+            metrics["interfaces"][interface] = interface_data
         
         return metrics
     
-    def _is_peer_connected(self, handshake_time: str) -> bool:
-        """Check if peer is considered connected based on handshake time."""
-        if not handshake_time or handshake_time == "0":
-            return False
-        
-        try:
-            handshake_timestamp = int(handshake_time)
-            current_timestamp = int(time.time())
-            
-            # Consider connected if handshake within offline threshold
-            return (current_timestamp - handshake_timestamp) < self.config["offline_threshold"]
-        except (ValueError, TypeError):
-            return False
-    
     def _get_system_metrics(self) -> Dict:
         """Get system-level metrics."""
-        metrics = {}
-        
         try:
-            # CPU and memory
-            with open('/proc/loadavg', 'r') as f:
-                load_avg = f.read().strip().split()
-                metrics['load_average'] = float(load_avg[0])
-            
-            with open('/proc/meminfo', 'r') as f:
-                meminfo = f.read()
-                for line in meminfo.split('\n'):
-                    if 'MemTotal:' in line:
-                        metrics['memory_total'] = int(line.split()[1]) * 1024
-                    elif 'MemAvailable:' in line:
-                        metrics['memory_available'] = int(line.split()[1]) * 1024
-            
-            if 'memory_total' in metrics and 'memory_available' in metrics:
-                metrics['memory_usage_percent'] = (
-                    (metrics['memory_total'] - metrics['memory_available']) / 
-                    metrics['memory_total'] * 100
-                )
-        
+            if self.system_stats is None:
+                self.system_stats = SystemStats()
+            return self.system_stats.read()
         except Exception as e:
-            metrics['error'] = str(e)
-        
-        return metrics
+            return {"error": str(e)}
     
     def store_metrics(self, metrics: Dict):
-        """Store metrics to time-series data file."""
-        date_str = datetime.now().strftime("%Y-%m-%d")
-        metrics_file = self.data_dir / f"metrics_{date_str}.jsonl"
+        """Append metrics to the columnar time-series store and its rollups."""
+        self.store.append(metrics)
+        self.rollups.add(metrics)
+    
+    def rebuild_rollups(self) -> int:
+        """
+        Recompute report rollups from stored samples.
         
-        with open(metrics_file, 'a') as f:
-            f.write(json.dumps(metrics) + '\n')
+        Legacy JSONL days without a columnar segment are imported first.
+        
+        Returns:
+            Number of legacy JSONL files imported
+        """
+        segment_days = set(self.store.days())
+        imported = 0
+        for metrics_file in sorted(self.data_dir.glob("metrics_*.jsonl")):
+            date_str = metrics_file.stem.replace("metrics_", "")
+            try:
+                if datetime.strptime(date_str, "%Y-%m-%d").date() in segment_days:
+                    continue
+            except ValueError:
+                continue
+            
+            with open(metrics_file, 'r') as f:
+                for line in f:
+                    try:
+                        self.store.append(json.loads(line))
+                    except (json.JSONDecodeError, KeyError, ValueError):
+                        continue
+            imported += 1
+        
+        self.store.close()
+        self.rollups.rebuild(self.store)
+        return imported
     
     def check_alerts(self, metrics: Dict) -> List[Dict]:
         """Check for alert conditions."""
@@ -245,7 +257,8 @@ class VPNMonitor:
             
             msg.attach(MIMEText(body, 'html'))
             
-            server = smtplib.SMTP(self.config["smtp_server"], self.config["smtp_port"])
+            server = smtplib.SMTP(self.config["smtp_server"], self.config["smtp_port"],
+                                  timeout=self.config.get("smtp_timeout", 30))
             server.starttls()
             server.login(self.config["smtp_username"], self.config["smtp_password"])
             
@@ -264,12 +277,12 @@ class VPNMonitor:
         <html>
         <head>
             <style>
-                body { font-family: Arial, sans-serif; }
-                .alert { margin: 10px 0; padding: 10px; border-radius: 5px; }
-                .critical { background-color: #ffebee; border-left: 4px solid #f44336; }
-                .high { background-color: #fff3e0; border-left: 4px solid #ff9800; }
-                .medium { background-color: #f3e5f5; border-left: 4px solid #9c27b0; }
-                .timestamp { color: #666; font-size: 0.9em; }
+                body {{ font-family: Arial, sans-serif; }}
+                .alert {{ margin: 10px 0; padding: 10px; border-radius: 5px; }}
+                .critical {{ background-color: #ffebee; border-left: 4px solid #f44336; }}
+                .high {{ background-color: #fff3e0; border-left: 4px solid #ff9800; }}
+                .medium {{ background-color: #f3e5f5; border-left: 4px solid #9c27b0; }}
+                .timestamp {{ color: #666; font-size: 0.9em; }}
             </style>
         </head>
         <body>
@@ -334,52 +347,31 @@ class VPNMonitor:
             "summary": {}
         }
         
-        # Load historical data
-        metrics_data = []
-        for day_offset in range(days):
-            check_date = end_date - timedelta(days=day_offset)
-            date_str = check_date.strftime("%Y-%m-%d")
-            metrics_file = self.data_dir / f"metrics_{date_str}.jsonl"
-            
-            if metrics_file.exists():
-                with open(metrics_file, 'r') as f:
-                    for line in f:
-                        try:
-                            metrics_data.append(json.loads(line))
-                        except json.JSONDecodeError:
-                            continue
-        
-        if not metrics_data:
+        if not self.rollups.built:
+            self.rebuild_rollups()
+        
+        end_ts = to_epoch(end_date.timestamp())
+        totals = self.rollups.usage(end_ts - days * 86400, end_ts + 1, self.store)
+        
+        if not totals.samples:
             report["summary"]["note"] = "No historical data available"
             return report
         
-        # Analyze data
-        total_samples = len(metrics_data)
-        interface_stats = {}
-        
-        for metrics in metrics_data:
-            for interface_name, interface_data in metrics.get("interfaces", {}).items():
-                if interface_name not in interface_stats:
-                    interface_stats[interface_name] = {
-                        "uptime_samples": 0,
-                        "total_samples": 0,
-                        "peak_peers": 0,
-                        "total_data_rx": 0,
-                        "total_data_tx": 0,
-                        "connection_events": []
-                    }
-                
-                stats = interface_stats[interface_name]
-                stats["total_samples"] += 1
-                
-                if interface_data.get("status") == "active":
-                    stats["uptime_samples"] += 1
-                    
-                    peers = interface_data.get("peers", [])
-                    stats["peak_peers"] = max(stats["peak_peers"], len(peers))
-                    
-                    stats["total_data_rx"] += interface_data.get("total_rx", 0)
-                    stats["total_data_tx"] += interface_data.get("total_tx", 0)
+        interface_stats = {
+            name: {
+                "uptime_samples": uptime_samples,
+                "total_samples": samples,
+                "peak_peers": peak_peers,
+                "total_data_rx": rx_bytes,
+                "total_data_tx": tx_bytes,
+                "peers": {}
+            }
+            for name, (samples, uptime_samples, peak_peers, rx_bytes, tx_bytes) in totals.interfaces.items()
+        }
+        for (interface_name, public_key), (online_seconds, _, _) in totals.peers.items():
+            if interface_name in interface_stats:
+                interface_stats[interface_name]["peers"][public_key] = round(online_seconds / 60)
+        total_samples = totals.samples
         
         # Calculate final statistics
         for interface_name, stats in interface_stats.items():
@@ -390,7 +382,8 @@ class VPNMonitor:
                 "peak_concurrent_peers": stats["peak_peers"],
                 "total_data_transfer_gb": round((stats["total_data_rx"] + stats["total_data_tx"]) / (1024**3), 3),
                 "data_rx_gb": round(stats["total_data_rx"] / (1024**3), 3),
-                "data_tx_gb": round(stats["total_data_tx"] / (1024**3), 3)
+                "data_tx_gb": round(stats["total_data_tx"] / (1024**3), 3),
+                "peer_online_minutes": dict(sorted(stats["peers"].items(), key=lambda item: -item[1]))
             }
         
         # Overall summary
@@ -406,6 +399,48 @@ class VPNMonitor:
         
         return report
     
+    def peer_rates(self, hours: int = 24, peer: Optional[str] = None) -> Dict:
+        """
+        Per-peer throughput from counter deltas between consecutive samples.
+        
+        Args:
+            hours: Length of the window ending now
+            peer: Public key (or prefix) to return a bytes/sec series for
+        
+        Returns:
+            Dictionary with per-peer totals, average and peak bytes/sec,
+            or one peer's series when `peer` is given
+        """
+        end_ts = int(time.time()) + 1
+        series = rate_series(self.store, end_ts - hours * 3600, end_ts)
+        result = {"hours": hours, "peers": []}
+        
+        if peer is not None:
+            matches = [key for key in series.keys if key[1].startswith(peer.rstrip("."))]
+            if not matches:
+                return result
+            key = matches[0]
+            one = series.for_peer(key)
+            rx_rate, tx_rate = one.rx_rate, one.tx_rate
+            result["peers"].append({
+                "interface": key[0],
+                "public_key": key[1],
+                "series": [
+                    {
+                        "timestamp": datetime.fromtimestamp(int(ts)).isoformat(),
+                        "rx_bps": None if rx != rx else round(float(rx), 1),
+                        "tx_bps": None if tx != tx else round(float(tx), 1)
+                    }
+                    for ts, rx, tx in zip(one.timestamps, rx_rate, tx_rate)
+                ]
+            })
+            return result
+        
+        for (interface_name, public_key), stats in series.summary().items():
+            result["peers"].append({"interface": interface_name, "public_key": public_key, **stats})
+        result["peers"].sort(key=lambda row: -(row["rx_bytes"] + row["tx_bytes"]))
+        return result
+    
     def run_monitoring_cycle(self):
         """Run one monitoring cycle."""
         print(f"🔍 Running monitoring cycle at {datetime.now().strftime('%H:%M:%S')}")
@@ -416,7 +451,18 @@ class VPNMonitor:
         # Store metrics
         self.store_metrics(metrics)
         
-        # Check for alerts
+        # Check for alerts and send notifications
+        alerts = self.evaluate_alerts(metrics)
+        if alerts:
+            self.send_alert_email(alerts)
+    
+    def evaluate_alerts(self, metrics: Dict) -> List[Dict]:
+        """
+        Check a sample for alerts and print the cycle summary.
+        
+        Returns:
+            Alerts to notify about (empty when alerting is disabled)
+        """
         alerts = self.check_alerts(metrics)
         
         if alerts:
@@ -424,10 +470,6 @@ class VPNMonitor:
             for alert in alerts:
                 severity_icon = {"critical": "🔴", "high": "🟠", "medium": "🟡"}.get(alert["severity"], "⚪")
                 print(f"   {severity_icon} {alert['message']}")
-            
-            # Send alert notifications
-            if self.config.get("alerts_enabled", True):
-                self.send_alert_email(alerts)
         else:
             print("✅ No alerts detected")
         
@@ -437,6 +479,46 @@ class VPNMonitor:
                 peer_count = len(interface_data.get("peers", []))
                 connected_count = len([p for p in interface_data.get("peers", []) if p.get("connected")])
                 print(f"   📊 {interface_name}: {connected_count}/{peer_count} peers connected")
+        
+        return alerts if self.config.get("alerts_enabled", True) else []
+    
+    def _record_missed_tick(self, record: Dict):
+        """Log a missed collection tick and append it to missed_ticks.jsonl."""
+        print(f"⏭️  Missed tick {record['tick']} scheduled at {record['scheduled']}: {record['reason']}")
+        with open(self.data_dir / "missed_ticks.jsonl", 'a') as f:
+            f.write(json.dumps(record) + '\n')
+    
+    def run_daemon(self, interval: float) -> Dict:
+        """
+        Monitor on a fixed cadence until SIGINT or SIGTERM.
+        
+        Collection, storage, alerting and email run as separate stages,
+        so a slow SMTP server never delays the next sample.
+        
+        Returns:
+            Engine statistics at shutdown
+        """
+        engine = MonitoringEngine(
+            collect=self.collect_metrics,
+            store=self.store_metrics,
+            evaluate=self.evaluate_alerts,
+            notify=self.send_alert_email,
+            interval=interval,
+            on_missed=self._record_missed_tick,
+            on_error=lambda stage, error: print(f"❌ Monitoring {stage} failed: {error}")
+        )
+        
+        async def main():
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(sig, engine.stop)
+                except (NotImplementedError, RuntimeError):
+                    pass
+            await engine.run()
+        
+        asyncio.run(main())
+        return engine.stats()
     
     def cleanup_old_data(self):
         """Clean up old monitoring data."""
@@ -456,6 +538,9 @@ class VPNMonitor:
             except (ValueError, OSError):
                 continue
         
+        cleaned += self.store.remove_before(cutoff_date.date())
+        self.rollups.remove_before(to_epoch(cutoff_date.timestamp()))
+        
         if cleaned > 0:
             print(f"🧹 Cleaned up {cleaned} old monitoring files")
 
@@ -500,13 +585,11 @@ def run_monitoring(daemon: bool, interval: int):
         return
     
     if daemon:
-        click.echo("🔄 Starting monitoring daemon...")
-        try:
-            while True:
-                monitor_system.run_monitoring_cycle()
-                time.sleep(interval)
-        except KeyboardInterrupt:
-            click.echo("\n🛑 Monitoring stopped")
+        click.echo(f"🔄 Starting monitoring daemon (every {interval}s)...")
+        stats = monitor_system.run_daemon(interval)
+        click.echo("\n🛑 Monitoring stopped")
+        click.echo(f"📊 {stats['collected']} samples, {stats['missed_ticks']} missed ticks, "
+                   f"{stats['notifications']} alert notifications")
     else:
         monitor_system.run_monitoring_cycle()
 
@@ -532,6 +615,9 @@ def generate_report(days: int, output: Optional[str]):
         click.echo("="*50)
         
         summary = report['summary']
+        if 'note' in summary:
+            click.echo(f"ℹ️  {summary['note']}")
+            return
         click.echo(f"📊 Total Samples: {summary['total_samples']}")
         click.echo(f"⏱️  Average Uptime: {summary['average_uptime_percent']}%")
         click.echo(f"📦 Total Data Transfer: {summary['total_data_transfer_gb']} GB")
@@ -544,6 +630,60 @@ def generate_report(days: int, output: Optional[str]):
             click.echo(f"   📊 Data Transfer: {stats['total_data_transfer_gb']} GB")
 
 
+@monitor.command("rates")
+@click.option("--hours", default=24, help="Number of hours to include (default: 24)")
+@click.option("--peer", help="Public key prefix; prints that peer's bytes/sec series")
+@click.option("--top", default=20, help="Peers to list, busiest first (default: 20)")
+@click.option("--output", help="Output file for the JSON result")
+def show_rates(hours: int, peer: Optional[str], top: int, output: Optional[str]):
+    """Show per-peer throughput computed from counter deltas."""
+    monitor_system = VPNMonitor()
+    result = monitor_system.peer_rates(hours, peer)
+    
+    if output:
+        with open(output, 'w') as f:
+            json.dump(result, f, indent=2)
+        click.echo(f"📄 Rates saved to: {output}")
+        return
+    
+    if not result["peers"]:
+        click.echo("ℹ️  No samples in this window")
+        return
+    
+    def rate(value):
+        return "-" if value is None else f"{value * 8 / 1e6:.3f} Mbit/s"
+    
+    if peer:
+        row = result["peers"][0]
+        click.echo(f"📈 {row['interface']} {row['public_key']} (last {hours}h)")
+        for point in row["series"]:
+            click.echo(f"   {point['timestamp']}  ⬇️ {rate(point['rx_bps'])}  ⬆️ {rate(point['tx_bps'])}")
+        return
+    
+    click.echo(f"📶 PEER THROUGHPUT (last {hours}h)")
+    click.echo("="*50)
+    for row in result["peers"][:top]:
+        click.echo(f"🔗 {row['interface']} {row['public_key']}")
+        click.echo(f"   ⬇️ avg {rate(row['avg_rx_bps'])}, peak {rate(row['peak_rx_bps'])}, "
+                   f"{row['rx_bytes'] / (1024**2):.1f} MB")
+        click.echo(f"   ⬆️ avg {rate(row['avg_tx_bps'])}, peak {rate(row['peak_tx_bps'])}, "
+                   f"{row['tx_bytes'] / (1024**2):.1f} MB")
+
+
+@monitor.command("rebuild-rollups")
+def rebuild_rollups():
+    """Recompute report rollups from stored samples."""
+    monitor_system = VPNMonitor()
+
+    click.echo("🔄 Rebuilding report rollups...")
+    started = time.perf_counter()
+    imported = monitor_system.rebuild_rollups()
+
+    if imported:
+        click.echo(f"📥 Imported {imported} legacy JSONL files")
+    click.echo(f"✅ Rollups rebuilt in {time.perf_counter() - started:.1f}s")
+
+
 @monitor.command("status")
 def monitoring_status():
     """Show current monitoring status."""
@@ -578,6 +718,55 @@ def monitoring_status():
             click.echo(f"      📊 Data: {total_data:.1f} MB total")
 
 
+@monitor.command("exporter")
+@click.option("--host", default="0.0.0.0", help="Address to bind to (default: 0.0.0.0)")
+@click.option("--port", default=9586, help="Port to serve /metrics on (default: 9586)")
+@click.option("--interval", default=15.0, help="Seconds between WireGuard polls (default: 15)")
+@click.option("--keys-dir", help="Keys directory; adds client names as a metric label")
+def run_exporter(host: str, port: int, interval: float, keys_dir: Optional[str]):
+    """Serve Prometheus metrics without the dashboard."""
+    poller = WireGuardPoller(interval=interval)
+    names = None
+    
+    if keys_dir:
+        from src.web.client_index import ClientIndex
+        
+        index = ClientIndex(Path(keys_dir) / "clients")
+        index.start()
+        
+        def names():
+            return index.version, {c["public_key"]: c["name"]
+                                   for c in index.clients() if c.get("public_key")}
+    
+    exporter = PrometheusExporter(poller, names=names)
+    
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = exporter.render()
+            self.send_response(200)
+            self.send_header("Content-Type", METRICS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    poller.start()
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    click.echo(f"📈 Serving Prometheus metrics on http://{host}:{port}/metrics (poll every {interval:g}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        click.echo("\n🛑 Exporter stopped")
+    finally:
+        server.server_close()
+        poller.stop()
+
+
 @monitor.command("cleanup")
 def cleanup_data():
     """Clean up old monitoring data."""
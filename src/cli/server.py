@@ -0,0 +1,127 @@
+"""
+Server Configuration CLI
+
+Regenerates wg0.conf from the IPAM and key stores and applies peer
+changes to the running interface without restarting it.
+"""
+
+import click
+import subprocess
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.cli.keystore import keystore_session
+from src.core.keystore import is_encrypted_key
+from src.core.server_config import ServerConfigBuilder
+
+
+def server_options(func):
+    """Options shared by every server subcommand."""
+    options = [
+        click.option('--keys-dir', default='/etc/wireguard', help='Directory containing keys (default: /etc/wireguard)'),
+        click.option('--interface', '-i', default='wg0', help='WireGuard interface (default: wg0)'),
+        click.option('--network', default='10.0.0.0/24', help='VPN network range (default: 10.0.0.0/24)'),
+        click.option('--port', default=51820, help='Server listen port (default: 51820)'),
+        click.option('--wan-interface', default='eth0', help='Internet-facing interface for NAT rules (default: eth0)'),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+def _builder(keys_dir, interface, network, port, wan_interface) -> ServerConfigBuilder:
+    builder = ServerConfigBuilder(keys_dir=keys_dir, network=network, interface=interface,
+                                  listen_port=port, internet_interface=wan_interface)
+    # Encrypted server keys are unlocked once for the whole command
+    key_file = builder.private_key_file
+    if key_file.exists() and is_encrypted_key(key_file.read_text()):
+        builder.session = keystore_session()
+    return builder
+
+
+@click.group()
+def server():
+    """Manage the server configuration and live peer set."""
+    pass
+
+
+@server.command("render")
+@server_options
+@click.option('--write', is_flag=True, help='Write <keys-dir>/<interface>.conf instead of printing')
+def render_config(keys_dir, interface, network, port, wan_interface, write):
+    """Render the full server configuration from the IPAM and key stores."""
+    builder = _builder(keys_dir, interface, network, port, wan_interface)
+    try:
+        if not write:
+            click.echo(builder.render(), nl=False)
+            return
+        changed = builder.write()
+    except FileNotFoundError as e:
+        click.echo(f"❌ {e}")
+        sys.exit(1)
+
+    state = "updated" if changed else "unchanged"
+    click.echo(f"✅ {builder.config_file} {state}")
+
+
+@server.command("diff")
+@server_options
+@click.option('--prune', is_flag=True, help='Show live peers missing from the stores as removals')
+def diff_peers(keys_dir, interface, network, port, wan_interface, prune):
+    """Show the peer changes sync would apply to the live interface."""
+    builder = _builder(keys_dir, interface, network, port, wan_interface)
+    try:
+        live = builder.live_peers()
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        click.echo(f"❌ Could not read interface {interface}: {e}")
+        sys.exit(1)
+    desired = builder.desired_peers()
+    diff = builder.plan(desired, live, prune=prune)
+
+    for peer in diff.added:
+        click.echo(f"+ {peer.public_key}  {', '.join(peer.allowed_ips)}  ({peer.name})")
+    for peer in diff.changed:
+        click.echo(f"~ {peer.public_key}  {', '.join(peer.allowed_ips)}  ({peer.name})")
+    for public_key in diff.removed:
+        click.echo(f"- {public_key}")
+    if not prune:
+        for public_key in live:
+            if public_key not in desired:
+                click.echo(f"? {public_key}  (not in the stores; sync imports or keeps it)")
+
+    if not diff:
+        click.echo("✅ Interface is in sync")
+
+
+@server.command("sync")
+@server_options
+@click.option('--dry-run', is_flag=True, help='Only report what would change')
+@click.option('--full', is_flag=True, help='Reload every peer with wg syncconf')
+@click.option('--no-write', is_flag=True, help='Leave the config file untouched')
+@click.option('--prune', is_flag=True, help='Remove live peers that are not in the stores')
+def sync_peers(keys_dir, interface, network, port, wan_interface, dry_run, full, no_write, prune):
+    """Apply the minimal peer diff to the live interface (no restart)."""
+    builder = _builder(keys_dir, interface, network, port, wan_interface)
+    try:
+        result = builder.sync(write_config=not no_write, dry_run=dry_run, full=full, prune=prune)
+    except subprocess.CalledProcessError as e:
+        click.echo(f"❌ wg failed: {(e.stderr or '').strip() or e}")
+        sys.exit(1)
+    except FileNotFoundError as e:
+        click.echo(f"❌ {e}")
+        sys.exit(1)
+
+    diff = result["diff"]
+    click.echo(f"📋 {result['peers']} peers: +{diff['added']} ~{diff['changed']} -{diff['removed']}")
+    if result["imported"]:
+        click.echo(f"   Imported {result['imported']} unmanaged peers into IPAM")
+    if result["kept"]:
+        click.echo(f"   Kept {result['kept']} peers missing from the stores (use --prune to remove)")
+    if dry_run:
+        return
+    if result["config_written"]:
+        click.echo(f"   Config written: {builder.config_file}")
+    click.echo(f"✅ Applied via: {result['method']}")
@@ -5,33 +5,73 @@ Creates WireGuard client configuration files and QR codes for easy setup.
 """
 
 import ipaddress
-import qrcode
+import re
 from pathlib import Path
 from typing import Dict, Optional, List
-from jinja2 import Template
-import io
 import base64
 
+from .ip_allocator import IPAllocator
+from .ipam import IPAMStore
+from .qr_cache import QR_CACHE_DIR_NAME, QRCodeCache
+from .qr_render import render_qr_png
+from .templates import CLIENT_CONFIG_TEMPLATE, SERVER_PEER_TEMPLATE, render_template
+
+
+_TIMESTAMP_LINE = re.compile(r"^# .* - Generated on .*$", re.MULTILINE)
+
+
+def _strip_timestamp(config: str) -> str:
+    """Remove the generation timestamp comment from a configuration."""
+    return _TIMESTAMP_LINE.sub("", config, count=1)
+
 
 class ClientConfigGenerator:
     """Generates WireGuard client configurations."""
     
     def __init__(self, server_public_key: str, server_endpoint: str, 
-                 server_port: int = 51820, network_base: str = "10.0.0.0/24"):
+                 server_port: int = 51820, network_base: str = "10.0.0.0/24",
+                 ipam: Optional[IPAMStore] = None,
+                 qr_cache: Optional[QRCodeCache] = None):
         self.server_public_key = server_public_key
         self.server_endpoint = server_endpoint
         self.server_port = server_port
         self.network = ipaddress.ip_network(network_base)
-        self.allocated_ips = set()
+        # Shared lease store; falls back to a per-instance allocator
+        self.ipam = ipam
+        self.qr_cache = qr_cache
+        # Start from .2 (server typically uses .1)
+        self.allocator = IPAllocator(self.network, reserve_server=True)
+    
+    @property
+    def allocated_ips(self) -> set:
+        """Addresses leased to clients in this network."""
+        if self.ipam is not None:
+            return {lease["address"] for lease in self.ipam.leases(str(self.network))
+                    if lease["kind"] == "lease"}
+        return set(self.allocator.leases())
         
-    def allocate_client_ip(self) -> str:
+    def allocate_client_ip(self, client_name: Optional[str] = None) -> str:
         """Allocate the next available IP address for a client."""
-        # Start from .2 (server typically uses .1)
-        for ip in list(self.network.hosts())[1:]:
-            if str(ip) not in self.allocated_ips:
-                self.allocated_ips.add(str(ip))
-                return str(ip)
-        raise ValueError("No available IP addresses in the network")
+        if self.ipam is not None:
+            return self.ipam.allocate(str(self.network), client_name)
+        return self.allocator.allocate()
+    
+    def reserve_client_ip(self, client_ip: str, client_name: Optional[str] = None):
+        """
+        Record an explicitly chosen client IP so it is not handed out again.
+        
+        Addresses outside the VPN network are left untracked.
+        
+        Raises:
+            ValueError: If the shared IPAM store has leased the address to
+                another client
+        """
+        if not self.allocator.contains(client_ip):
+            return
+        if self.ipam is not None:
+            self.ipam.pin(str(self.network), client_ip, client_name)
+        elif not self.allocator.is_allocated(client_ip):
+            self.allocator.pin(client_ip)
     
     def generate_config(self, client_name: str, client_private_key: str,
                        client_ip: Optional[str] = None, 
@@ -56,29 +96,16 @@ class ClientConfigGenerator:
             dns_servers = ["1.1.1.1", "8.8.8.8"]
             
         if client_ip is None:
-            client_ip = self.allocate_client_ip()
+            client_ip = self.allocate_client_ip(client_name)
         else:
-            self.allocated_ips.add(client_ip)
+            self.reserve_client_ip(client_ip, client_name)
         
         # Validate and clean server public key to prevent encoding issues
         clean_server_key = self._clean_base64_key(self.server_public_key)
         
-        config_template = Template("""[Interface]
-# {{ client_name }} - Generated on {{ timestamp }}
-PrivateKey = {{ client_private_key }}
-Address = {{ client_ip }}/32
-DNS = {{ dns_servers|join(', ') }}
-
-[Peer]
-# Server
-PublicKey = {{ server_public_key }}
-{% if preshared_key %}PresharedKey = {{ preshared_key }}
-{% endif %}Endpoint = {{ server_endpoint }}:{{ server_port }}
-AllowedIPs = {{ allowed_ips }}
-PersistentKeepalive = 25""")
-        
         from datetime import datetime
-        config = config_template.render(
+        config = render_template(
+            CLIENT_CONFIG_TEMPLATE,
             client_name=client_name,
             client_private_key=client_private_key,
             client_ip=client_ip,
@@ -130,26 +157,51 @@ PersistentKeepalive = 25""")
         Returns:
             Base64 encoded PNG image of QR code
         """
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=size,
-            border=border,
-        )
-        qr.add_data(config)
-        qr.make(fit=True)
+        return base64.b64encode(render_qr_png(config, size, border)).decode()
+    
+    def write_config(self, config_file: Path, config: str) -> str:
+        """
+        Save a configuration file unless only its timestamp would change.
+        
+        Keeping the existing text for unchanged configs means their QR
+        codes keep hitting the cache on regeneration runs.
         
-        img = qr.make_image(fill_color="black", back_color="white")
+        Args:
+            config_file: Destination .conf path
+            config: Newly generated configuration
+            
+        Returns:
+            The configuration text now on disk
+        """
+        if config_file.exists():
+            existing = config_file.read_text(encoding='utf-8')
+            if _strip_timestamp(existing) == _strip_timestamp(config):
+                return existing
         
-        # Convert to base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
+        # Save configuration file with explicit UTF-8 encoding
+        config_file.write_text(config, encoding='utf-8')
+        return config
+    
+    def qr_cache_for(self, output_dir: str, qr_format: Optional[str] = None) -> QRCodeCache:
+        """
+        Return the QR cache to use for a package written under output_dir.
         
-        return img_str
+        Args:
+            output_dir: Package output directory (used when no cache is set)
+            qr_format: Requested QR format, or None for the cache default
+            
+        Returns:
+            A QRCodeCache rendering the requested format
+        """
+        cache = self.qr_cache
+        if cache is not None and qr_format in (None, cache.qr_format):
+            return cache
+        cache_dir = cache.cache_dir if cache is not None else Path(output_dir) / QR_CACHE_DIR_NAME
+        return QRCodeCache(cache_dir, qr_format=qr_format)
     
     def save_client_package(self, client_name: str, client_private_key: str,
                            output_dir: str, generate_qr: bool = True,
+                           qr_format: Optional[str] = None,
                            **config_kwargs) -> Dict[str, str]:
         """
         Generate and save complete client package.
@@ -158,7 +210,10 @@ PersistentKeepalive = 25""")
             client_name: Client identifier
             client_private_key: Client's private key
             output_dir: Directory to save files
-            generate_qr: Whether to generate QR code
+            generate_qr: Whether to write the QR code now (otherwise it is
+                rendered lazily on first request)
+            qr_format: QR image format ("png", "svg" or "pil"); defaults
+                to the cache's format
             **config_kwargs: Additional configuration options
             
         Returns:
@@ -167,31 +222,28 @@ PersistentKeepalive = 25""")
         output_path = Path(output_dir) / client_name
         output_path.mkdir(parents=True, exist_ok=True)
         
+        # Allocate up front so the assigned address can be reported
+        if config_kwargs.get("client_ip") is None:
+            config_kwargs["client_ip"] = self.allocate_client_ip(client_name)
+        
         # Generate configuration
         config = self.generate_config(client_name, client_private_key, **config_kwargs)
         
-        # Save configuration file with explicit UTF-8 encoding
         config_file = output_path / f"{client_name}.conf"
-        config_file.write_text(config, encoding='utf-8')
+        config = self.write_config(config_file, config)
         
         result = {
             "client_name": client_name,
+            "client_ip": config_kwargs["client_ip"],
             "config_file": str(config_file),
             "config": config
         }
         
-        # Generate and save QR code if requested
+        # Write QR code image bytes straight from the cache if requested
         if generate_qr:
-            qr_data = self.generate_qr_code(config)
-            qr_file = output_path / f"{client_name}_qr.png"
-            
-            # Decode and save QR code image
-            import base64
-            qr_image_data = base64.b64decode(qr_data)
-            qr_file.write_bytes(qr_image_data)
-            
+            qr_cache = self.qr_cache_for(output_dir, qr_format)
+            qr_file = qr_cache.write_to(config, output_path / f"{client_name}_qr.{qr_cache.extension}")
             result["qr_file"] = str(qr_file)
-            result["qr_base64"] = qr_data
         
         return result
     
@@ -209,14 +261,8 @@ PersistentKeepalive = 25""")
         Returns:
             Server configuration section for this peer
         """
-        template = Template("""
-[Peer]
-# Client: {{ client_ip }}
-PublicKey = {{ client_public_key }}
-{% if preshared_key %}PresharedKey = {{ preshared_key }}
-{% endif %}AllowedIPs = {{ client_ip }}/32""")
-        
-        return template.render(
+        return render_template(
+            SERVER_PEER_TEMPLATE,
             client_public_key=client_public_key,
             client_ip=client_ip,
             preshared_key=preshared_key
@@ -0,0 +1,173 @@
+"""
+Client Package Export
+
+Streams client configurations and QR codes as a ZIP archive without
+building the archive in memory or on disk first.
+"""
+
+import time
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Union
+
+from .qr_cache import QRCodeCache
+
+# Bytes buffered before a chunk is handed to the consumer
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Images are already compressed; deflating them again only costs CPU
+_STORED_SUFFIXES = {".png"}
+
+
+class _ChunkSink:
+    """
+    Write-only, unseekable file object collecting zipfile output.
+
+    zipfile detects that tell()/seek() are unavailable and writes data
+    descriptors after each member instead of seeking back to patch the
+    local headers, so the archive can be emitted front to back.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.buffered = 0
+
+    def write(self, data) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+            self.buffered += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        """Return and forget everything written since the last drain."""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.buffered = 0
+        return data
+
+
+def list_clients(clients_dir: Union[str, Path]) -> List[str]:
+    """Return the names of all client directories, sorted."""
+    clients_dir = Path(clients_dir)
+    if not clients_dir.exists():
+        return []
+    return sorted(entry.name for entry in clients_dir.iterdir()
+                  if entry.is_dir() and not entry.name.startswith("."))
+
+
+def resolve_clients(clients_dir: Union[str, Path],
+                    names: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Validate requested client names against the clients directory.
+
+    Args:
+        clients_dir: Directory holding one sub-directory per client
+        names: Clients to export, or None/empty for all of them
+
+    Returns:
+        Client names in export order
+
+    Raises:
+        KeyError: If a requested client does not exist
+    """
+    available = list_clients(clients_dir)
+    if not names:
+        return available
+
+    known = set(available)
+    selected = list(dict.fromkeys(names))
+    missing = [name for name in selected if name not in known]
+    if missing:
+        raise KeyError(f"Unknown clients: {', '.join(missing)}")
+    return selected
+
+
+def _client_members(client_dir: Path, name: str,
+                    qr_cache: Optional[QRCodeCache]) -> Iterator[tuple]:
+    """Yield (arcname, path or bytes) for one client's package files."""
+    config_file = client_dir / f"{name}.conf"
+    if config_file.exists():
+        yield f"{name}/{config_file.name}", config_file
+
+    qr_files = sorted(client_dir.glob(f"{name}_qr.*"))
+    for qr_file in qr_files:
+        yield f"{name}/{qr_file.name}", qr_file
+
+    # Dashboard clients get their QR code lazily; render it from the cache
+    if not qr_files and qr_cache is not None and config_file.exists():
+        config = config_file.read_text(encoding="utf-8")
+        yield f"{name}/{name}_qr.{qr_cache.extension}", qr_cache.get_or_render(config)
+
+
+def stream_client_archive(clients_dir: Union[str, Path],
+                          names: Optional[Iterable[str]] = None,
+                          qr_cache: Optional[QRCodeCache] = None,
+                          chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Stream a ZIP archive of client packages chunk by chunk.
+
+    Each member is copied from disk in chunk_size pieces and yielded as
+    soon as the buffer fills, so memory use does not grow with the number
+    of clients and the first bytes are available immediately.
+
+    Args:
+        clients_dir: Directory holding one sub-directory per client
+        names: Clients to include (default: all)
+        qr_cache: Cache used to render QR codes that are not on disk yet
+        chunk_size: Approximate size of each yielded chunk
+
+    Returns:
+        Iterator over ZIP archive bytes
+    """
+    clients_dir = Path(clients_dir)
+    selected = resolve_clients(clients_dir, names)
+    sink = _ChunkSink()
+    started = False
+
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name in selected:
+            for arcname, source in _client_members(clients_dir / name, name, qr_cache):
+                mtime = time.time() if isinstance(source, bytes) else source.stat().st_mtime
+                info = zipfile.ZipInfo(arcname, date_time=time.localtime(mtime)[:6])
+                info.external_attr = 0o600 << 16
+                info.compress_type = zipfile.ZIP_STORED \
+                    if Path(arcname).suffix in _STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+
+                with archive.open(info, "w") as member:
+                    if isinstance(source, bytes):
+                        member.write(source)
+                    else:
+                        with open(source, "rb") as f:
+                            for block in iter(lambda: f.read(chunk_size), b""):
+                                member.write(block)
+                                if sink.buffered >= chunk_size:
+                                    yield sink.drain()
+
+                # Send the first member straight away, then full chunks
+                if sink.buffered >= chunk_size or not started:
+                    started = True
+                    yield sink.drain()
+
+    # Central directory
+    tail = sink.drain()
+    if tail:
+        yield tail
+
+
+def write_client_archive(dest, clients_dir: Union[str, Path],
+                         names: Optional[Iterable[str]] = None,
+                         qr_cache: Optional[QRCodeCache] = None) -> int:
+    """
+    Write a client archive to an open binary file object.
+
+    Returns:
+        Number of bytes written
+    """
+    total = 0
+    for chunk in stream_client_archive(clients_dir, names, qr_cache):
+        dest.write(chunk)
+        total += len(chunk)
+    return total
@@ -0,0 +1,364 @@
+"""
+Fleet Status Collection
+
+Collects `wg show all dump` from many VPN servers concurrently with
+asyncio, so a refresh takes as long as the slowest server rather than
+the sum of all of them. Each server keeps its last good result, and
+views report how stale it is when a refresh fails.
+"""
+
+import asyncio
+import inspect
+import json
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional, Tuple, Union
+
+from .wg_status import CONNECTED_THRESHOLD, InterfaceState, PeerState, parse_wg_dump
+
+# Seconds allowed for one server's collection
+DEFAULT_TIMEOUT = 10.0
+
+# Extra time the collector allows before cancelling a transport that
+# overruns its own timeout
+TIMEOUT_GRACE = 1.0
+
+WG_DUMP_COMMAND = ("wg", "show", "all", "dump")
+
+
+class TransportError(Exception):
+    """Raised when a server's status cannot be collected."""
+
+
+async def _exec(args, timeout: float) -> str:
+    proc = await asyncio.create_subprocess_exec(
+        *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        raise TransportError(f"timed out after {timeout:g}s")
+    finally:
+        # Also runs when the caller is cancelled, so no ssh/wg child outlives a refresh
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+    if proc.returncode != 0:
+        message = stderr.decode(errors="replace").strip() or f"exit status {proc.returncode}"
+        raise TransportError(message)
+    return stdout.decode()
+
+
+class LocalTransport:
+    """Runs `wg` on this host."""
+
+    kind = "local"
+
+    async def dump(self, timeout: float) -> str:
+        try:
+            return await _exec(WG_DUMP_COMMAND, timeout)
+        except FileNotFoundError as e:
+            raise TransportError(str(e))
+
+
+class SSHTransport:
+    """
+    Runs `wg` on a remote host through the system ssh client.
+
+    Connections are multiplexed (ControlMaster), so refreshes after the
+    first skip the SSH handshake.
+    """
+
+    kind = "ssh"
+
+    def __init__(self, host: str, user: Optional[str] = None, port: int = 22,
+                 identity_file: Optional[str] = None, sudo: bool = False):
+        self.host = host
+        self.user = user
+        self.port = port
+        self.identity_file = identity_file
+        self.sudo = sudo
+
+    def command(self, timeout: float) -> List[str]:
+        args = [
+            "ssh", "-o", "BatchMode=yes",
+            "-o", f"ConnectTimeout={max(1, int(timeout))}",
+            "-o", "ControlMaster=auto", "-o", "ControlPersist=120",
+            "-o", "ControlPath=~/.ssh/vpn-fleet-%C",
+            "-p", str(self.port),
+        ]
+        if self.identity_file:
+            args += ["-i", self.identity_file]
+        # "--" keeps a host starting with "-" from being read as an option
+        args += ["--", f"{self.user}@{self.host}" if self.user else self.host]
+        args.append(" ".join((("sudo", "-n") if self.sudo else ()) + WG_DUMP_COMMAND))
+        return args
+
+    async def dump(self, timeout: float) -> str:
+        try:
+            return await _exec(self.command(timeout), timeout)
+        except FileNotFoundError as e:
+            raise TransportError(str(e))
+
+
+class AgentTransport:
+    """Fetches a sanitized dump from another dashboard's /api/server/dump."""
+
+    kind = "agent"
+
+    def __init__(self, url: str, token: Optional[str] = None):
+        self.url = url
+        self.token = token
+
+    def _fetch(self, timeout: float) -> str:
+        req = urllib.request.Request(self.url)
+        if self.token:
+            req.add_header("Authorization", f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as response:
+                return response.read().decode()
+        except OSError as e:
+            raise TransportError(str(e))
+
+    async def dump(self, timeout: float) -> str:
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(None, self._fetch, timeout), timeout)
+        except asyncio.TimeoutError:
+            raise TransportError(f"timed out after {timeout:g}s")
+
+
+class StubTransport:
+    """Returns canned output after an optional delay (for tests and demos)."""
+
+    kind = "stub"
+
+    def __init__(self, output: Union[str, Callable[[], str]] = "", delay: float = 0.0,
+                 error: Optional[str] = None):
+        self.output = output
+        self.delay = delay
+        self.error = error
+
+    async def dump(self, timeout: float) -> str:
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise TransportError(self.error)
+        return self.output() if callable(self.output) else self.output
+
+
+TRANSPORTS = {
+    "local": LocalTransport,
+    "ssh": SSHTransport,
+    "agent": AgentTransport,
+    "stub": StubTransport,
+}
+
+
+@dataclass(frozen=True)
+class FleetServer:
+    """One server in the fleet file."""
+
+    name: str
+    transport: object
+
+
+def _check_options(name: str, transport: type, options: dict):
+    """Raise ValueError unless options match the transport's constructor."""
+    parameters = dict(inspect.signature(transport).parameters)
+    unknown = sorted(set(options) - set(parameters))
+    if unknown:
+        raise ValueError(f"Unknown {transport.kind} options for {name}: {', '.join(unknown)}")
+    missing = [key for key, parameter in parameters.items()
+               if parameter.default is inspect.Parameter.empty and key not in options]
+    if missing:
+        raise ValueError(f"Missing {transport.kind} options for {name}: {', '.join(missing)}")
+
+
+def load_fleet(path: Union[str, Path]) -> List[FleetServer]:
+    """
+    Load servers from a JSON fleet file.
+
+    The file holds {"servers": [{"name": ..., "transport": "ssh",
+    "host": ...}, ...]}; every key besides name and transport is passed
+    to the transport's constructor.
+
+    Raises:
+        ValueError: If a server has no name, an unknown transport, or
+            options its transport does not take or requires
+    """
+    data = json.loads(Path(path).read_text())
+    servers = []
+    for entry in data.get("servers", []):
+        entry = dict(entry)
+        name = entry.pop("name", None)
+        kind = entry.pop("transport", "ssh")
+        if not name:
+            raise ValueError("Every fleet server needs a name")
+        if kind not in TRANSPORTS:
+            raise ValueError(f"Unknown transport for {name}: {kind}")
+        _check_options(name, TRANSPORTS[kind], entry)
+        servers.append(FleetServer(name, TRANSPORTS[kind](**entry)))
+    return servers
+
+
+@dataclass(frozen=True)
+class ServerState:
+    """Latest collection result for one server."""
+
+    name: str
+    kind: str
+    interfaces: Mapping[str, InterfaceState] = field(default_factory=lambda: MappingProxyType({}))
+    error: Optional[str] = None
+    attempted_at: float = 0.0
+    last_success: Optional[float] = None
+    duration: float = 0.0
+
+    def peers(self) -> Tuple[PeerState, ...]:
+        return tuple(peer for state in self.interfaces.values() for peer in state.peers)
+
+    def staleness(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds since the data was last collected successfully."""
+        if self.last_success is None:
+            return None
+        return (time.time() if now is None else now) - self.last_success
+
+
+class FleetCollector:
+    """Collects every server concurrently, keeping last good data on failure."""
+
+    def __init__(self, servers: List[FleetServer], timeout: float = DEFAULT_TIMEOUT):
+        self.servers = servers
+        self.timeout = timeout
+        self.states: Dict[str, ServerState] = {
+            server.name: ServerState(server.name, server.transport.kind) for server in servers
+        }
+
+    async def _collect_one(self, server: FleetServer) -> ServerState:
+        previous = self.states[server.name]
+        started = time.time()
+        try:
+            # Transports enforce the timeout themselves; this only catches one that does not
+            output = await asyncio.wait_for(server.transport.dump(self.timeout),
+                                            self.timeout + TIMEOUT_GRACE)
+            interfaces = MappingProxyType(parse_wg_dump(output))
+            return ServerState(server.name, server.transport.kind, interfaces,
+                               attempted_at=started, last_success=started,
+                               duration=time.time() - started)
+        except (TransportError, asyncio.TimeoutError, OSError) as e:
+            if isinstance(e, asyncio.TimeoutError):
+                message = f"timed out after {self.timeout:g}s"
+            else:
+                message = str(e) or type(e).__name__
+            # Keep serving the last good interfaces, marked with the error
+            return ServerState(server.name, server.transport.kind, previous.interfaces,
+                               error=message, attempted_at=started,
+                               last_success=previous.last_success,
+                               duration=time.time() - started)
+
+    async def collect(self) -> Dict[str, ServerState]:
+        """Refresh all servers at once and return the new states."""
+        results = await asyncio.gather(*(self._collect_one(server) for server in self.servers))
+        self.states = {state.name: state for state in results}
+        return self.states
+
+    def collect_sync(self) -> Dict[str, ServerState]:
+        return asyncio.run(self.collect())
+
+
+class FleetPoller:
+    """
+    Background thread refreshing a FleetCollector at a fixed cadence.
+
+    Readers take `poller.states` (an immutable mapping rebound after
+    each refresh) and `poller.seq` without locking.
+    """
+
+    def __init__(self, collector: FleetCollector, interval: float = 30.0):
+        self.collector = collector
+        self.interval = interval
+        self.states: Mapping[str, ServerState] = MappingProxyType(dict(collector.states))
+        self.seq = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> Mapping[str, ServerState]:
+        states = MappingProxyType(dict(self.collector.collect_sync()))
+        self.states = states
+        self.seq += 1
+        return states
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="fleet-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.collector.timeout + 5)
+            self._thread = None
+
+    def _run(self):
+        next_poll = time.monotonic()
+        while not self._stop.wait(max(0.0, next_poll - time.monotonic())):
+            self.refresh()
+            next_poll += self.interval
+            now = time.monotonic()
+            if next_poll < now:
+                next_poll = now + self.interval
+
+
+def fleet_summary(states: Mapping[str, ServerState], stale_after: float,
+                  now: Optional[float] = None) -> Dict:
+    """
+    Aggregate server states into one view.
+
+    Args:
+        states: Server name -> ServerState
+        stale_after: Seconds after which a server's data is flagged stale
+        now: Reference time (default: current time)
+
+    Returns:
+        Dictionary with per-server rows and fleet-wide totals
+    """
+    now = time.time() if now is None else now
+    rows = []
+    totals = {"servers": len(states), "reachable": 0, "peers": 0, "connected": 0,
+              "rx_bytes": 0, "tx_bytes": 0}
+
+    for name in sorted(states):
+        state = states[name]
+        peers = state.peers()
+        connected = sum(peer.is_connected(now, CONNECTED_THRESHOLD) for peer in peers)
+        rx = sum(peer.rx_bytes for peer in peers)
+        tx = sum(peer.tx_bytes for peer in peers)
+        staleness = state.staleness(now)
+        rows.append({
+            "name": name,
+            "transport": state.kind,
+            "ok": state.error is None and state.last_success is not None,
+            "error": state.error,
+            "interfaces": sorted(state.interfaces),
+            "peers": len(peers),
+            "connected": connected,
+            "rx_bytes": rx,
+            "tx_bytes": tx,
+            "staleness": round(staleness, 1) if staleness is not None else None,
+            "stale": staleness is None or staleness > stale_after,
+            "duration_ms": round(state.duration * 1e3, 1),
+        })
+        totals["reachable"] += rows[-1]["ok"]
+        totals["peers"] += len(peers)
+        totals["connected"] += connected
+        totals["rx_bytes"] += rx
+        totals["tx_bytes"] += tx
+
+    return {"servers": rows, "totals": totals}
@@ -0,0 +1,172 @@
+"""
+IP Address Allocator
+
+Tracks client address leases inside a VPN network without enumerating
+every host address.
+"""
+
+import heapq
+import ipaddress
+from typing import Dict, Iterator, List, Tuple, Union
+
+Address = Union[str, ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+LEASE = "lease"
+RESERVED = "reserved"
+
+
+class IPAllocator:
+    """
+    Allocates host addresses from a network by integer offset.
+
+    Taken offsets live in a dict and explicit reservations in a short
+    list of ranges. New allocations advance a high-water cursor, while
+    released offsets below the cursor go onto a min-heap and are handed
+    out first. Each allocation is O(1) amortized and memory grows with
+    the number of leases, never with the size of the network, so /16
+    IPv4 and /64 IPv6 pools behave the same as a /24.
+    """
+
+    def __init__(self, network: Union[str, ipaddress.IPv4Network, ipaddress.IPv6Network],
+                 reserve_server: bool = True):
+        self.network = ipaddress.ip_network(network)
+        self._base = int(self.network.network_address)
+        self.first_offset, self.last_offset = self._host_bounds()
+        self._taken: Dict[int, str] = {}
+        self._reserved_ranges: List[Tuple[int, int]] = []
+        self._freed: List[int] = []
+        self._cursor = self.first_offset
+
+        # The first host is conventionally the server (.1)
+        if reserve_server:
+            self.reserve(self.address_of(self.first_offset))
+
+    def _host_bounds(self) -> Tuple[int, int]:
+        """Return the first and last usable host offsets, matching hosts()."""
+        size = self.network.num_addresses
+        if size <= 2:
+            return 0, size - 1
+        if self.network.version == 4:
+            return 1, size - 2
+        # IPv6 hosts() skips only the subnet-router anycast address
+        return 1, size - 1
+
+    def offset_of(self, address: Address) -> int:
+        """Convert a host address to its offset from the network address."""
+        ip = ipaddress.ip_address(address)
+        offset = int(ip) - self._base
+        if ip.version != self.network.version or not self.first_offset <= offset <= self.last_offset:
+            raise ValueError(f"{address} is not a host address in {self.network}")
+        return offset
+
+    def address_of(self, offset: int) -> str:
+        """Convert an offset from the network address to an address string."""
+        return str(ipaddress.ip_address(self._base + offset))
+
+    def _reserved_range_end(self, offset: int) -> int:
+        """Return the last offset of a reserved range containing offset, or -1."""
+        for start, end in self._reserved_ranges:
+            if start <= offset <= end:
+                return end
+        return -1
+
+    def _is_free(self, offset: int) -> bool:
+        return offset not in self._taken and self._reserved_range_end(offset) < 0
+
+    def contains(self, address: Address) -> bool:
+        """Check whether an address is a usable host address in the network."""
+        try:
+            self.offset_of(address)
+            return True
+        except ValueError:
+            return False
+
+    def is_allocated(self, address: Address) -> bool:
+        """Check whether an address is leased or reserved."""
+        return not self._is_free(self.offset_of(address))
+
+    def allocate(self) -> str:
+        """
+        Allocate the lowest released address, or the next never-used one.
+
+        Returns:
+            Allocated address as a string
+        """
+        while self._freed:
+            offset = heapq.heappop(self._freed)
+            if self._is_free(offset):
+                self._taken[offset] = LEASE
+                return self.address_of(offset)
+
+        while self._cursor <= self.last_offset:
+            offset = self._cursor
+            range_end = self._reserved_range_end(offset)
+            if range_end >= 0:
+                self._cursor = range_end + 1
+                continue
+            self._cursor += 1
+            if offset not in self._taken:
+                self._taken[offset] = LEASE
+                return self.address_of(offset)
+
+        raise ValueError("No available IP addresses in the network")
+
+    def pin(self, address: Address) -> str:
+        """
+        Lease a specific address (a /32 or /128 pin).
+
+        Raises:
+            ValueError: If the address is outside the network or already taken
+        """
+        offset = self.offset_of(address)
+        if not self._is_free(offset):
+            raise ValueError(f"IP address already allocated: {address}")
+        self._taken[offset] = LEASE
+        return self.address_of(offset)
+
+    def reserve(self, target: Union[Address, ipaddress.IPv4Network, ipaddress.IPv6Network]):
+        """
+        Reserve an address or a whole subnet so it is never leased.
+
+        Args:
+            target: Address or subnet (e.g. "10.0.0.1" or "10.0.0.240/28")
+        """
+        if (isinstance(target, str) and "/" in target) or \
+                isinstance(target, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
+            subnet = ipaddress.ip_network(target, strict=False)
+            if not subnet.subnet_of(self.network):
+                raise ValueError(f"{subnet} is not inside {self.network}")
+            start = max(int(subnet.network_address) - self._base, self.first_offset)
+            end = min(int(subnet.broadcast_address) - self._base, self.last_offset)
+            self._reserved_ranges.append((start, end))
+        else:
+            self._taken[self.offset_of(target)] = RESERVED
+
+    def release(self, address: Address):
+        """
+        Release a leased address so it can be allocated again.
+
+        Raises:
+            ValueError: If the address is not currently leased
+        """
+        offset = self.offset_of(address)
+        if self._taken.get(offset) != LEASE:
+            raise ValueError(f"IP address is not leased: {address}")
+        del self._taken[offset]
+        if offset < self._cursor:
+            heapq.heappush(self._freed, offset)
+
+    def leases(self) -> Iterator[str]:
+        """Iterate over leased addresses."""
+        for offset, kind in self._taken.items():
+            if kind == LEASE:
+                yield self.address_of(offset)
+
+    def __len__(self) -> int:
+        return sum(1 for kind in self._taken.values() if kind == LEASE)
+
+    def __contains__(self, address: Address) -> bool:
+        try:
+            return self._taken.get(self.offset_of(address)) == LEASE
+        except ValueError:
+            return False
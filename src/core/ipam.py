@@ -0,0 +1,473 @@
+"""
+Persistent IP Address Management Store
+
+SQLite-backed lease database shared by the CLI, the web dashboard and
+scripts so every entry point sees the same address assignments. A pool
+created on an existing deployment is seeded from the addresses already
+written in client configs and the server's wg0.conf.
+"""
+
+import ipaddress
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from .ip_allocator import Address, IPAllocator
+
+IPAM_DB_NAME = "ipam.db"
+
+SERVER_LEASE = "__server__"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pools (
+    network TEXT PRIMARY KEY,
+    cursor TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    network TEXT NOT NULL,
+    offset TEXT NOT NULL,
+    address TEXT NOT NULL,
+    client_name TEXT,
+    kind TEXT NOT NULL DEFAULT 'lease',
+    created TEXT NOT NULL,
+    PRIMARY KEY (network, offset)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS leases_client
+    ON leases (network, client_name) WHERE client_name IS NOT NULL;
+CREATE TABLE IF NOT EXISTS freed (
+    network TEXT NOT NULL,
+    offset TEXT NOT NULL,
+    PRIMARY KEY (network, offset)
+);
+"""
+
+
+def _normalize(network: str) -> str:
+    """Return the canonical CIDR string used as the pool key."""
+    return str(ipaddress.ip_network(network))
+
+
+def _read_sections(path: Path) -> List[Dict[str, str]]:
+    """Split a WireGuard config into sections of lower-cased keys.
+
+    The first comment of each section is kept under "#" (peer names).
+    """
+    sections = []
+    for raw in path.read_text(errors="replace").splitlines():
+        line = raw.strip()
+        if line.startswith("[") and line.endswith("]"):
+            sections.append({"[": line[1:-1].strip().lower()})
+        elif sections and line.startswith("#"):
+            sections[-1].setdefault("#", line.lstrip("#").strip())
+        elif sections and "=" in line:
+            key, _, value = line.partition("=")
+            sections[-1][key.strip().lower()] = value.strip()
+    return sections
+
+
+def _hosts(value: str) -> List[str]:
+    """Host addresses in an Address/AllowedIPs list (subnets are skipped)."""
+    hosts = []
+    for item in value.split(","):
+        try:
+            interface = ipaddress.ip_interface(item.strip())
+        except ValueError:
+            continue
+        if interface.network.num_addresses == 1 or interface.ip != interface.network.network_address:
+            hosts.append(str(interface.ip))
+    return hosts
+
+
+def _peer_name(comment: Optional[str]) -> Optional[str]:
+    """Client name from a `# Client: name` / `# Peer: name (...)` comment."""
+    if not comment or ":" not in comment:
+        return None
+    name = comment.split(":", 1)[1].split(" (", 1)[0].strip()
+    try:
+        ipaddress.ip_address(name)
+        return None
+    except ValueError:
+        return name or None
+
+
+def discover_addresses(root: Union[str, Path]) -> List[Tuple[str, Optional[str], str]]:
+    """
+    Find the addresses existing configs under a keys directory already use.
+
+    Looks at `*.conf`, `*/*.conf`, `clients/*.conf` and `clients/*/*.conf`.
+    Server configs (an [Interface] with a ListenPort) contribute their own
+    address and every peer's AllowedIPs; client configs contribute their
+    [Interface] Address, named after their directory (or file, when they
+    sit directly in clients/).
+
+    Args:
+        root: Directory holding ipam.db, wg0.conf and clients/
+
+    Returns:
+        (address, client name or None, "server" | "client") tuples, client
+        configs first
+    """
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    clients_dir = root / "clients"
+    files = []
+    for pattern in ("clients/*/*.conf", "clients/*.conf", "*/*.conf", "*.conf"):
+        files.extend(path for path in sorted(root.glob(pattern)) if path not in files)
+
+    # Peers in server configs are named by their saved public key when possible
+    key_names = {}
+    for pattern in ("clients/*/public.key", "*/public.key"):
+        for key_file in root.glob(pattern):
+            try:
+                key_names.setdefault(key_file.read_text().strip(), key_file.parent.name)
+            except OSError:
+                continue
+
+    clients, servers = [], []
+    for path in files:
+        try:
+            sections = _read_sections(path)
+        except OSError:
+            continue
+        interface = next((section for section in sections if section["["] == "interface"), None)
+        if interface is None:
+            continue
+        if "listenport" in interface:
+            servers.extend((address, None, "server") for address in _hosts(interface.get("address", "")))
+            for peer in sections:
+                if peer["["] != "peer":
+                    continue
+                name = key_names.get(peer.get("publickey")) or _peer_name(peer.get("#"))
+                servers.extend((address, name, "client") for address in _hosts(peer.get("allowedips", "")))
+        else:
+            name = path.stem if path.parent in (root, clients_dir) else path.parent.name
+            clients.extend((address, name, "client") for address in _hosts(interface.get("address", "")))
+    return clients + servers
+
+
+class IPAMStore:
+    """
+    Durable lease store with atomic allocation.
+
+    Every mutation runs inside a `BEGIN IMMEDIATE` transaction, so the
+    read-cursor/insert-lease sequence is a single compare-and-set across
+    threads and processes; the (network, offset) primary key rejects any
+    duplicate that slips through. Offsets are stored as fixed-width hex
+    so IPv6 /64 pools sort correctly, and every lookup is a B-tree probe.
+
+    Args:
+        db_path: SQLite database file
+        timeout: Seconds to wait for another writer's lock
+        seed_dir: Keys directory whose existing configs seed new pools
+            (see discover_addresses); defaults to the database's directory
+    """
+
+    def __init__(self, db_path: Union[str, Path], timeout: float = 30.0,
+                 seed_dir: Optional[Union[str, Path]] = None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self.seed_dir = Path(seed_dir) if seed_dir is not None else self.db_path.parent
+        self._local = threading.local()
+        self._allocators: Dict[str, IPAllocator] = {}
+
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=self.timeout,
+                                   isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._connect())
+
+    def _pool(self, network: str) -> IPAllocator:
+        """Return an allocator used for offset math on a network."""
+        if network not in self._allocators:
+            self._allocators[network] = IPAllocator(network, reserve_server=False)
+        return self._allocators[network]
+
+    @staticmethod
+    def _key(pool: IPAllocator, offset: int) -> str:
+        width = 8 if pool.network.version == 4 else 32
+        return format(offset, f"0{width}x")
+
+    def _ensure_pool(self, conn: sqlite3.Connection, network: str,
+                     reserve_server: bool) -> IPAllocator:
+        pool = self._pool(network)
+        row = conn.execute("SELECT cursor FROM pools WHERE network = ?", (network,)).fetchone()
+        if row is None:
+            conn.execute("INSERT INTO pools (network, cursor) VALUES (?, ?)",
+                         (network, self._key(pool, pool.first_offset)))
+            self._seed(conn, pool, network, reserve_server)
+        return pool
+
+    def _seed(self, conn: sqlite3.Connection, pool: IPAllocator, network: str,
+              reserve_server: bool):
+        """Lease the addresses existing configs already use in a new pool."""
+        found = [(pool.offset_of(address), name, role)
+                 for address, name, role in discover_addresses(self.seed_dir)
+                 if pool.contains(address)]
+
+        # The server keeps the address in its config, else the first host (.1)
+        if reserve_server:
+            server = next((offset for offset, _, role in found if role == "server"),
+                          pool.first_offset)
+            self._insert(conn, pool, network, server, SERVER_LEASE, "reserved")
+
+        for offset, name, role in found:
+            if role == "server":
+                self._insert(conn, pool, network, offset, None, "reserved")
+                continue
+            try:
+                self._insert(conn, pool, network, offset, name)
+            except ValueError:
+                # The client already holds an address here; still keep this one out of the pool
+                self._insert(conn, pool, network, offset, None)
+
+    def _insert(self, conn: sqlite3.Connection, pool: IPAllocator, network: str,
+                offset: int, client_name: Optional[str], kind: str = "lease") -> bool:
+        """Insert a lease row; returns False if the address is already taken."""
+        try:
+            conn.execute(
+                "INSERT INTO leases (network, offset, address, client_name, kind, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (network, self._key(pool, offset), pool.address_of(offset),
+                 client_name, kind, datetime.now().isoformat())
+            )
+            return True
+        except sqlite3.IntegrityError:
+            existing = conn.execute(
+                "SELECT 1 FROM leases WHERE network = ? AND offset = ?",
+                (network, self._key(pool, offset))
+            ).fetchone()
+            if existing is None:
+                raise ValueError(f"Client already has a lease in {network}: {client_name}")
+            return False
+
+    def allocate(self, network: str, client_name: Optional[str] = None,
+                 reserve_server: bool = True) -> str:
+        """
+        Allocate an address, reusing the client's existing lease if any.
+
+        Args:
+            network: Network in CIDR notation
+            client_name: Lease owner (leases are unique per client and network)
+            reserve_server: Reserve the first host when the pool is created
+
+        Returns:
+            Allocated address as a string
+        """
+        network = _normalize(network)
+        with self._transaction() as conn:
+            pool = self._ensure_pool(conn, network, reserve_server)
+
+            if client_name is not None:
+                row = conn.execute(
+                    "SELECT address FROM leases WHERE network = ? AND client_name = ?",
+                    (network, client_name)
+                ).fetchone()
+                if row is not None:
+                    return row["address"]
+
+            # Lowest released offset first
+            while True:
+                row = conn.execute(
+                    "SELECT offset FROM freed WHERE network = ? ORDER BY offset LIMIT 1",
+                    (network,)
+                ).fetchone()
+                if row is None:
+                    break
+                conn.execute("DELETE FROM freed WHERE network = ? AND offset = ?",
+                             (network, row["offset"]))
+                offset = int(row["offset"], 16)
+                if self._insert(conn, pool, network, offset, client_name):
+                    return pool.address_of(offset)
+
+            # Then advance the high-water cursor past pinned addresses
+            cursor = int(conn.execute("SELECT cursor FROM pools WHERE network = ?",
+                                      (network,)).fetchone()["cursor"], 16)
+            while cursor <= pool.last_offset:
+                offset = cursor
+                cursor += 1
+                if self._insert(conn, pool, network, offset, client_name):
+                    conn.execute("UPDATE pools SET cursor = ? WHERE network = ?",
+                                 (self._key(pool, cursor), network))
+                    return pool.address_of(offset)
+
+            raise ValueError("No available IP addresses in the network")
+
+    def pin(self, network: str, address: Address, client_name: Optional[str] = None,
+            kind: str = "lease", reserve_server: bool = True) -> str:
+        """
+        Lease a specific address to a client.
+
+        Re-pinning a client's current address is a no-op; pinning a client
+        that holds a different address moves its lease.
+
+        Raises:
+            ValueError: If the address is outside the network or held by
+                another client
+        """
+        network = _normalize(network)
+        with self._transaction() as conn:
+            pool = self._ensure_pool(conn, network, reserve_server)
+            offset = pool.offset_of(address)
+            key = self._key(pool, offset)
+
+            row = conn.execute(
+                "SELECT client_name FROM leases WHERE network = ? AND offset = ?",
+                (network, key)
+            ).fetchone()
+            if row is not None:
+                if client_name is not None and row["client_name"] == client_name:
+                    return pool.address_of(offset)
+                raise ValueError(f"IP address already allocated: {address}")
+
+            if client_name is not None:
+                self._release(conn, pool, network, client_name=client_name)
+            conn.execute("DELETE FROM freed WHERE network = ? AND offset = ?", (network, key))
+            self._insert(conn, pool, network, offset, client_name, kind)
+            return pool.address_of(offset)
+
+    def adopt(self, network: str, address: Address, client_name: str) -> str:
+        """
+        Give a client the address it is already using on the interface.
+
+        Unlike pin(), an unowned lease (an address seeded from an
+        existing config without a known client) is taken over.
+
+        Raises:
+            ValueError: If another client holds the address, or the
+                client already holds a different one
+        """
+        network = _normalize(network)
+        with self._transaction() as conn:
+            pool = self._ensure_pool(conn, network, True)
+            offset = pool.offset_of(address)
+            key = self._key(pool, offset)
+
+            row = conn.execute(
+                "SELECT client_name, kind FROM leases WHERE network = ? AND offset = ?",
+                (network, key)
+            ).fetchone()
+            current = conn.execute(
+                "SELECT address FROM leases WHERE network = ? AND client_name = ?",
+                (network, client_name)
+            ).fetchone()
+            if current is not None and current["address"] != pool.address_of(offset):
+                raise ValueError(f"{client_name} already holds {current['address']}")
+            if row is None:
+                conn.execute("DELETE FROM freed WHERE network = ? AND offset = ?", (network, key))
+                self._insert(conn, pool, network, offset, client_name)
+            elif row["client_name"] is None and row["kind"] == "lease":
+                conn.execute("UPDATE leases SET client_name = ? WHERE network = ? AND offset = ?",
+                             (client_name, network, key))
+            elif row["client_name"] != client_name:
+                raise ValueError(f"IP address already allocated: {address}")
+            return pool.address_of(offset)
+
+    def reserve(self, network: str, address: Address) -> str:
+        """Reserve an address so it is never allocated to a client."""
+        return self.pin(network, address, kind="reserved")
+
+    def _release(self, conn: sqlite3.Connection, pool: IPAllocator, network: str,
+                 address: Optional[Address] = None,
+                 client_name: Optional[str] = None) -> Optional[str]:
+        if address is not None:
+            row = conn.execute(
+                "SELECT offset, address FROM leases WHERE network = ? AND offset = ? AND kind = 'lease'",
+                (network, self._key(pool, pool.offset_of(address)))
+            ).fetchone()
+        else:
+            row = conn.execute(
+                "SELECT offset, address FROM leases WHERE network = ? AND client_name = ?",
+                (network, client_name)
+            ).fetchone()
+        if row is None:
+            return None
+
+        conn.execute("DELETE FROM leases WHERE network = ? AND offset = ?", (network, row["offset"]))
+        cursor = conn.execute("SELECT cursor FROM pools WHERE network = ?", (network,)).fetchone()
+        if cursor is not None and row["offset"] < cursor["cursor"]:
+            conn.execute("INSERT OR IGNORE INTO freed (network, offset) VALUES (?, ?)",
+                         (network, row["offset"]))
+        return row["address"]
+
+    def release(self, network: str, address: Optional[Address] = None,
+                client_name: Optional[str] = None) -> Optional[str]:
+        """
+        Release a lease by address or by client name.
+
+        Returns:
+            The released address, or None if no lease matched
+        """
+        if address is None and client_name is None:
+            raise ValueError("Specify an address or a client name to release")
+        network = _normalize(network)
+        with self._transaction() as conn:
+            return self._release(conn, self._pool(network), network, address, client_name)
+
+    def lookup(self, network: str, client_name: str) -> Optional[str]:
+        """Return the address leased to a client, if any."""
+        network = _normalize(network)
+        row = self._connect().execute(
+            "SELECT address FROM leases WHERE network = ? AND client_name = ?",
+            (network, client_name)
+        ).fetchone()
+        return row["address"] if row else None
+
+    def owner(self, network: str, address: Address) -> Optional[str]:
+        """Return the client holding an address, if any."""
+        network = _normalize(network)
+        pool = self._pool(network)
+        row = self._connect().execute(
+            "SELECT client_name FROM leases WHERE network = ? AND offset = ?",
+            (network, self._key(pool, pool.offset_of(address)))
+        ).fetchone()
+        return row["client_name"] if row else None
+
+    def leases(self, network: Optional[str] = None) -> List[Dict]:
+        """List leases, optionally restricted to one network, in address order."""
+        query = "SELECT network, address, client_name, kind, created FROM leases"
+        params = ()
+        if network is not None:
+            query += " WHERE network = ?"
+            params = (_normalize(network),)
+        query += " ORDER BY network, offset"
+        return [dict(row) for row in self._connect().execute(query, params)]
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class _ImmediateTransaction:
+    """Context manager running a block inside BEGIN IMMEDIATE ... COMMIT."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
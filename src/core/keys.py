@@ -7,27 +7,83 @@ Handles secure generation and management of WireGuard keys for VPN deployment.
 import os
 import subprocess
 import base64
+from abc import ABC, abstractmethod
 from pathlib import Path
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from typing import Tuple, Optional
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+from typing import Tuple, Optional, Union
 
+from .keystore import (
+    SALT_LENGTH, KeystoreSession, derive_key, format_encrypted_key, is_encrypted_key, split_encrypted_key,
+)
 
-class WireGuardKeyManager:
-    """Manages WireGuard key generation and encryption."""
+
+WG_KEY_LENGTH = 32
+
+
+class KeyBackend(ABC):
+    """Base class for WireGuard key generation backends."""
     
-    def __init__(self, output_dir: str = "/etc/wireguard"):
-        self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+    name = "base"
+    
+    @abstractmethod
+    def generate_key_pair(self) -> Tuple[str, str]:
+        """Return a (private_key, public_key) pair in `wg` base64 format."""
+    
+    @abstractmethod
+    def generate_preshared_key(self) -> str:
+        """Return a preshared key in `wg genpsk` base64 format."""
+    
+    @abstractmethod
+    def public_key(self, private_key: str) -> str:
+        """Derive the public key for a base64 private key."""
+
+
+class CryptographyKeyBackend(KeyBackend):
+    """
+    In-process Curve25519 backend built on the `cryptography` library.
+    
+    Produces the same 44-character base64 strings as `wg genkey`,
+    `wg pubkey` and `wg genpsk` without spawning any processes.
+    """
+    
+    name = "cryptography"
+    
+    @staticmethod
+    def _clamp(raw: bytes) -> bytes:
+        """Clamp a scalar exactly like `wg genkey` does."""
+        key = bytearray(raw)
+        key[0] &= 248
+        key[31] = (key[31] & 127) | 64
+        return bytes(key)
+    
+    def generate_key_pair(self) -> Tuple[str, str]:
+        private_raw = self._clamp(os.urandom(WG_KEY_LENGTH))
+        public_raw = X25519PrivateKey.from_private_bytes(private_raw).public_key().public_bytes(
+            Encoding.Raw, PublicFormat.Raw
+        )
+        return base64.b64encode(private_raw).decode(), base64.b64encode(public_raw).decode()
+    
+    def generate_preshared_key(self) -> str:
+        return base64.b64encode(os.urandom(WG_KEY_LENGTH)).decode()
+    
+    def public_key(self, private_key: str) -> str:
+        private_raw = base64.b64decode(private_key.strip())
+        if len(private_raw) != WG_KEY_LENGTH:
+            raise ValueError("Invalid WireGuard private key length")
+        public_raw = X25519PrivateKey.from_private_bytes(private_raw).public_key().public_bytes(
+            Encoding.Raw, PublicFormat.Raw
+        )
+        return base64.b64encode(public_raw).decode()
+
+
+class SubprocessKeyBackend(KeyBackend):
+    """Backend that shells out to the `wg` command line tools."""
+    
+    name = "wg"
     
     def generate_key_pair(self) -> Tuple[str, str]:
-        """
-        Generate a WireGuard private/public key pair.
-        
-        Returns:
-            Tuple of (private_key, public_key)
-        """
         # Generate private key
         private_key_result = subprocess.run(
             ["wg", "genkey"], 
@@ -37,6 +93,18 @@ class WireGuardKeyManager:
         )
         private_key = private_key_result.stdout.strip()
         
+        return private_key, self.public_key(private_key)
+    
+    def generate_preshared_key(self) -> str:
+        result = subprocess.run(
+            ["wg", "genpsk"], 
+            capture_output=True, 
+            text=True, 
+            check=True
+        )
+        return result.stdout.strip()
+    
+    def public_key(self, private_key: str) -> str:
         # Generate public key from private key
         public_key_result = subprocess.run(
             ["wg", "pubkey"], 
@@ -45,19 +113,57 @@ class WireGuardKeyManager:
             text=True, 
             check=True
         )
-        public_key = public_key_result.stdout.strip()
+        return public_key_result.stdout.strip()
+
+
+KEY_BACKENDS = {
+    CryptographyKeyBackend.name: CryptographyKeyBackend,
+    SubprocessKeyBackend.name: SubprocessKeyBackend,
+}
+
+
+def get_key_backend(backend: Union[str, KeyBackend, None] = "auto") -> KeyBackend:
+    """
+    Resolve a key backend by name.
+    
+    Args:
+        backend: "auto", "cryptography", "wg" or a KeyBackend instance.
+            "auto" uses the in-process backend; the `wg` tools remain
+            available as an explicit fallback.
+            
+    Returns:
+        KeyBackend instance
+    """
+    if isinstance(backend, KeyBackend):
+        return backend
+    if backend in (None, "auto"):
+        backend = CryptographyKeyBackend.name
+    if backend not in KEY_BACKENDS:
+        raise ValueError(f"Unknown key backend: {backend}")
+    return KEY_BACKENDS[backend]()
+
+
+class WireGuardKeyManager:
+    """Manages WireGuard key generation and encryption."""
+    
+    def __init__(self, output_dir: str = "/etc/wireguard",
+                 backend: Union[str, KeyBackend, None] = "auto"):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.backend = get_key_backend(backend)
+    
+    def generate_key_pair(self) -> Tuple[str, str]:
+        """
+        Generate a WireGuard private/public key pair.
         
-        return private_key, public_key
+        Returns:
+            Tuple of (private_key, public_key)
+        """
+        return self.backend.generate_key_pair()
     
     def generate_preshared_key(self) -> str:
         """Generate a WireGuard preshared key for additional security."""
-        result = subprocess.run(
-            ["wg", "genpsk"], 
-            capture_output=True, 
-            text=True, 
-            check=True
-        )
-        return result.stdout.strip()
+        return self.backend.generate_preshared_key()
     
     def encrypt_private_key(self, private_key: str, password: str) -> str:
         """
@@ -68,55 +174,74 @@ class WireGuardKeyManager:
             password: Password for encryption
             
         Returns:
-            Base64 encoded encrypted private key
+            Encrypted private key (format marker + base64 of salt and token)
         """
-        password_bytes = password.encode()
-        salt = os.urandom(16)
-        
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password_bytes))
+        salt = os.urandom(SALT_LENGTH)
+        key = base64.urlsafe_b64encode(derive_key(password.encode(), salt))
         fernet = Fernet(key)
         
         encrypted = fernet.encrypt(private_key.encode())
         # Combine salt and encrypted data
-        return base64.b64encode(salt + encrypted).decode()
+        return format_encrypted_key(salt, encrypted)
     
     def decrypt_private_key(self, encrypted_key: str, password: str) -> str:
         """
         Decrypt an encrypted private key.
         
+        Use open_session() instead when several keys are decrypted with
+        the same password.
+        
         Args:
-            encrypted_key: Base64 encoded encrypted private key
+            encrypted_key: Encrypted private key, with or without the format marker
             password: Password for decryption
             
         Returns:
             Decrypted private key
         """
-        password_bytes = password.encode()
-        encrypted_data = base64.b64decode(encrypted_key.encode())
-        
         # Extract salt and encrypted key
-        salt = encrypted_data[:16]
-        encrypted = encrypted_data[16:]
-        
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password_bytes))
+        salt, encrypted = split_encrypted_key(encrypted_key)
+        key = base64.urlsafe_b64encode(derive_key(password.encode(), salt))
         fernet = Fernet(key)
         
         return fernet.decrypt(encrypted).decode()
     
+    def open_session(self, password: str, **kwargs) -> KeystoreSession:
+        """
+        Open a keystore session that derives each encryption key once.
+        
+        Args:
+            password: Keystore password
+            **kwargs: KeystoreSession options (ttl, max_keys, workers)
+            
+        Returns:
+            KeystoreSession; close it (or use it as a context manager)
+            to wipe cached keys
+        """
+        return KeystoreSession(password, **kwargs)
+    
+    def load_server_private_key(self, name: str = "server",
+                                session: Optional[KeystoreSession] = None) -> str:
+        """
+        Load a server private key, decrypting it through a session if needed.
+        
+        Args:
+            name: Server name/identifier
+            session: Keystore session for encrypted keys
+            
+        Returns:
+            Private key
+        """
+        private_file = self.output_dir / f"{name}_private.key"
+        text = private_file.read_text().strip()
+        if not is_encrypted_key(text):
+            return text
+        if session is None:
+            raise ValueError(f"Private key is encrypted: {private_file}")
+        return session.decrypt(text)
+    
     def save_server_keys(self, name: str = "server", encrypt: bool = False, 
-                        password: Optional[str] = None) -> dict:
+                        password: Optional[str] = None,
+                        session: Optional[KeystoreSession] = None) -> dict:
         """
         Generate and save server keys.
         
@@ -124,6 +249,7 @@ class WireGuardKeyManager:
             name: Server name/identifier
             encrypt: Whether to encrypt the private key
             password: Password for encryption (required if encrypt=True)
+            session: Keystore session to encrypt with instead of password
             
         Returns:
             Dictionary with key information
@@ -136,7 +262,9 @@ class WireGuardKeyManager:
         public_file = self.output_dir / f"{name}_public.key"
         preshared_file = self.output_dir / f"{name}_preshared.key"
         
-        if encrypt and password:
+        if encrypt and session is not None:
+            private_file.write_text(session.encrypt(private_key))
+        elif encrypt and password:
             encrypted_private = self.encrypt_private_key(private_key, password)
             private_file.write_text(encrypted_private)
         else:
@@ -161,6 +289,32 @@ class WireGuardKeyManager:
             "encrypted": encrypt
         }
     
+    def load_client_keys(self, client_name: str) -> Optional[dict]:
+        """
+        Load previously saved client keys.
+        
+        Args:
+            client_name: Client identifier
+            
+        Returns:
+            Dictionary with client key information, or None if the client
+            has no saved key pair
+        """
+        client_dir = self.output_dir / "clients" / client_name
+        private_file = client_dir / "private.key"
+        public_file = client_dir / "public.key"
+        
+        if not (private_file.exists() and public_file.exists()):
+            return None
+        
+        return {
+            "client_name": client_name,
+            "private_key": private_file.read_text().strip(),
+            "public_key": public_file.read_text().strip(),
+            "private_file": str(private_file),
+            "public_file": str(public_file)
+        }
+    
     def save_client_keys(self, client_name: str) -> dict:
         """
         Generate and save client keys.
@@ -195,6 +349,27 @@ class WireGuardKeyManager:
             "public_file": str(public_file)
         }
 
+    
+    def save_client_preshared_key(self, client_name: str, preshared_key: str) -> str:
+        """
+        Save the preshared key a client's config was generated with.
+        
+        The server side reads it back when it adds or updates the peer.
+        
+        Args:
+            client_name: Client identifier
+            preshared_key: Base64 preshared key
+            
+        Returns:
+            Path of the preshared key file
+        """
+        client_dir = self.output_dir / "clients" / client_name
+        client_dir.mkdir(parents=True, exist_ok=True)
+        preshared_file = client_dir / "preshared.key"
+        preshared_file.write_text(preshared_key.strip())
+        os.chmod(preshared_file, 0o600)
+        return str(preshared_file)
+
 
 def check_wireguard_installation() -> bool:
     """Check if WireGuard tools are installed."""
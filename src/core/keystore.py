@@ -0,0 +1,272 @@
+"""
+Keystore Sessions
+
+Unlocks password-encrypted private keys while deriving each PBKDF2 key
+only once per session, fanning derivation out over worker processes
+when many keys are unlocked together.
+"""
+
+import base64
+import binascii
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+PBKDF2_ITERATIONS = 100000
+SALT_LENGTH = 16
+
+# A plain WireGuard key is 32 bytes of base64
+PLAIN_KEY_BYTES = 32
+
+# Prefix of every encrypted key written by this module; files written
+# before it existed are told apart by not being a plain key
+ENCRYPTED_KEY_PREFIX = "vpnkey-enc-v1:"
+
+
+def derive_key(password: bytes, salt: bytes, iterations: int = PBKDF2_ITERATIONS) -> bytes:
+    """
+    Derive a raw 32-byte encryption key with PBKDF2-HMAC-SHA256.
+
+    Module-level so it can be shipped to worker processes.
+    """
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        iterations=iterations,
+    )
+    return kdf.derive(bytes(password))
+
+
+def format_encrypted_key(salt: bytes, token: bytes) -> str:
+    """Return the stored form of an encrypted key: marker + base64(salt + fernet_token)."""
+    return ENCRYPTED_KEY_PREFIX + base64.b64encode(salt + token).decode()
+
+
+def split_encrypted_key(encrypted_key: str):
+    """Split a stored encrypted key (with or without the marker) into (salt, fernet_token)."""
+    text = encrypted_key.strip()
+    if text.startswith(ENCRYPTED_KEY_PREFIX):
+        text = text[len(ENCRYPTED_KEY_PREFIX):]
+    data = base64.b64decode(text.encode())
+    return data[:SALT_LENGTH], data[SALT_LENGTH:]
+
+
+def _is_plain_key(text: str) -> bool:
+    try:
+        return len(base64.b64decode(text, validate=True)) == PLAIN_KEY_BYTES
+    except (binascii.Error, ValueError):
+        return False
+
+
+def is_encrypted_key(text: str) -> bool:
+    """
+    Return True if a private key file holds an encrypted key.
+
+    Encrypted keys carry ENCRYPTED_KEY_PREFIX; an unmarked file is only
+    treated as encrypted (the pre-marker format) when it is not a plain
+    base64 WireGuard key.
+    """
+    text = text.strip()
+    if text.startswith(ENCRYPTED_KEY_PREFIX):
+        return True
+    return bool(text) and not _is_plain_key(text)
+
+
+class PartialReplaceError(OSError):
+    """Raised when replace_files() fails after some targets were replaced."""
+
+    def __init__(self, error: OSError, replaced: List[str]):
+        super().__init__(f"{error} (after replacing {len(replaced)} files)")
+        self.replaced = replaced
+
+
+def replace_files(contents: Dict[Union[str, Path], str], mode: int = 0o600):
+    """
+    Replace several files so that none changes unless all were written.
+
+    Every file is first written and synced to a temporary sibling; only
+    then are the temporaries renamed over their targets with os.replace.
+
+    Args:
+        contents: Mapping of path to new text
+        mode: Permissions of the new files
+
+    Raises:
+        OSError: If a temporary could not be written; no target changed
+        PartialReplaceError: If a rename failed; its `replaced` lists the
+            paths that already hold their new contents
+    """
+    staged = {}
+    try:
+        for path, text in contents.items():
+            path = Path(path)
+            fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.")
+            staged[path] = tmp
+            with os.fdopen(fd, "w") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp, mode)
+    except OSError:
+        for tmp in staged.values():
+            os.unlink(tmp)
+        raise
+
+    replaced = []
+    try:
+        for path, tmp in staged.items():
+            os.replace(tmp, path)
+            replaced.append(str(path))
+    except OSError as e:
+        for tmp in list(staged.values())[len(replaced):]:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        raise PartialReplaceError(e, replaced) from e
+
+
+def _wipe(buffer: bytearray):
+    for i in range(len(buffer)):
+        buffer[i] = 0
+
+
+class KeystoreSession:
+    """
+    Password-scoped cache of derived encryption keys.
+
+    Derived keys are cached per salt with a TTL and an LRU bound, and
+    are overwritten in place when they expire, are evicted or the
+    session is closed. New keys encrypted during a session share one
+    random session salt, so encrypting many keys costs one derivation.
+    Wiping is best effort: Fernet and PBKDF2 make short-lived immutable
+    copies that Python cannot clear.
+    """
+
+    def __init__(self, password: str, ttl: float = 300.0, max_keys: int = 64,
+                 workers: Optional[int] = None, iterations: int = PBKDF2_ITERATIONS):
+        self._password = bytearray(password.encode())
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.workers = workers or os.cpu_count() or 1
+        self.iterations = iterations
+        self._session_salt = os.urandom(SALT_LENGTH)
+        self._cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.derivations = 0
+        self.closed = False
+
+    def __enter__(self) -> "KeystoreSession":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _check_open(self):
+        if self.closed:
+            raise RuntimeError("Keystore session is closed")
+
+    def _cached(self, salt: bytes) -> Optional[bytearray]:
+        entry = self._cache.get(salt)
+        if entry is None:
+            return None
+        key, expires = entry
+        if time.monotonic() >= expires:
+            del self._cache[salt]
+            _wipe(key)
+            return None
+        self._cache.move_to_end(salt)
+        return key
+
+    def _store(self, salt: bytes, key: bytes) -> bytearray:
+        stored = bytearray(key)
+        self._cache[salt] = (stored, time.monotonic() + self.ttl)
+        self._cache.move_to_end(salt)
+        while len(self._cache) > self.max_keys:
+            _, (evicted, _) = self._cache.popitem(last=False)
+            _wipe(evicted)
+        self.derivations += 1
+        return stored
+
+    def _fernet(self, salt: bytes) -> Fernet:
+        with self._lock:
+            self._check_open()
+            key = self._cached(salt)
+            if key is None:
+                key = self._store(salt, derive_key(self._password, salt, self.iterations))
+            return Fernet(base64.urlsafe_b64encode(bytes(key)))
+
+    def prefetch(self, salts: Iterable[bytes]) -> int:
+        """
+        Derive keys for all uncached salts, in parallel when worthwhile.
+
+        Returns:
+            Number of keys derived
+        """
+        with self._lock:
+            self._check_open()
+            missing = list(dict.fromkeys(s for s in salts if self._cached(s) is None))
+            if not missing:
+                return 0
+
+            if len(missing) == 1 or self.workers == 1:
+                keys = [derive_key(self._password, salt, self.iterations) for salt in missing]
+            else:
+                password = bytes(self._password)
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(missing))) as executor:
+                    keys = list(executor.map(derive_key, [password] * len(missing), missing,
+                                             [self.iterations] * len(missing)))
+
+            for salt, key in zip(missing, keys):
+                self._store(salt, key)
+            return len(missing)
+
+    def encrypt(self, private_key: str) -> str:
+        """
+        Encrypt a private key with the session password.
+
+        Returns:
+            Marked base64 of salt + Fernet token, the format used by
+            WireGuardKeyManager.encrypt_private_key
+        """
+        token = self._fernet(self._session_salt).encrypt(private_key.encode())
+        return format_encrypted_key(self._session_salt, token)
+
+    def decrypt(self, encrypted_key: str) -> str:
+        """Decrypt one encrypted private key."""
+        salt, token = split_encrypted_key(encrypted_key)
+        return self._fernet(salt).decrypt(token).decode()
+
+    def decrypt_many(self, encrypted_keys: List[str]) -> List[str]:
+        """Decrypt several keys, deriving all missing keys up front in parallel."""
+        self.prefetch(split_encrypted_key(k)[0] for k in encrypted_keys)
+        return [self.decrypt(k) for k in encrypted_keys]
+
+    def unlock_files(self, paths: Iterable[Union[str, Path]]) -> Dict[str, str]:
+        """
+        Read and decrypt private key files; plain keys are returned as-is.
+
+        Returns:
+            Mapping of path to decrypted private key
+        """
+        contents = {str(path): Path(path).read_text().strip() for path in paths}
+        encrypted = {path: text for path, text in contents.items() if is_encrypted_key(text)}
+        unlocked = dict(zip(encrypted, self.decrypt_many(list(encrypted.values()))))
+        return {path: unlocked.get(path, text) for path, text in contents.items()}
+
+    def close(self):
+        """Wipe the password and every cached derived key."""
+        with self._lock:
+            for key, _ in self._cache.values():
+                _wipe(key)
+            self._cache.clear()
+            _wipe(self._password)
+            self.closed = True
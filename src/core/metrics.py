@@ -0,0 +1,133 @@
+"""
+Prometheus Metrics
+
+Renders WireGuard poller snapshots in the Prometheus text exposition
+format. A scrape never runs `wg`: the text is built from the latest
+in-memory snapshot and reused until the poller publishes a new one.
+"""
+
+import threading
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from .wg_status import WireGuardPoller, WireGuardSnapshot
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (version, public key -> client name); version changes whenever the mapping does
+NameSource = Callable[[], Tuple[int, Mapping[str, str]]]
+
+_HELP = (
+    ("wireguard_up", "gauge", "Whether the last poll saw a WireGuard interface."),
+    ("wireguard_snapshot_seq", "gauge", "Poller snapshot sequence number."),
+    ("wireguard_snapshot_timestamp_seconds", "gauge", "Unix time the snapshot was taken."),
+    ("wireguard_peers", "gauge", "Configured peers per interface."),
+    ("wireguard_peers_connected", "gauge", "Peers with a recent handshake per interface."),
+    ("wireguard_interface_receive_bytes_total", "counter", "Bytes received from all peers."),
+    ("wireguard_interface_transmit_bytes_total", "counter", "Bytes sent to all peers."),
+    ("wireguard_peer_receive_bytes_total", "counter", "Bytes received from the peer."),
+    ("wireguard_peer_transmit_bytes_total", "counter", "Bytes sent to the peer."),
+    ("wireguard_peer_latest_handshake_seconds", "gauge", "Unix time of the latest handshake (0 if none)."),
+    ("wireguard_peer_handshake_age_seconds", "gauge", "Seconds since the latest handshake at poll time."),
+    ("wireguard_peer_connected", "gauge", "Whether the peer handshook recently."),
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def render_prometheus(snapshot: WireGuardSnapshot,
+                      names: Optional[Mapping[str, str]] = None) -> str:
+    """
+    Render one snapshot as Prometheus exposition text.
+
+    Handshake age and connection state are evaluated at poll time, so
+    the output depends only on the snapshot and the name mapping.
+
+    Args:
+        snapshot: Poller snapshot to render
+        names: Optional public key -> client name mapping for a "name" label
+
+    Returns:
+        Exposition text ending with a newline
+    """
+    names = names or {}
+    now = snapshot.taken_at
+    series: Dict[str, List[str]] = {name: [] for name, _, _ in _HELP}
+
+    series["wireguard_up"].append(f"wireguard_up {int(snapshot.running)}")
+    series["wireguard_snapshot_seq"].append(f"wireguard_snapshot_seq {snapshot.seq}")
+    series["wireguard_snapshot_timestamp_seconds"].append(
+        f"wireguard_snapshot_timestamp_seconds {snapshot.taken_at:.3f}")
+
+    for interface, state in snapshot.interfaces.items():
+        iface = f'interface="{_escape(interface)}"'
+        connected = rx_total = tx_total = 0
+        rx_lines = series["wireguard_peer_receive_bytes_total"]
+        tx_lines = series["wireguard_peer_transmit_bytes_total"]
+        latest_lines = series["wireguard_peer_latest_handshake_seconds"]
+        age_lines = series["wireguard_peer_handshake_age_seconds"]
+        connected_lines = series["wireguard_peer_connected"]
+
+        for peer in state.peers:
+            labels = f'{iface},public_key="{peer.public_key}"'
+            name = names.get(peer.public_key)
+            if name is not None:
+                labels += f',name="{_escape(name)}"'
+            is_connected = peer.is_connected(now)
+            connected += is_connected
+            rx_total += peer.rx_bytes
+            tx_total += peer.tx_bytes
+
+            rx_lines.append(f"wireguard_peer_receive_bytes_total{{{labels}}} {peer.rx_bytes}")
+            tx_lines.append(f"wireguard_peer_transmit_bytes_total{{{labels}}} {peer.tx_bytes}")
+            latest_lines.append(f"wireguard_peer_latest_handshake_seconds{{{labels}}} {peer.latest_handshake}")
+            if peer.latest_handshake:
+                age_lines.append(f"wireguard_peer_handshake_age_seconds{{{labels}}} "
+                                 f"{max(0.0, now - peer.latest_handshake):.0f}")
+            connected_lines.append(f"wireguard_peer_connected{{{labels}}} {int(is_connected)}")
+
+        series["wireguard_peers"].append(f"wireguard_peers{{{iface}}} {len(state.peers)}")
+        series["wireguard_peers_connected"].append(f"wireguard_peers_connected{{{iface}}} {connected}")
+        series["wireguard_interface_receive_bytes_total"].append(
+            f"wireguard_interface_receive_bytes_total{{{iface}}} {rx_total}")
+        series["wireguard_interface_transmit_bytes_total"].append(
+            f"wireguard_interface_transmit_bytes_total{{{iface}}} {tx_total}")
+
+    lines = []
+    for name, metric_type, help_text in _HELP:
+        if series[name]:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(series[name])
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusExporter:
+    """
+    Serves cached exposition text for a WireGuardPoller.
+
+    The text is rendered at most once per (snapshot seq, names version),
+    so scrapes between polls cost a dictionary lookup.
+    """
+
+    def __init__(self, poller: WireGuardPoller, names: Optional[NameSource] = None):
+        self.poller = poller
+        self.names = names
+        self._cache: Optional[Tuple[Tuple[int, int], bytes]] = None
+        self._lock = threading.Lock()
+
+    def render(self) -> bytes:
+        """Return the exposition text for the latest snapshot."""
+        snapshot = self.poller.snapshot
+        names_version, names = self.names() if self.names else (0, None)
+        key = (snapshot.seq, names_version)
+
+        cached = self._cache
+        if cached is None or cached[0] != key:
+            with self._lock:
+                cached = self._cache
+                if cached is None or cached[0] != key:
+                    cached = (key, render_prometheus(snapshot, names).encode())
+                    self._cache = cached
+        return cached[1]
@@ -0,0 +1,252 @@
+"""
+Monitoring Engine
+
+Fixed-cadence asyncio scheduler for the monitoring daemon. Ticks are
+anchored to the start time (tick k fires at start + k * interval), so
+collection time never accumulates into drift. Collection, storage,
+alert evaluation and notification run as independent stages joined by
+bounded queues, each on its own executor thread; a stalled SMTP server
+only backs up the notification queue.
+
+A tick that cannot run (the previous collection is still in progress,
+or the loop woke up after the deadline had passed) is recorded as
+missed rather than silently skipped.
+"""
+
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+
+# Missed-tick records kept in memory for stats()
+MISSED_HISTORY = 100
+
+STAGES = ("collect", "store", "alert", "notify")
+
+
+class MonitoringEngine:
+    """
+    Runs collect -> store -> alert -> notify on a fixed cadence.
+
+    Args:
+        collect: Returns one metrics sample (blocking)
+        store: Persists a sample (blocking)
+        evaluate: Returns the alerts for a sample (blocking)
+        notify: Sends a list of alerts (blocking, may be slow)
+        interval: Seconds between ticks
+        queue_size: Capacity of each inter-stage queue
+        on_missed: Called with a record for every missed tick
+        on_error: Called with (stage, exception) when a stage fails
+        drain_timeout: Seconds to wait for queued work on shutdown
+    """
+
+    def __init__(self, collect: Callable[[], Dict], store: Callable[[Dict], None],
+                 evaluate: Callable[[Dict], List[Dict]], notify: Callable[[List[Dict]], None],
+                 interval: float, queue_size: int = 8,
+                 on_missed: Optional[Callable[[Dict], None]] = None,
+                 on_error: Optional[Callable[[str, Exception], None]] = None,
+                 drain_timeout: float = 10.0, clock: Callable[[], float] = time.monotonic):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.collect = collect
+        self.store = store
+        self.evaluate = evaluate
+        self.notify = notify
+        self.interval = interval
+        self.queue_size = queue_size
+        self.on_missed = on_missed
+        self.on_error = on_error
+        self.drain_timeout = drain_timeout
+        self.clock = clock
+
+        self.counters = {
+            "ticks": 0, "collected": 0, "stored": 0, "evaluated": 0,
+            "alerts": 0, "notifications": 0, "missed_ticks": 0, "unfinished": 0,
+        }
+        self.dropped = {stage: 0 for stage in STAGES[1:]}
+        self.errors = {stage: 0 for stage in STAGES}
+        self.missed: deque = deque(maxlen=MISSED_HISTORY)
+        self.max_lag = 0.0
+        self.last_collection: Optional[float] = None
+
+        self._stop: Optional[asyncio.Event] = None
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._pending: Set[Future] = set()
+        self._collecting: Optional[asyncio.Task] = None
+
+    def stop(self):
+        """Ask a running engine to finish after the current tick."""
+        if self._stop is not None:
+            self._stop.set()
+
+    def stats(self) -> Dict:
+        return {
+            **self.counters,
+            "dropped": dict(self.dropped),
+            "errors": dict(self.errors),
+            "max_lag_ms": round(self.max_lag * 1e3, 3),
+            "last_collection_ms": None if self.last_collection is None
+            else round(self.last_collection * 1e3, 3),
+            "recent_missed": list(self.missed),
+        }
+
+    async def _call(self, stage: str, func, *args):
+        # Tracked so run() can cancel queued calls (cancel_futures needs Python 3.9)
+        future = self._executors[stage].submit(func, *args)
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        return await asyncio.wrap_future(future)
+
+    def _record_missed(self, tick: int, deadline: float, reason: str):
+        record = {
+            "tick": tick,
+            "scheduled": datetime.fromtimestamp(time.time() - (self.clock() - deadline)).isoformat(),
+            "reason": reason,
+        }
+        self.counters["missed_ticks"] += 1
+        self.missed.append(record)
+        if self.on_missed is not None:
+            self.on_missed(record)
+
+    def _failed(self, stage: str, error: Exception):
+        self.errors[stage] += 1
+        if self.on_error is not None:
+            self.on_error(stage, error)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, item) -> bool:
+        try:
+            queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def run(self, max_ticks: Optional[int] = None):
+        """
+        Run until stop() is called (or max_ticks ticks have fired).
+
+        Queued samples and alerts get up to drain_timeout seconds to
+        finish before the engine returns.
+        """
+        self._stop = asyncio.Event()
+        self._executors = {
+            stage: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"monitor-{stage}")
+            for stage in STAGES
+        }
+        store_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        alert_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        notify_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        workers = [
+            asyncio.create_task(self._store_worker(store_queue, alert_queue)),
+            asyncio.create_task(self._alert_worker(alert_queue, notify_queue)),
+            asyncio.create_task(self._notify_worker(notify_queue)),
+        ]
+        try:
+            await self._ticker(store_queue, max_ticks)
+        finally:
+            await self._drain(store_queue, alert_queue, notify_queue)
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            for future in list(self._pending):
+                future.cancel()
+            for executor in self._executors.values():
+                executor.shutdown(wait=False)
+
+    async def _ticker(self, store_queue: asyncio.Queue, max_ticks: Optional[int]):
+        start = self.clock()
+        tick = 0
+        while not self._stop.is_set() and (max_ticks is None or tick < max_ticks):
+            deadline = start + tick * self.interval
+            delay = deadline - self.clock()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), delay)
+                    break
+                except asyncio.TimeoutError:
+                    pass
+
+            lag = self.clock() - deadline
+            if lag >= self.interval:
+                # Woke up after later deadlines had passed (suspend, overload)
+                skipped = int(lag // self.interval)
+                if max_ticks is not None:
+                    skipped = min(skipped, max_ticks - tick)
+                for missed in range(tick, tick + skipped):
+                    self._record_missed(missed, start + missed * self.interval, "late wakeup")
+                tick += skipped
+                continue
+
+            self.counters["ticks"] += 1
+            self.max_lag = max(self.max_lag, lag)
+            if self._collecting is not None and not self._collecting.done():
+                self._record_missed(tick, deadline, "collection still running")
+            else:
+                self._collecting = asyncio.create_task(self._collect(store_queue))
+            tick += 1
+
+        if self._collecting is not None:
+            await asyncio.wait([self._collecting], timeout=self.drain_timeout)
+
+    async def _collect(self, store_queue: asyncio.Queue):
+        started = self.clock()
+        try:
+            metrics = await self._call("collect", self.collect)
+        except Exception as e:
+            self._failed("collect", e)
+            return
+        finally:
+            self.last_collection = self.clock() - started
+        self.counters["collected"] += 1
+        if not self._offer(store_queue, metrics):
+            self.dropped["store"] += 1
+
+    async def _store_worker(self, store_queue: asyncio.Queue, alert_queue: asyncio.Queue):
+        while True:
+            metrics = await store_queue.get()
+            try:
+                await self._call("store", self.store, metrics)
+                self.counters["stored"] += 1
+            except Exception as e:
+                self._failed("store", e)
+            finally:
+                store_queue.task_done()
+            if not self._offer(alert_queue, metrics):
+                self.dropped["alert"] += 1
+
+    async def _alert_worker(self, alert_queue: asyncio.Queue, notify_queue: asyncio.Queue):
+        while True:
+            metrics = await alert_queue.get()
+            try:
+                alerts = await self._call("alert", self.evaluate, metrics)
+                self.counters["evaluated"] += 1
+                if alerts:
+                    self.counters["alerts"] += len(alerts)
+                    if not self._offer(notify_queue, alerts):
+                        self.dropped["notify"] += 1
+            except Exception as e:
+                self._failed("alert", e)
+            finally:
+                alert_queue.task_done()
+
+    async def _notify_worker(self, notify_queue: asyncio.Queue):
+        while True:
+            alerts = await notify_queue.get()
+            try:
+                await self._call("notify", self.notify, alerts)
+                self.counters["notifications"] += 1
+            except Exception as e:
+                self._failed("notify", e)
+            finally:
+                notify_queue.task_done()
+
+    async def _drain(self, *queues: asyncio.Queue):
+        async def join_all():
+            for queue in queues:
+                await queue.join()
+        try:
+            await asyncio.wait_for(join_all(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            self.counters["unfinished"] = sum(queue.qsize() for queue in queues)
@@ -0,0 +1,81 @@
+"""
+System Statistics
+
+Reads load and memory figures from /proc through file descriptors that
+stay open between samples. Each read is a single pread() at offset 0,
+so a monitoring cycle costs no open/close and parses only the fields
+it reports.
+"""
+
+import os
+from typing import Dict, Optional
+
+# MemTotal, MemFree and MemAvailable are the first three lines of /proc/meminfo
+MEMINFO_HEAD = 256
+
+
+class ProcFile:
+    """
+    A /proc file kept open for repeated reads.
+
+    Args:
+        path: File to read
+        size: Bytes to read per call (the head of the file)
+    """
+
+    def __init__(self, path: str, size: int = 4096):
+        self.path = path
+        self.size = size
+        self._fd: Optional[int] = os.open(path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+
+    def read(self) -> bytes:
+        if self._fd is None:
+            raise ValueError(f"{self.path} is closed")
+        return os.pread(self._fd, self.size, 0)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class SystemStats:
+    """
+    Load average and memory usage, read from persistent /proc handles.
+
+    Args:
+        proc: Mount point of procfs (tests point this at a fake tree)
+    """
+
+    def __init__(self, proc: str = "/proc"):
+        self._loadavg = ProcFile(os.path.join(proc, "loadavg"), 64)
+        self._meminfo = ProcFile(os.path.join(proc, "meminfo"), MEMINFO_HEAD)
+
+    def read(self) -> Dict:
+        """
+        Take one sample.
+
+        Returns:
+            Dictionary with load_average, memory_total, memory_available
+            and memory_usage_percent (memory in bytes)
+        """
+        metrics = {"load_average": float(self._loadavg.read().split(None, 1)[0])}
+
+        for line in self._meminfo.read().splitlines():
+            name, _, value = line.partition(b":")
+            if name == b"MemTotal":
+                metrics["memory_total"] = int(value.split()[0]) * 1024
+            elif name == b"MemAvailable":
+                metrics["memory_available"] = int(value.split()[0]) * 1024
+                break
+
+        if metrics.get("memory_total") and "memory_available" in metrics:
+            metrics["memory_usage_percent"] = (
+                (metrics["memory_total"] - metrics["memory_available"]) /
+                metrics["memory_total"] * 100
+            )
+        return metrics
+
+    def close(self):
+        self._loadavg.close()
+        self._meminfo.close()
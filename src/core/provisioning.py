@@ -0,0 +1,271 @@
+"""
+Bulk Client Provisioning
+
+Generates keys, IP addresses, configurations and QR codes for a whole
+roster of clients in a single run.
+"""
+
+import csv
+import ipaddress
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .client_config import ClientConfigGenerator
+from .keys import WireGuardKeyManager
+from .qr_cache import QRCodeCache
+
+
+def load_roster(roster_file: str) -> List[Dict]:
+    """
+    Load a client roster from a CSV or JSON file.
+
+    CSV files need a `name` column and may add `ip`, `dns` (space or
+    semicolon separated) and `allowed_ips` columns. JSON files hold a
+    list of client names or of objects with the same fields.
+
+    Args:
+        roster_file: Path to the roster file
+
+    Returns:
+        List of client entries with at least a `name` key
+    """
+    path = Path(roster_file)
+    if not path.exists():
+        raise FileNotFoundError(f"Roster file not found: {roster_file}")
+
+    if path.suffix.lower() == ".json":
+        rows = json.loads(path.read_text(encoding="utf-8"))
+        if isinstance(rows, dict):
+            rows = rows.get("clients", [])
+        rows = [{"name": row} if isinstance(row, str) else dict(row) for row in rows]
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            rows = [dict(row) for row in csv.DictReader(f)]
+
+    roster = []
+    for row in rows:
+        entry = {key.strip().lower(): (value.strip() if isinstance(value, str) else value)
+                 for key, value in row.items() if key}
+        if not entry.get("name"):
+            continue
+        if isinstance(entry.get("dns"), str):
+            entry["dns"] = [d for d in entry["dns"].replace(";", " ").replace(",", " ").split() if d]
+        roster.append(entry)
+
+    return roster
+
+
+def _write_qr_file(qr_cache: QRCodeCache, config: str, qr_file: str) -> str:
+    """Render (or fetch) a QR code and write it to disk (runs in a worker process)."""
+    qr_cache.write_to(config, qr_file)
+    return qr_file
+
+
+class BulkProvisioner:
+    """Provisions many clients at once and writes a summary manifest."""
+
+    def __init__(self, key_manager: WireGuardKeyManager,
+                 config_generator: ClientConfigGenerator,
+                 output_dir: str = "./clients",
+                 workers: Optional[int] = None,
+                 qr_cache: Optional[QRCodeCache] = None,
+                 qr_format: Optional[str] = None):
+        self.key_manager = key_manager
+        self.config_generator = config_generator
+        self.output_dir = Path(output_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.qr_cache = qr_cache or config_generator.qr_cache_for(str(self.output_dir), qr_format)
+
+    def provision(self, roster: List[Dict], generate_qr: bool = True,
+                  dns_servers: Optional[List[str]] = None,
+                  allowed_ips: str = "0.0.0.0/0",
+                  preshared_key: Optional[str] = None,
+                  rekey: bool = False) -> Dict:
+        """
+        Provision every client in the roster.
+
+        Keys, IP allocation and config rendering run in-process; QR
+        rendering is CPU bound and fanned out across a process pool.
+        Existing client keys are reused, so re-running an unchanged roster
+        rewrites nothing and renders no QR codes.
+
+        Args:
+            roster: Client entries as returned by load_roster()
+            generate_qr: Whether to render QR codes
+            dns_servers: Default DNS servers for rows without a `dns` column
+            allowed_ips: Default AllowedIPs for rows without `allowed_ips`
+            preshared_key: Optional preshared key shared by all clients
+            rekey: Generate new keys even for clients that already have them
+
+        Returns:
+            Manifest dictionary (also written to manifest.json)
+        """
+        started = time.perf_counter()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        clients = []
+        errors = []
+        qr_jobs = []
+        server_peers = []
+        seen = set()
+
+        # Explicit addresses are validated and pinned before any auto-allocation
+        ip_errors = self._pin_roster_ips(roster)
+
+        for entry in roster:
+            name = entry["name"]
+            if name in seen:
+                errors.append({"name": name, "error": "Duplicate client name"})
+                continue
+            seen.add(name)
+            if name in ip_errors:
+                errors.append({"name": name, "error": ip_errors[name]})
+                continue
+
+            try:
+                keys = None if rekey else self.key_manager.load_client_keys(name)
+                if keys is None:
+                    keys = self.key_manager.save_client_keys(name)
+                client_ip = entry.get("ip") or self.config_generator.allocate_client_ip(name)
+
+                config = self.config_generator.generate_config(
+                    client_name=name,
+                    client_private_key=keys["private_key"],
+                    client_ip=client_ip,
+                    dns_servers=entry.get("dns") or dns_servers,
+                    allowed_ips=entry.get("allowed_ips") or allowed_ips,
+                    preshared_key=preshared_key
+                )
+
+                client_dir = self.output_dir / name
+                client_dir.mkdir(parents=True, exist_ok=True)
+                config_file = client_dir / f"{name}.conf"
+                config = self.config_generator.write_config(config_file, config)
+                if preshared_key:
+                    self.key_manager.save_client_preshared_key(name, preshared_key)
+
+                client = {
+                    "name": name,
+                    "client_ip": client_ip,
+                    "public_key": keys["public_key"],
+                    "config_file": str(config_file)
+                }
+
+                if generate_qr:
+                    client["qr_file"] = str(client_dir / f"{name}_qr.{self.qr_cache.extension}")
+                    qr_jobs.append((config, client["qr_file"]))
+
+                server_peers.append(self.config_generator.generate_server_config_section(
+                    client_public_key=keys["public_key"],
+                    client_ip=client_ip,
+                    preshared_key=preshared_key
+                ))
+                clients.append(client)
+
+            except Exception as e:
+                errors.append({"name": name, "error": str(e)})
+
+        failed = len(errors)
+        if qr_jobs:
+            qr_failures = self._render_qr_codes(qr_jobs)
+            for client in clients:
+                error = qr_failures.get(client.get("qr_file"))
+                if error is not None:
+                    del client["qr_file"]
+                    errors.append({"name": client["name"], "error": f"QR code not written: {error}"})
+
+        server_peers_file = self.output_dir / "server_peers.conf"
+        server_peers_file.write_text("\n".join(server_peers) + "\n", encoding="utf-8")
+
+        manifest = {
+            "generated": datetime.now().isoformat(),
+            "total": len(roster),
+            "provisioned": len(clients),
+            "failed": failed,
+            "qr_failed": len(errors) - failed,
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+            "server_peers_file": str(server_peers_file),
+            "clients": clients,
+            "errors": errors
+        }
+
+        manifest_file = self.output_dir / "manifest.json"
+        manifest_file.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        manifest["manifest_file"] = str(manifest_file)
+
+        return manifest
+
+    def _pin_roster_ips(self, roster: List[Dict]) -> Dict[str, str]:
+        """
+        Validate and reserve the explicit addresses in a roster.
+
+        Returns:
+            Client name -> error for rows whose address is malformed,
+            repeated in the roster or already leased to another client
+        """
+        ip_errors = {}
+        owners = {}
+        pinned = set()
+        for entry in roster:
+            name = entry["name"]
+            if not entry.get("ip") or name in pinned:
+                continue
+            pinned.add(name)
+            try:
+                address = str(ipaddress.ip_address(entry["ip"]))
+            except ValueError:
+                ip_errors[name] = f"Invalid IP address: {entry['ip']}"
+                continue
+            if address in owners:
+                ip_errors[name] = f"IP address {address} is also assigned to {owners[address]}"
+                continue
+            try:
+                self.config_generator.reserve_client_ip(address, name)
+            except ValueError as e:
+                ip_errors[name] = str(e)
+                continue
+            owners[address] = name
+        return ip_errors
+
+    def _render_qr_codes(self, jobs: List[tuple]) -> Dict[str, str]:
+        """
+        Write QR codes for (config, qr_file) jobs, rendering misses in a process pool.
+
+        A failed render does not stop the others.
+
+        Returns:
+            qr_file -> error message for every job that failed
+        """
+        failures = {}
+        misses = []
+        for config, qr_file in jobs:
+            if self.qr_cache.contains(config):
+                try:
+                    self.qr_cache.write_to(config, qr_file)
+                except Exception as e:
+                    failures[qr_file] = str(e)
+            else:
+                misses.append((config, qr_file))
+
+        if self.workers <= 1 or len(misses) <= 1:
+            for config, qr_file in misses:
+                try:
+                    _write_qr_file(self.qr_cache, config, qr_file)
+                except Exception as e:
+                    failures[qr_file] = str(e)
+            return failures
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(_write_qr_file, self.qr_cache, config, qr_file): qr_file
+                       for config, qr_file in misses}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failures[futures[future]] = str(e) or type(e).__name__
+        return failures
@@ -0,0 +1,110 @@
+"""
+QR Code Cache
+
+Content-addressed on-disk cache of rendered QR code images, keyed by a
+hash of the configuration text and render settings.
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+from .qr_render import QR_EXTENSIONS, default_qr_format, render_qr
+
+QR_CACHE_DIR_NAME = ".qr_cache"
+
+
+class QRCodeCache:
+    """
+    Renders each distinct configuration to a QR image at most once.
+
+    Images are stored as `<cache_dir>/<hh>/<sha256>.<ext>`; a config that
+    has already been rendered is served straight from disk. The render
+    format is part of the key, so PNG and SVG entries never collide.
+
+    Args:
+        cache_dir: Directory holding the cached images
+        size: Pixels per module
+        border: Quiet zone width in modules
+        qr_format: "png", "svg" or "pil" (default: best available)
+        renderer: Called as renderer(config, qr_format, size, border) on a
+            miss; must be picklable when the cache is handed to workers
+    """
+
+    def __init__(self, cache_dir: Union[str, Path], size: int = 10, border: int = 4,
+                 qr_format: Optional[str] = None,
+                 renderer: Callable[[str, str, int, int], bytes] = render_qr):
+        self.cache_dir = Path(cache_dir)
+        self.renderer = renderer
+        self.size = size
+        self.border = border
+        self.qr_format = qr_format or default_qr_format()
+        if self.qr_format not in QR_EXTENSIONS:
+            raise ValueError(f"Unknown QR format: {self.qr_format}")
+
+    @property
+    def extension(self) -> str:
+        """File extension of the images this cache produces."""
+        return QR_EXTENSIONS[self.qr_format]
+
+    def key(self, config: str) -> str:
+        """Return the cache key for a configuration."""
+        digest = hashlib.sha256(f"{self.qr_format}:{self.size}:{self.border}\n".encode())
+        digest.update(config.encode("utf-8"))
+        return digest.hexdigest()
+
+    def path_for(self, config: str) -> Path:
+        key = self.key(config)
+        return self.cache_dir / key[:2] / f"{key}.{self.extension}"
+
+    def contains(self, config: str) -> bool:
+        return self.path_for(config).exists()
+
+    def get(self, config: str) -> Optional[bytes]:
+        """Return cached image bytes, or None if not rendered yet."""
+        try:
+            return self.path_for(config).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def get_or_render(self, config: str) -> bytes:
+        """Return cached image bytes, rendering and storing them on a miss."""
+        data = self.get(config)
+        if data is None:
+            data = self.renderer(config, self.qr_format, self.size, self.border)
+            _atomic_write(self.path_for(config), data)
+        return data
+
+    def write_to(self, config: str, dest: Union[str, Path]) -> Path:
+        """
+        Write the QR image for a configuration to dest.
+
+        The file is left untouched when it already holds the same bytes.
+        """
+        dest = Path(dest)
+        data = self.get_or_render(config)
+        try:
+            if dest.stat().st_size == len(data) and dest.read_bytes() == data:
+                return dest
+        except FileNotFoundError:
+            pass
+        dest.write_bytes(data)
+        return dest
+
+
+def _atomic_write(path: Path, data: bytes):
+    """Write bytes via a temporary file so readers never see partial images."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
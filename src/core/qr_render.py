@@ -0,0 +1,333 @@
+"""
+Vectorized QR Code Rendering
+
+Builds QR module matrices with NumPy-based mask selection and encodes
+them straight to PNG or SVG without going through PIL.
+"""
+
+import io
+import struct
+import zlib
+from functools import lru_cache
+from typing import Tuple
+
+import qrcode
+from qrcode import util
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+QR_FORMATS = ("png", "svg", "pil")
+
+QR_MIMETYPES = {
+    "png": "image/png",
+    "pil": "image/png",
+    "svg": "image/svg+xml",
+}
+
+QR_EXTENSIONS = {
+    "png": "png",
+    "pil": "png",
+    "svg": "svg",
+}
+
+# Finder-like 1:1:3:1:1 patterns with a 4-module light run (penalty rule 3)
+_FINDER_PATTERNS = (
+    (1, 0, 1, 1, 1, 0, 1, 0, 0, 0, 0),
+    (0, 0, 0, 0, 1, 0, 1, 1, 1, 0, 1),
+)
+
+
+def render_qr_png(config: str, size: int = 10, border: int = 4) -> bytes:
+    """
+    Render a WireGuard configuration as PNG QR code bytes.
+
+    Uses qrcode's PIL image factory; see render_qr() for the faster
+    NumPy renderers.
+
+    Args:
+        config: WireGuard configuration string
+        size: QR code box size
+        border: QR code border size
+
+    Returns:
+        PNG image bytes
+    """
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=size,
+        border=border,
+    )
+    qr.add_data(config)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def default_qr_format() -> str:
+    """Return the fastest renderer available in this environment."""
+    return "png" if NUMPY_AVAILABLE else "pil"
+
+
+@lru_cache(maxsize=None)
+def _function_layout(version: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Return (function_modules, data_region) for a QR version.
+
+    function_modules holds finder/timing/alignment/version modules with
+    format information blanked exactly as qrcode scores candidate masks;
+    data_region marks the modules that masks apply to.
+    """
+    blank = qrcode.QRCode(version=version)
+    blank.modules_count = version * 4 + 17
+    blank.modules = [[None] * blank.modules_count for _ in range(blank.modules_count)]
+    blank.setup_position_probe_pattern(0, 0)
+    blank.setup_position_probe_pattern(blank.modules_count - 7, 0)
+    blank.setup_position_probe_pattern(0, blank.modules_count - 7)
+    blank.setup_position_adjust_pattern()
+    blank.setup_timing_pattern()
+    blank.setup_type_info(True, 0)
+    if version >= 7:
+        blank.setup_type_number(True)
+
+    data_region = np.array([[m is None for m in row] for row in blank.modules], dtype=bool)
+    function_modules = np.array([[bool(m) for m in row] for row in blank.modules], dtype=bool)
+    return function_modules, data_region
+
+
+@lru_cache(maxsize=None)
+def _placement_order(version: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Return (rows, cols) of data modules in the order bits are placed.
+
+    Mirrors the two-column zigzag walk of QRCode.map_data once per version
+    so that data can then be placed with a single fancy-indexing write.
+    """
+    _, data_region = _function_layout(version)
+    size = data_region.shape[0]
+    rows, cols = [], []
+    row, inc = size - 1, -1
+
+    for col in range(size - 1, 0, -2):
+        if col <= 6:
+            col -= 1
+        while True:
+            for c in (col, col - 1):
+                if data_region[row, c]:
+                    rows.append(row)
+                    cols.append(c)
+            row += inc
+            if row < 0 or row >= size:
+                row -= inc
+                inc = -inc
+                break
+
+    return np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)
+
+
+@lru_cache(maxsize=None)
+def _type_overlay(version: int, error_correction: int, mask_pattern: int):
+    """Return (rows, cols, values) of the final format and version information."""
+    size = version * 4 + 17
+    scratch = qrcode.QRCode(version=version, error_correction=error_correction)
+    scratch.modules_count = size
+    scratch.modules = [[None] * size for _ in range(size)]
+    scratch.setup_type_info(False, mask_pattern)
+    if version >= 7:
+        scratch.setup_type_number(False)
+
+    cells = [(r, c, bool(v)) for r, line in enumerate(scratch.modules)
+             for c, v in enumerate(line) if v is not None]
+    rows, cols, values = zip(*cells)
+    return np.array(rows), np.array(cols), np.array(values, dtype=bool)
+
+
+@lru_cache(maxsize=None)
+def _mask_stack(size: int) -> "np.ndarray":
+    """Return the 8 mask patterns for a symbol size as an (8, n, n) array."""
+    i, j = np.indices((size, size))
+    return np.stack([
+        (i + j) % 2 == 0,
+        i % 2 == 0,
+        j % 3 == 0,
+        (i + j) % 3 == 0,
+        (i // 2 + j // 3) % 2 == 0,
+        (i * j) % 2 + (i * j) % 3 == 0,
+        ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+        ((i * j) % 3 + (i + j) % 2) % 2 == 0,
+    ])
+
+
+def _run_penalty(candidates: "np.ndarray") -> "np.ndarray":
+    """Penalty rule 1: each run of 5+ same-colour modules scores length - 2."""
+    count, size, _ = candidates.shape
+    totals = np.zeros(count, dtype=np.int64)
+    for grid in (candidates, candidates.transpose(0, 2, 1)):
+        # Separate rows with a sentinel so runs never span two rows
+        padded = np.full((count, size, size + 1), 2, dtype=np.int8)
+        padded[:, :, :size] = grid
+        flat = padded.reshape(count, -1)
+        for index in range(count):
+            row = flat[index]
+            starts = np.flatnonzero(np.concatenate(([True], row[1:] != row[:-1])))
+            lengths = np.diff(np.append(starts, row.size))
+            long_runs = lengths[(row[starts] != 2) & (lengths >= 5)]
+            totals[index] += int((long_runs - 2).sum())
+    return totals
+
+
+def _block_penalty(candidates: "np.ndarray") -> "np.ndarray":
+    """Penalty rule 2: every 2x2 block of one colour scores 3."""
+    top_left = candidates[:, :-1, :-1]
+    same = (top_left == candidates[:, :-1, 1:]) & \
+        (top_left == candidates[:, 1:, :-1]) & \
+        (top_left == candidates[:, 1:, 1:])
+    return same.sum(axis=(1, 2)) * 3
+
+
+def _finder_penalty(candidates: "np.ndarray") -> "np.ndarray":
+    """Penalty rule 3: every finder-like pattern in a row or column scores 40."""
+    totals = np.zeros(candidates.shape[0], dtype=np.int64)
+    for grid in (candidates, candidates.transpose(0, 2, 1)):
+        windows = np.lib.stride_tricks.sliding_window_view(grid, 11, axis=2)
+        for pattern in _FINDER_PATTERNS:
+            totals += (windows == np.array(pattern, dtype=bool)).all(axis=3).sum(axis=(1, 2)) * 40
+    return totals
+
+
+def _balance_penalty(candidates: "np.ndarray") -> "np.ndarray":
+    """Penalty rule 4: 10 points per 5% the dark ratio departs from 50%."""
+    size = candidates.shape[1]
+    percent = candidates.sum(axis=(1, 2)) / float(size * size)
+    return (np.abs(percent * 100 - 50) / 5).astype(np.int64) * 10
+
+
+def qr_matrix(config: str, border: int = 4,
+              error_correction: int = qrcode.constants.ERROR_CORRECT_L) -> "np.ndarray":
+    """
+    Build the QR module matrix for a configuration, including the border.
+
+    Codewords come from qrcode; bit placement uses a cached per-version
+    coordinate order and all eight masks are scored together with array
+    operations instead of rebuilding the symbol eight times. Penalties
+    follow qrcode's lost_point rules, so the chosen mask and resulting
+    matrix are identical to qrcode's own output.
+
+    Returns:
+        Boolean array where True is a dark module
+    """
+    qr = qrcode.QRCode(version=None, error_correction=error_correction)
+    qr.add_data(config)
+    version = qr.best_fit()
+    codewords = util.create_data(version, error_correction, qr.data_list)
+
+    function_modules, data_region = _function_layout(version)
+    masks = _mask_stack(function_modules.shape[0])
+
+    # Place every data bit at once; unused trailing modules stay light
+    rows, cols = _placement_order(version)
+    bits = np.unpackbits(np.asarray(codewords, dtype=np.uint8))[:rows.size]
+    unmasked = np.zeros_like(data_region)
+    unmasked[rows[:bits.size], cols[:bits.size]] = bits.astype(bool)
+
+    # Score candidates with blank format information, as qrcode does
+    candidates = np.where(data_region, unmasked ^ masks, function_modules)
+    scores = _run_penalty(candidates) + _block_penalty(candidates) + \
+        _finder_penalty(candidates) + _balance_penalty(candidates)
+    best = int(np.argmin(scores))
+
+    matrix = candidates[best].copy()
+    type_rows, type_cols, type_values = _type_overlay(version, error_correction, best)
+    matrix[type_rows, type_cols] = type_values
+
+    if border:
+        matrix = np.pad(matrix, border, constant_values=False)
+    return matrix
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + \
+        struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+def matrix_to_png(matrix: "np.ndarray", box_size: int = 10) -> bytes:
+    """
+    Encode a module matrix as a 1-bit grayscale PNG.
+
+    The matrix is upscaled with np.repeat, bit-packed per row and
+    compressed in a single zlib call.
+    """
+    pixels = np.repeat(np.repeat(~matrix, box_size, axis=0), box_size, axis=1)
+    height, width = pixels.shape
+    rows = np.packbits(pixels, axis=1)
+    # Prefix every scanline with filter type 0 (None)
+    scanlines = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rows], axis=1)
+
+    header = struct.pack(">IIBBBBB", width, height, 1, 0, 0, 0, 0)
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", header),
+        _png_chunk(b"IDAT", zlib.compress(scanlines.tobytes(), 6)),
+        _png_chunk(b"IEND", b""),
+    ])
+
+
+def matrix_to_svg(matrix: "np.ndarray", box_size: int = 10) -> bytes:
+    """
+    Encode a module matrix as an SVG with a single path.
+
+    Horizontal runs of dark modules become one rectangle each.
+    """
+    size = matrix.shape[0]
+    padded = np.zeros((size, size + 2), dtype=np.int8)
+    padded[:, 1:-1] = matrix
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+
+    path = "".join(f"M{x},{y}h{w}v1h-{w}z"
+                   for x, y, w in zip(starts.tolist(), rows.tolist(), (ends - starts).tolist()))
+    pixels = size * box_size
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+        f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path fill="#000" d="{path}"/></svg>\n'
+    ).encode("utf-8")
+
+
+def render_qr(config: str, qr_format: str = "png", size: int = 10, border: int = 4) -> bytes:
+    """
+    Render a configuration as a QR image in the requested format.
+
+    Args:
+        config: WireGuard configuration string
+        qr_format: "png" (NumPy), "svg" (NumPy) or "pil" (qrcode's PIL factory)
+        size: QR code box size
+        border: QR code border size
+
+    Returns:
+        Encoded image bytes
+    """
+    if qr_format not in QR_FORMATS:
+        raise ValueError(f"Unknown QR format: {qr_format}")
+
+    if qr_format == "pil" or not NUMPY_AVAILABLE:
+        if qr_format == "svg":
+            raise RuntimeError("SVG QR rendering requires numpy")
+        return render_qr_png(config, size, border)
+
+    matrix = qr_matrix(config, border)
+    if qr_format == "svg":
+        return matrix_to_svg(matrix, size)
+    return matrix_to_png(matrix, size)
@@ -0,0 +1,206 @@
+"""
+Counter Rate Engine
+
+Turns cumulative WireGuard byte counters into per-peer byte deltas and
+bytes/sec rates between consecutive samples. Every step is a NumPy
+operation over all peers at once. A counter that goes down (interface
+restart, peer removed and re-added) has started over, so its new value
+is the delta.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+PeerKey = Tuple[str, str]
+
+# Marks "no previous reading" in counter arrays
+UNKNOWN = -1
+
+
+def counter_deltas(current, previous):
+    """
+    Reset-aware byte deltas between two counter readings, element-wise.
+
+    Args:
+        current: Latest counter values
+        previous: Earlier values; UNKNOWN (negative) where there is none
+
+    Returns:
+        int64 array: current - previous, current after a reset, 0 if unknown
+    """
+    current = np.asarray(current, dtype=np.int64)
+    previous = np.asarray(previous, dtype=np.int64)
+    return np.where(previous < 0, 0, np.where(current >= previous, current - previous, current))
+
+
+def _rates(deltas, elapsed):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(elapsed > 0, deltas / elapsed, np.nan)
+
+
+@dataclass(frozen=True)
+class IntervalRates:
+    """Per-peer deltas for one sample interval (arrays aligned with keys)."""
+
+    keys: Sequence[PeerKey]
+    elapsed: np.ndarray
+    rx_delta: np.ndarray
+    tx_delta: np.ndarray
+
+    @property
+    def rx_rate(self):
+        """Receive bytes/sec (NaN for a peer's first reading)."""
+        return _rates(self.rx_delta, self.elapsed)
+
+    @property
+    def tx_rate(self):
+        """Transmit bytes/sec (NaN for a peer's first reading)."""
+        return _rates(self.tx_delta, self.elapsed)
+
+
+class RateEngine:
+    """
+    Tracks every peer's last counters between consecutive samples.
+
+    Peers map to fixed slots in flat arrays, so an update for any number
+    of peers is a handful of vectorized gathers and scatters.
+
+    Args:
+        counters: Known (interface, public key) -> (rx, tx) counters
+    """
+
+    def __init__(self, counters: Optional[Dict[PeerKey, Tuple[int, int]]] = None):
+        self._slots: Dict[PeerKey, int] = {}
+        self._rx = np.full(0, UNKNOWN, dtype=np.int64)
+        self._tx = np.full(0, UNKNOWN, dtype=np.int64)
+        self._seen = np.full(0, np.nan)
+        if counters:
+            keys = list(counters)
+            slots = self._slots_for(keys)
+            values = np.array([counters[key] for key in keys], dtype=np.int64).reshape(-1, 2)
+            self._rx[slots] = values[:, 0]
+            self._tx[slots] = values[:, 1]
+
+    def _slots_for(self, keys: Sequence[PeerKey]) -> np.ndarray:
+        slots = self._slots
+        indices = np.fromiter((slots.setdefault(key, len(slots)) for key in keys),
+                              dtype=np.int64, count=len(keys))
+        if len(slots) > len(self._rx):
+            size = max(len(slots), 2 * len(self._rx))
+            grow = size - len(self._rx)
+            self._rx = np.concatenate([self._rx, np.full(grow, UNKNOWN, dtype=np.int64)])
+            self._tx = np.concatenate([self._tx, np.full(grow, UNKNOWN, dtype=np.int64)])
+            self._seen = np.concatenate([self._seen, np.full(grow, np.nan)])
+        return indices
+
+    def update(self, timestamp: float, keys: Sequence[PeerKey], rx, tx) -> IntervalRates:
+        """
+        Record one sample's counters and return the deltas since the last one.
+
+        Args:
+            timestamp: Unix time of the sample
+            keys: (interface, public key) of every peer in the sample
+            rx: Receive counters aligned with keys
+            tx: Transmit counters aligned with keys
+        """
+        slots = self._slots_for(keys)
+        rx = np.asarray(rx, dtype=np.int64)
+        tx = np.asarray(tx, dtype=np.int64)
+        rates = IntervalRates(
+            keys=keys,
+            elapsed=timestamp - self._seen[slots],
+            rx_delta=counter_deltas(rx, self._rx[slots]),
+            tx_delta=counter_deltas(tx, self._tx[slots]),
+        )
+        self._rx[slots] = rx
+        self._tx[slots] = tx
+        self._seen[slots] = timestamp
+        return rates
+
+    def counters(self) -> Dict[PeerKey, Tuple[int, int]]:
+        """Last known counters of every peer."""
+        return {key: (int(self._rx[slot]), int(self._tx[slot]))
+                for key, slot in self._slots.items() if self._rx[slot] >= 0}
+
+
+@dataclass(frozen=True)
+class RateSeries:
+    """
+    Per-peer byte deltas over time, one row per peer per sample.
+
+    Attributes:
+        keys: Peer index -> (interface, public key)
+        peer: Peer index of every row
+        timestamps: Unix time each row's interval ends
+        elapsed: Seconds since the peer's previous reading (NaN if none)
+        rx_delta: Bytes received in the interval
+        tx_delta: Bytes sent in the interval
+    """
+
+    keys: List[PeerKey]
+    peer: np.ndarray
+    timestamps: np.ndarray
+    elapsed: np.ndarray
+    rx_delta: np.ndarray
+    tx_delta: np.ndarray
+
+    @property
+    def rx_rate(self):
+        return _rates(self.rx_delta, self.elapsed)
+
+    @property
+    def tx_rate(self):
+        return _rates(self.tx_delta, self.elapsed)
+
+    @classmethod
+    def empty(cls) -> "RateSeries":
+        return cls([], np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0),
+                   np.zeros(0, np.int64), np.zeros(0, np.int64))
+
+    @classmethod
+    def concat(cls, parts: Sequence["RateSeries"]) -> "RateSeries":
+        """Join series whose peer indices refer to different key lists."""
+        parts = [part for part in parts if len(part.peer)]
+        if not parts:
+            return cls.empty()
+        index: Dict[PeerKey, int] = {}
+        peers = []
+        for part in parts:
+            lookup = np.fromiter((index.setdefault(key, len(index)) for key in part.keys),
+                                 dtype=np.int64, count=len(part.keys))
+            peers.append(lookup[part.peer])
+        return cls(list(index), np.concatenate(peers),
+                   *(np.concatenate([getattr(part, name) for part in parts])
+                     for name in ("timestamps", "elapsed", "rx_delta", "tx_delta")))
+
+    def for_peer(self, key: PeerKey) -> "RateSeries":
+        """Rows of one peer, in time order."""
+        if key not in self.keys:
+            return RateSeries.empty()
+        rows = np.flatnonzero(self.peer == self.keys.index(key))
+        rows = rows[np.argsort(self.timestamps[rows], kind="stable")]
+        return RateSeries([key], np.zeros(len(rows), np.int64), self.timestamps[rows],
+                          self.elapsed[rows], self.rx_delta[rows], self.tx_delta[rows])
+
+    def summary(self) -> Dict[PeerKey, Dict]:
+        """Per-peer bytes, time-weighted average and peak rates."""
+        n = len(self.keys)
+        timed = ~np.isnan(self.elapsed)
+        elapsed = np.bincount(self.peer[timed], weights=self.elapsed[timed], minlength=n)
+        result = {}
+        for direction, deltas, rates in (("rx", self.rx_delta, self.rx_rate),
+                                         ("tx", self.tx_delta, self.tx_rate)):
+            totals = np.bincount(self.peer, weights=deltas, minlength=n)
+            timed_totals = np.bincount(self.peer[timed], weights=deltas[timed], minlength=n)
+            peaks = np.full(n, np.nan)
+            np.fmax.at(peaks, self.peer, rates)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                averages = np.where(elapsed > 0, timed_totals / elapsed, np.nan)
+            for i, key in enumerate(self.keys):
+                row = result.setdefault(key, {})
+                row[f"{direction}_bytes"] = int(totals[i])
+                row[f"avg_{direction}_bps"] = None if np.isnan(averages[i]) else round(float(averages[i]), 1)
+                row[f"peak_{direction}_bps"] = None if np.isnan(peaks[i]) else round(float(peaks[i]), 1)
+        return result
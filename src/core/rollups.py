@@ -0,0 +1,549 @@
+"""
+Monitoring Rollups
+
+Hourly and daily aggregates maintained as samples are stored, so a usage
+report over any window reads a few hundred SQLite rows instead of every
+raw sample. Only the edge buckets a window covers partially are computed
+from the raw columnar segments (see tsdb.py).
+
+Each bucket holds per-interface sample and uptime counts, peak peers and
+byte deltas, and per-peer online seconds and byte deltas. A sample is
+credited to the bucket its timestamp falls in; daily buckets start at
+local midnight, like the segments.
+"""
+
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .ipam import _ImmediateTransaction
+from .rates import PeerKey, RateEngine, RateSeries, counter_deltas
+from .tsdb import MetricsStore, Segment, _grouped_cumsum, day_start, to_epoch
+
+ROLLUP_DB_NAME = "rollups.db"
+
+# Bucket resolutions in seconds (daily buckets follow local midnights)
+HOUR = 3600
+DAY = 86400
+
+# Longest gap between samples credited as online time to a connected peer
+MAX_SAMPLE_SPAN = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sample_rollups (
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (resolution, bucket)
+);
+CREATE TABLE IF NOT EXISTS interface_rollups (
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    interface TEXT NOT NULL,
+    samples INTEGER NOT NULL,
+    uptime_samples INTEGER NOT NULL,
+    peak_peers INTEGER NOT NULL,
+    rx_bytes INTEGER NOT NULL,
+    tx_bytes INTEGER NOT NULL,
+    PRIMARY KEY (resolution, bucket, interface)
+);
+CREATE TABLE IF NOT EXISTS peer_rollups (
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    interface TEXT NOT NULL,
+    public_key TEXT NOT NULL,
+    online_seconds INTEGER NOT NULL,
+    rx_bytes INTEGER NOT NULL,
+    tx_bytes INTEGER NOT NULL,
+    PRIMARY KEY (resolution, bucket, interface, public_key)
+);
+CREATE TABLE IF NOT EXISTS peer_counters (
+    interface TEXT NOT NULL,
+    public_key TEXT NOT NULL,
+    rx_bytes INTEGER NOT NULL,
+    tx_bytes INTEGER NOT NULL,
+    PRIMARY KEY (interface, public_key)
+);
+CREATE TABLE IF NOT EXISTS rollup_state (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+def _local_date(timestamp: int) -> date:
+    return datetime.fromtimestamp(timestamp).date()
+
+
+class UsageTotals:
+    """Aggregates over a time range, mergeable bucket by bucket."""
+
+    def __init__(self):
+        self.samples = 0
+        # interface -> [samples, uptime_samples, peak_peers, rx_bytes, tx_bytes]
+        self.interfaces: Dict[str, List[int]] = {}
+        # (interface, public key) -> [online_seconds, rx_bytes, tx_bytes]
+        self.peers: Dict[PeerKey, List[int]] = {}
+
+    def add_interface(self, name: str, samples: int, uptime_samples: int, peak_peers: int,
+                      rx_bytes: int, tx_bytes: int):
+        row = self.interfaces.setdefault(name, [0, 0, 0, 0, 0])
+        row[0] += samples
+        row[1] += uptime_samples
+        row[2] = max(row[2], peak_peers)
+        row[3] += rx_bytes
+        row[4] += tx_bytes
+
+    def add_peer(self, key: PeerKey, online_seconds: int, rx_bytes: int, tx_bytes: int):
+        row = self.peers.setdefault(key, [0, 0, 0])
+        row[0] += online_seconds
+        row[1] += rx_bytes
+        row[2] += tx_bytes
+
+    def merge(self, other: "UsageTotals"):
+        self.samples += other.samples
+        for name, row in other.interfaces.items():
+            self.add_interface(name, *row)
+        for key, row in other.peers.items():
+            self.add_peer(key, *row)
+
+
+class SegmentWindow:
+    """
+    Vectorized rollup arithmetic over one day's segment.
+
+    Only the rows of the requested window are touched: the segment
+    stores per-row counter differences, so a peer's stored delta is its
+    byte delta unless the counter reset (negative) or the row is the
+    peer's first of the day (compared against the previous segment).
+
+    Args:
+        segment: Day segment to aggregate
+        previous_ts: Timestamp of the last sample before the segment
+        previous_counters: (interface, public key) -> (rx, tx) before the segment
+    """
+
+    def __init__(self, segment: Segment, previous_ts: Optional[int] = None,
+                 previous_counters: Optional[Dict[PeerKey, Tuple[int, int]]] = None):
+        self.segment = segment
+        self.previous_ts = previous_ts
+        timestamps = segment.timestamps
+        gaps = np.diff(timestamps, prepend=timestamps[0] if previous_ts is None else previous_ts)
+        self.spans = np.where(gaps > MAX_SAMPLE_SPAN, MAX_SAMPLE_SPAN, np.maximum(gaps, 0))
+
+        previous_counters = previous_counters or {}
+        self.baseline = np.full((len(segment.peer_keys), 2), -1, dtype=np.int64)
+        for peer_id, key in enumerate(segment.peer_keys):
+            counters = previous_counters.get(key[:2])
+            if counters is not None:
+                self.baseline[peer_id] = counters
+
+    def _byte_deltas(self, r0: int, r1: int):
+        """Reset-aware (rx, tx) byte deltas for peer rows [r0, r1)."""
+        segment = self.segment
+        peer_ids = segment.peer_id[r0:r1].astype(np.int64)
+        seen_before = np.bincount(segment.peer_id[:r0], minlength=len(segment.peer_keys)) > 0
+        _, first_index = np.unique(peer_ids, return_index=True)
+        first_rows = first_index[~seen_before[peer_ids[first_index]]]
+
+        result = []
+        for column, name in enumerate(("rx_delta", "tx_delta")):
+            deltas = segment.deltas(name)[r0:r1].copy()
+            # A counter that went down was reset; the new value is the delta
+            resets = np.flatnonzero(deltas < 0)
+            if len(resets):
+                stored = segment.deltas(name)
+                before = np.bincount(segment.peer_id[:r0], weights=stored[:r0],
+                                     minlength=len(segment.peer_keys)).astype(np.int64)
+                counters = before[peer_ids] + _grouped_cumsum(stored[r0:r1], peer_ids)
+                deltas[resets] = counters[resets]
+            # A peer's first row of the day stores its absolute counter
+            current = deltas[first_rows]
+            previous = self.baseline[peer_ids[first_rows], column]
+            deltas[first_rows] = counter_deltas(current, previous)
+            result.append(deltas)
+        return result
+
+    def _bounds(self, start: int, end: int) -> Tuple[int, int, int, int]:
+        """Sample range [lo, hi) and peer row range [r0, r1) of a time window."""
+        segment = self.segment
+        lo, hi = (int(i) for i in np.searchsorted(segment.timestamps, [start, end]))
+        if lo >= hi:
+            return lo, hi, 0, 0
+        r0 = int(segment.peer_end[lo - 1]) if lo else 0
+        return lo, hi, r0, int(segment.peer_end[hi - 1])
+
+    def totals(self, start: int, end: int) -> UsageTotals:
+        """Aggregate the samples with start <= timestamp < end."""
+        segment = self.segment
+        totals = UsageTotals()
+        lo, hi, r0, r1 = self._bounds(start, end)
+        if lo >= hi:
+            return totals
+        totals.samples = hi - lo
+
+        n_interfaces = max(len(segment.interfaces), 1)
+        i0 = int(segment.iface_end[lo - 1]) if lo else 0
+        i1 = int(segment.iface_end[hi - 1])
+        iface_ids = segment.iface_id[i0:i1].astype(np.int64)
+        iface_samples = np.bincount(iface_ids, minlength=n_interfaces)
+        uptime = np.bincount(iface_ids, weights=segment.iface_status[i0:i1], minlength=n_interfaces)
+
+        rows = slice(r0, r1)
+        interfaces = segment.peer_interface[rows]
+        peer_counts = np.bincount(
+            (segment.peer_sample[rows] - lo) * n_interfaces + interfaces,
+            minlength=(hi - lo) * n_interfaces
+        ).reshape(hi - lo, n_interfaces)
+        peak = peer_counts.max(axis=0)
+        rx_delta, tx_delta = self._byte_deltas(r0, r1)
+        rx = np.bincount(interfaces, weights=rx_delta, minlength=n_interfaces)
+        tx = np.bincount(interfaces, weights=tx_delta, minlength=n_interfaces)
+
+        for iface_index, name in enumerate(segment.interfaces):
+            if iface_samples[iface_index]:
+                totals.add_interface(name, int(iface_samples[iface_index]), int(uptime[iface_index]),
+                                     int(peak[iface_index]), int(rx[iface_index]), int(tx[iface_index]))
+
+        n_peers = len(segment.peer_keys)
+        peer_ids = segment.peer_id[rows].astype(np.int64)
+        online = segment.connected[rows] * self.spans[segment.peer_sample[rows]]
+        seen = np.bincount(peer_ids, minlength=n_peers)
+        online = np.bincount(peer_ids, weights=online, minlength=n_peers)
+        peer_rx = np.bincount(peer_ids, weights=rx_delta, minlength=n_peers)
+        peer_tx = np.bincount(peer_ids, weights=tx_delta, minlength=n_peers)
+        for peer_id in np.flatnonzero(seen):
+            totals.add_peer(segment.peer_keys[peer_id][:2], int(online[peer_id]),
+                            int(peer_rx[peer_id]), int(peer_tx[peer_id]))
+        return totals
+
+    def rates(self, start: int, end: int) -> RateSeries:
+        """Per-peer byte deltas and elapsed time for the samples in [start, end)."""
+        segment = self.segment
+        lo, hi, r0, r1 = self._bounds(start, end)
+        if lo >= hi:
+            return RateSeries.empty()
+        rx_delta, tx_delta = self._byte_deltas(r0, r1)
+        peer_ids = segment.peer_id[r0:r1].astype(np.int64)
+        timestamps = segment.timestamps[segment.peer_sample[r0:r1]]
+
+        # When each peer was last read before the window
+        last_read = np.where(self.baseline[:, 0] >= 0,
+                             np.nan if self.previous_ts is None else self.previous_ts, np.nan)
+        if r0:
+            before = segment.peer_id[:r0][::-1]
+            seen, reversed_index = np.unique(before, return_index=True)
+            last_read[seen] = segment.timestamps[segment.peer_sample[r0 - 1 - reversed_index]]
+
+        order = np.argsort(peer_ids, kind="stable")
+        ids = peer_ids[order]
+        previous = np.empty(len(order))
+        previous[1:] = timestamps[order][:-1]
+        first = np.r_[True, ids[1:] != ids[:-1]]
+        previous[first] = last_read[ids[first]]
+        elapsed = np.empty(len(order))
+        elapsed[order] = timestamps[order] - previous
+
+        return RateSeries([key[:2] for key in segment.peer_keys], peer_ids, timestamps,
+                          elapsed, rx_delta, tx_delta)
+
+    def last_state(self) -> Tuple[int, Dict[PeerKey, Tuple[int, int]]]:
+        """Timestamp of the last sample and each peer's last counters."""
+        return _last_state(self.segment)
+
+
+def _last_state(segment: Segment) -> Tuple[int, Dict[PeerKey, Tuple[int, int]]]:
+    # Stored deltas sum to each peer's final counter
+    n_peers = len(segment.peer_keys)
+    seen = np.bincount(segment.peer_id, minlength=n_peers)
+    rx = np.bincount(segment.peer_id, weights=segment.deltas("rx_delta"), minlength=n_peers)
+    tx = np.bincount(segment.peer_id, weights=segment.deltas("tx_delta"), minlength=n_peers)
+    counters = {segment.peer_keys[peer_id][:2]: (int(rx[peer_id]), int(tx[peer_id]))
+                for peer_id in np.flatnonzero(seen)}
+    return int(segment.timestamps[-1]), counters
+
+
+def _open_window(store: MetricsStore, day: date, days: List[date]) -> Optional[SegmentWindow]:
+    """Open a day's segment seeded with the state of the latest earlier segment."""
+    segment = store.open_day(day)
+    if segment is None or not segment.samples:
+        return None
+    previous_ts, previous_counters = None, None
+    earlier = [d for d in days if d < day]
+    for previous_day in reversed(earlier):
+        previous = store.open_day(previous_day)
+        if previous is not None and previous.samples:
+            previous_ts, previous_counters = _last_state(previous)
+            break
+    return SegmentWindow(segment, previous_ts, previous_counters)
+
+
+def raw_totals(store: MetricsStore, start: int, end: int) -> UsageTotals:
+    """Aggregate raw segment samples with start <= timestamp < end."""
+    totals = UsageTotals()
+    if start >= end:
+        return totals
+    days = store.days()
+    day, last_day = _local_date(start), _local_date(end - 1)
+    while day <= last_day:
+        if day in days:
+            window = _open_window(store, day, days)
+            if window is not None:
+                totals.merge(window.totals(start, end))
+        day += timedelta(days=1)
+    return totals
+
+
+def rate_series(store: MetricsStore, start: int, end: int) -> RateSeries:
+    """Per-peer byte deltas and rates for raw samples with start <= timestamp < end."""
+    parts = []
+    days = store.days()
+    day, last_day = _local_date(start), _local_date(end - 1)
+    while start < end and day <= last_day:
+        if day in days:
+            window = _open_window(store, day, days)
+            if window is not None:
+                parts.append(window.rates(start, end))
+        day += timedelta(days=1)
+    return RateSeries.concat(parts)
+
+
+class RollupStore:
+    """
+    SQLite store of hourly and daily rollups.
+
+    `add()` folds each stored sample into its hour and day buckets inside
+    one transaction, keeping the last counters per peer so byte deltas
+    survive restarts. `rebuild()` recomputes everything from the raw
+    segments.
+
+    A rebuild reads the segments inside its write transaction, so `add()`
+    calls from any process wait for it. Samples already appended to a
+    segment when the rebuild ran are counted by the rebuild and skipped
+    by the `add()` that follows. Stores in other processes reload their
+    counters when they see a new rebuild generation.
+    """
+
+    def __init__(self, db_path: Union[str, Path], timeout: float = 30.0):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        self._load_state(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _load_state(self, conn: sqlite3.Connection):
+        state = dict(conn.execute("SELECT key, value FROM rollup_state"))
+        self.last_ts: Optional[int] = state.get("last_ts")
+        self.built = bool(state.get("built"))
+        self.rebuilt_ts: Optional[int] = state.get("rebuilt_ts")
+        self.generation = state.get("generation", 0)
+        self.engine = RateEngine({
+            (iface, key): (rx, tx)
+            for iface, key, rx, tx in conn.execute(
+                "SELECT interface, public_key, rx_bytes, tx_bytes FROM peer_counters")
+        })
+
+    def add(self, metrics: Dict):
+        """Fold one collect_metrics() result into its hour and day buckets."""
+        timestamp = to_epoch(metrics["timestamp"])
+        interfaces = metrics.get("interfaces", {})
+        active = [data.get("status") == "active" for data in interfaces.values()]
+        peer_lists = [data.get("peers", []) if up else [] for data, up in zip(interfaces.values(), active)]
+        keys = [(iface, peer.get("public_key", ""))
+                for iface, peers in zip(interfaces, peer_lists) for peer in peers]
+        peers = [peer for peers in peer_lists for peer in peers]
+        rx = [int(peer.get("rx_bytes") or 0) for peer in peers]
+        tx = [int(peer.get("tx_bytes") or 0) for peer in peers]
+        connected = np.fromiter((bool(peer.get("connected")) for peer in peers), dtype=bool, count=len(peers))
+        iface_index = np.repeat(np.arange(len(interfaces)), [len(peers) for peers in peer_lists])
+
+        with self._lock:
+            conn = self._connect()
+            with _ImmediateTransaction(conn):
+                if self._generation(conn) != self.generation:
+                    # Rebuilt by another process; its counters replace ours
+                    self._load_state(conn)
+                if self.rebuilt_ts is not None and timestamp <= self.rebuilt_ts:
+                    # Already counted from its segment by the rebuild
+                    return
+
+                gap = timestamp - self.last_ts if self.last_ts is not None else 0
+                span = min(max(gap, 0), MAX_SAMPLE_SPAN)
+                rates = self.engine.update(timestamp, keys, rx, tx)
+
+                totals = UsageTotals()
+                totals.samples = 1
+                rx_totals = np.bincount(iface_index, weights=rates.rx_delta, minlength=len(interfaces))
+                tx_totals = np.bincount(iface_index, weights=rates.tx_delta, minlength=len(interfaces))
+                for i, iface in enumerate(interfaces):
+                    totals.add_interface(iface, 1, int(active[i]), len(peer_lists[i]),
+                                         int(rx_totals[i]), int(tx_totals[i]))
+                online = np.where(connected, span, 0).tolist()
+                for key, seconds, rx_delta, tx_delta in zip(keys, online, rates.rx_delta.tolist(),
+                                                            rates.tx_delta.tolist()):
+                    totals.add_peer(key, seconds, rx_delta, tx_delta)
+                changed = [(*key, rx_value, tx_value) for key, rx_value, tx_value in zip(keys, rx, tx)]
+
+                self._write(conn, HOUR, timestamp - timestamp % HOUR, totals)
+                self._write(conn, DAY, day_start(_local_date(timestamp)), totals)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO peer_counters (interface, public_key, rx_bytes, tx_bytes) "
+                    "VALUES (?, ?, ?, ?)", changed)
+                self._set_state(conn, "last_ts", max(timestamp, self.last_ts or timestamp))
+            self.last_ts = max(timestamp, self.last_ts or timestamp)
+
+    @staticmethod
+    def _generation(conn: sqlite3.Connection) -> int:
+        row = conn.execute("SELECT value FROM rollup_state WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _set_state(conn: sqlite3.Connection, key: str, value: int):
+        conn.execute("INSERT OR REPLACE INTO rollup_state (key, value) VALUES (?, ?)", (key, value))
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, resolution: int, bucket: int, totals: UsageTotals):
+        """Merge totals into one bucket."""
+        if totals.samples:
+            conn.execute(
+                "INSERT INTO sample_rollups (resolution, bucket, samples) VALUES (?, ?, ?) "
+                "ON CONFLICT DO UPDATE SET samples = samples + excluded.samples",
+                (resolution, bucket, totals.samples))
+        conn.executemany(
+            "INSERT INTO interface_rollups (resolution, bucket, interface, samples, uptime_samples, "
+            "peak_peers, rx_bytes, tx_bytes) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT DO UPDATE SET samples = samples + excluded.samples, "
+            "uptime_samples = uptime_samples + excluded.uptime_samples, "
+            "peak_peers = MAX(peak_peers, excluded.peak_peers), "
+            "rx_bytes = rx_bytes + excluded.rx_bytes, tx_bytes = tx_bytes + excluded.tx_bytes",
+            [(resolution, bucket, name, *row) for name, row in totals.interfaces.items()])
+        conn.executemany(
+            "INSERT INTO peer_rollups (resolution, bucket, interface, public_key, online_seconds, "
+            "rx_bytes, tx_bytes) VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT DO UPDATE SET online_seconds = online_seconds + excluded.online_seconds, "
+            "rx_bytes = rx_bytes + excluded.rx_bytes, tx_bytes = tx_bytes + excluded.tx_bytes",
+            [(resolution, bucket, *key, *row) for key, row in totals.peers.items()])
+
+    def _read(self, resolution: int, start: int, end: int) -> UsageTotals:
+        """Merge the buckets starting in [start, end)."""
+        conn = self._connect()
+        totals = UsageTotals()
+        bounds = (resolution, start, end)
+        totals.samples = conn.execute(
+            "SELECT COALESCE(SUM(samples), 0) FROM sample_rollups "
+            "WHERE resolution = ? AND bucket >= ? AND bucket < ?", bounds).fetchone()[0]
+        for name, *row in conn.execute(
+                "SELECT interface, SUM(samples), SUM(uptime_samples), MAX(peak_peers), "
+                "SUM(rx_bytes), SUM(tx_bytes) FROM interface_rollups "
+                "WHERE resolution = ? AND bucket >= ? AND bucket < ? GROUP BY interface", bounds):
+            totals.add_interface(name, *row)
+        for iface, key, *row in conn.execute(
+                "SELECT interface, public_key, SUM(online_seconds), SUM(rx_bytes), SUM(tx_bytes) "
+                "FROM peer_rollups WHERE resolution = ? AND bucket >= ? AND bucket < ? "
+                "GROUP BY interface, public_key", bounds):
+            totals.add_peer((iface, key), *row)
+        return totals
+
+    def usage(self, start: int, end: int, store: MetricsStore) -> UsageTotals:
+        """
+        Aggregate every sample with start <= timestamp < end.
+
+        Whole days come from daily rollups and whole hours around them
+        from hourly rollups; only partially covered hours are read from
+        the raw segments in `store`.
+        """
+        totals = UsageTotals()
+        first = _local_date(start)
+        if day_start(first) < start:
+            first += timedelta(days=1)
+        last = first
+        while day_start(last + timedelta(days=1)) <= end:
+            last += timedelta(days=1)
+
+        if last > first:
+            day_from, day_to = day_start(first), day_start(last)
+            totals.merge(self._read(DAY, day_from, day_to))
+            gaps = ((start, day_from), (day_to, end))
+        else:
+            gaps = ((start, end),)
+
+        for gap_start, gap_end in gaps:
+            if gap_start >= gap_end:
+                continue
+            hour_from = -(-gap_start // HOUR) * HOUR
+            hour_to = gap_end // HOUR * HOUR
+            if hour_from < hour_to:
+                totals.merge(self._read(HOUR, hour_from, hour_to))
+                edges = ((gap_start, hour_from), (hour_to, gap_end))
+            else:
+                edges = ((gap_start, gap_end),)
+            for edge_start, edge_end in edges:
+                totals.merge(raw_totals(store, edge_start, edge_end))
+        return totals
+
+    def rebuild(self, store: MetricsStore):
+        """Recompute every rollup from the raw segments in `store`."""
+        with self._lock:
+            conn = self._connect()
+            # Read the segments under the write lock so no add() lands in between
+            with _ImmediateTransaction(conn):
+                generation = self._generation(conn)
+                windows = []
+                previous_ts, counters = None, {}
+                for day in store.days():
+                    segment = store.open_day(day)
+                    if segment is None or not segment.samples:
+                        continue
+                    window = SegmentWindow(segment, previous_ts, counters)
+                    windows.append((day, window))
+                    previous_ts, last_counters = window.last_state()
+                    counters = {**counters, **last_counters}
+
+                for table in ("sample_rollups", "interface_rollups", "peer_rollups", "peer_counters"):
+                    conn.execute(f"DELETE FROM {table}")
+                for day, window in windows:
+                    day_from, day_to = day_start(day), day_start(day + timedelta(days=1))
+                    self._write(conn, DAY, day_from, window.totals(day_from, day_to))
+                    for hour in range(day_from - day_from % HOUR, day_to, HOUR):
+                        self._write(conn, HOUR, hour, window.totals(hour, hour + HOUR))
+                conn.executemany(
+                    "INSERT INTO peer_counters (interface, public_key, rx_bytes, tx_bytes) "
+                    "VALUES (?, ?, ?, ?)", [(*key, *value) for key, value in counters.items()])
+                conn.execute("DELETE FROM rollup_state")
+                if previous_ts is not None:
+                    self._set_state(conn, "last_ts", previous_ts)
+                    self._set_state(conn, "rebuilt_ts", previous_ts)
+                self._set_state(conn, "built", 1)
+                self._set_state(conn, "generation", generation + 1)
+            self._load_state(conn)
+
+    def remove_before(self, cutoff: int):
+        """Drop buckets that start before the cutoff timestamp."""
+        conn = self._connect()
+        with _ImmediateTransaction(conn):
+            for table in ("sample_rollups", "interface_rollups", "peer_rollups"):
+                conn.execute(f"DELETE FROM {table} WHERE bucket < ?", (cutoff,))
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
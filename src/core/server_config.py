@@ -0,0 +1,399 @@
+"""
+Server Configuration Builder
+
+Regenerates the server's wg0.conf from the IPAM lease store and the
+client key store, and applies peer changes to the running interface as
+a minimal diff instead of restarting the tunnel. Live peers no client
+owns (added by hand or by older scripts) are imported, never dropped;
+removing peers takes an explicit prune.
+"""
+
+import base64
+import binascii
+import ipaddress
+import os
+import subprocess
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from .ipam import IPAMStore, IPAM_DB_NAME, SERVER_LEASE, _read_sections
+from .keystore import KeystoreSession, is_encrypted_key
+from .templates import SERVER_CONFIG_TEMPLATE, render_template
+
+# Above this many changed peers a single `wg syncconf` beats per-peer `wg set`
+SYNCCONF_THRESHOLD = 256
+
+Runner = Callable[[Sequence[str], Optional[str]], str]
+
+
+@dataclass(frozen=True)
+class ServerPeer:
+    """One [Peer] entry as the server sees it."""
+
+    public_key: str
+    allowed_ips: Tuple[str, ...]
+    preshared_key: Optional[str] = None
+    name: Optional[str] = field(default=None, compare=False)
+
+
+@dataclass
+class PeerDiff:
+    """Peers to add, update and remove to move the interface to the desired set."""
+
+    added: List[ServerPeer] = field(default_factory=list)
+    changed: List[ServerPeer] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.added) + len(self.changed) + len(self.removed)
+
+    def summary(self) -> Dict[str, int]:
+        return {"added": len(self.added), "changed": len(self.changed),
+                "removed": len(self.removed)}
+
+
+def diff_peers(current: Dict[str, ServerPeer], desired: Dict[str, ServerPeer]) -> PeerDiff:
+    """
+    Compute the peer changes that turn current into desired.
+
+    Both arguments map public key to peer; unchanged peers cost one dict
+    lookup and comparison each and produce no work.
+    """
+    diff = PeerDiff()
+    for public_key, peer in desired.items():
+        existing = current.get(public_key)
+        if existing is None:
+            diff.added.append(peer)
+        elif existing != peer:
+            diff.changed.append(peer)
+    diff.removed = [public_key for public_key in current if public_key not in desired]
+    return diff
+
+
+def parse_peer_dump(output: str) -> Dict[str, ServerPeer]:
+    """Parse the peer lines of `wg show <interface> dump` into ServerPeer objects."""
+    peers = {}
+    # The first line describes the interface itself
+    for line in output.splitlines()[1:]:
+        fields = line.split("\t")
+        if len(fields) < 4:
+            continue
+        public_key, preshared_key, _, allowed_ips = fields[:4]
+        peers[public_key] = ServerPeer(
+            public_key=public_key,
+            allowed_ips=() if allowed_ips == "(none)" else tuple(sorted(allowed_ips.split(","))),
+            preshared_key=None if preshared_key == "(none)" else preshared_key,
+        )
+    return peers
+
+
+def _run(args: Sequence[str], input: Optional[str] = None) -> str:
+    result = subprocess.run(list(args), input=input, capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+class ServerConfigBuilder:
+    """
+    Owns the server's [Interface] and full [Peer] set.
+
+    Desired peers come from IPAM leases joined with each client's saved
+    public key. `sync()` rewrites the config file only when its content
+    changes, reads the live peer set once with `wg show dump`, and
+    applies just the differences: a batched `wg set` for small diffs,
+    `wg syncconf` for large ones.
+    """
+
+    def __init__(self, keys_dir: str = "/etc/wireguard",
+                 network: str = "10.0.0.0/24",
+                 interface: str = "wg0",
+                 listen_port: int = 51820,
+                 internet_interface: Optional[str] = "eth0",
+                 ipam: Optional[IPAMStore] = None,
+                 server_name: str = "server",
+                 runner: Optional[Runner] = None,
+                 session: Optional[KeystoreSession] = None):
+        self.keys_dir = Path(keys_dir)
+        self.network = ipaddress.ip_network(network)
+        self.interface = interface
+        self.listen_port = listen_port
+        self.internet_interface = internet_interface
+        self.ipam = ipam or IPAMStore(self.keys_dir / IPAM_DB_NAME)
+        self.server_name = server_name
+        self.runner = runner or _run
+        self.session = session
+
+    @property
+    def config_file(self) -> Path:
+        return self.keys_dir / f"{self.interface}.conf"
+
+    def server_address(self) -> str:
+        """Return the server's VPN address (its IPAM reservation, or the first host)."""
+        for lease in self.ipam.leases(str(self.network)):
+            if lease["client_name"] == SERVER_LEASE:
+                return lease["address"]
+        return str(next(self.network.hosts()))
+
+    @property
+    def private_key_file(self) -> Path:
+        return self.keys_dir / f"{self.server_name}_private.key"
+
+    def server_private_key(self) -> str:
+        """Return the server private key, decrypting it with the session if needed."""
+        key_file = self.private_key_file
+        if not key_file.exists():
+            raise FileNotFoundError(f"Server private key not found: {key_file}")
+        text = key_file.read_text().strip()
+        if not is_encrypted_key(text):
+            return text
+        if self.session is None:
+            raise ValueError(f"Server private key is encrypted: {key_file}")
+        return self.session.decrypt(text)
+
+    def desired_peers(self) -> Dict[str, ServerPeer]:
+        """
+        Build the desired peer set from IPAM leases and saved client keys.
+
+        Leases whose client has no saved public key are skipped.
+
+        Returns:
+            Mapping of public key to ServerPeer, in address order
+        """
+        clients_dir = self.keys_dir / "clients"
+        peers = {}
+        for lease in self.ipam.leases(str(self.network)):
+            name = lease["client_name"]
+            if lease["kind"] != "lease" or not name or name == SERVER_LEASE:
+                continue
+
+            public_file = clients_dir / name / "public.key"
+            if not public_file.exists():
+                continue
+            prefix = self.network.max_prefixlen
+
+            public_key = public_file.read_text().strip()
+            peers[public_key] = ServerPeer(
+                public_key=public_key,
+                allowed_ips=(f"{lease['address']}/{prefix}",),
+                preshared_key=self.client_preshared_key(name),
+                name=name,
+            )
+        return peers
+
+    def client_preshared_key(self, name: str) -> Optional[str]:
+        """
+        Return a client's preshared key.
+
+        Read from clients/<name>/preshared.key, falling back to the
+        PresharedKey in the client's own config for clients created
+        before the key was saved separately.
+        """
+        client_dir = self.keys_dir / "clients" / name
+        preshared_file = client_dir / "preshared.key"
+        if preshared_file.exists():
+            return preshared_file.read_text().strip() or None
+        for config_file in sorted(client_dir.glob("*.conf")):
+            for section in _read_sections(config_file):
+                if section["["] == "peer" and section.get("presharedkey"):
+                    return section["presharedkey"]
+        return None
+
+    def client_keys(self) -> Dict[str, str]:
+        """Map every saved client public key to its client name."""
+        keys = {}
+        for public_file in (self.keys_dir / "clients").glob("*/public.key"):
+            keys[public_file.read_text().strip()] = public_file.parent.name
+        return keys
+
+    def import_peers(self, live: Dict[str, ServerPeer],
+                     desired: Dict[str, ServerPeer]) -> List[ServerPeer]:
+        """
+        Adopt live peers that no saved client owns.
+
+        A peer whose AllowedIPs is a single address in the VPN network is
+        leased that address in IPAM (under the name an existing lease
+        already gives it, else imported-<key prefix>) and gets its public
+        and preshared keys saved like any other client. Peers routing
+        other subnets cannot be expressed as a lease and are left alone.
+
+        Returns:
+            The imported peers
+        """
+        owned = self.client_keys()
+        imported = []
+        for public_key, peer in live.items():
+            if public_key in desired or public_key in owned or len(peer.allowed_ips) != 1:
+                continue
+            address = ipaddress.ip_interface(peer.allowed_ips[0])
+            if address.network.num_addresses != 1 or address.ip not in self.network:
+                continue
+
+            name = self.ipam.owner(str(self.network), str(address.ip))
+            if name is None or name == SERVER_LEASE or (self.keys_dir / "clients" / name / "public.key").exists():
+                try:
+                    raw = base64.b64decode(public_key, validate=True)
+                except (binascii.Error, ValueError):
+                    raw = public_key.encode()
+                name = f"imported-{raw[:4].hex()}"
+            try:
+                self.ipam.adopt(str(self.network), str(address.ip), name)
+            except ValueError:
+                continue
+
+            client_dir = self.keys_dir / "clients" / name
+            client_dir.mkdir(parents=True, exist_ok=True)
+            (client_dir / "public.key").write_text(public_key + "\n")
+            if peer.preshared_key:
+                preshared_file = client_dir / "preshared.key"
+                preshared_file.write_text(peer.preshared_key + "\n")
+                os.chmod(preshared_file, 0o600)
+            imported.append(ServerPeer(public_key, peer.allowed_ips, peer.preshared_key, name))
+        return imported
+
+    def render(self, peers: Optional[Dict[str, ServerPeer]] = None, strip: bool = False) -> str:
+        """
+        Render the complete server configuration.
+
+        Args:
+            peers: Peer set to render (default: desired_peers())
+            strip: Omit wg-quick-only keys (Address, PostUp, ...) so the
+                result can be fed to `wg syncconf`
+
+        Returns:
+            Configuration text
+        """
+        peers = self.desired_peers() if peers is None else peers
+        return render_template(
+            SERVER_CONFIG_TEMPLATE,
+            server_private_key=self.server_private_key(),
+            server_ip=self.server_address(),
+            network_prefix=self.network.prefixlen,
+            listen_port=self.listen_port,
+            internet_interface=self.internet_interface,
+            peers=list(peers.values()),
+            strip=strip,
+        )
+
+    def write(self, peers: Optional[Dict[str, ServerPeer]] = None,
+              config_file: Optional[Union[str, Path]] = None) -> bool:
+        """
+        Write the server configuration atomically with 0600 permissions.
+
+        Returns:
+            True if the file changed, False if it already had this content
+        """
+        path = Path(config_file) if config_file else self.config_file
+        config = self.render(peers)
+        try:
+            if path.read_text() == config:
+                return False
+        except FileNotFoundError:
+            pass
+
+        fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(config)
+            os.chmod(tmp_name, 0o600)
+            os.replace(tmp_name, path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+        return True
+
+    def live_peers(self) -> Dict[str, ServerPeer]:
+        """Read the peers currently configured on the interface."""
+        return parse_peer_dump(self.runner(["wg", "show", self.interface, "dump"], None))
+
+    def plan(self, desired: Optional[Dict[str, ServerPeer]] = None,
+             live: Optional[Dict[str, ServerPeer]] = None, prune: bool = False) -> PeerDiff:
+        """
+        Diff the live interface against the desired peer set.
+
+        Live peers outside the desired set are only listed for removal
+        when prune is set; otherwise they are kept as they are.
+        """
+        desired = self.desired_peers() if desired is None else desired
+        live = self.live_peers() if live is None else live
+        diff = diff_peers(live, desired)
+        if not prune:
+            diff.removed = []
+        return diff
+
+    def apply(self, diff: PeerDiff, desired: Optional[Dict[str, ServerPeer]] = None,
+              full: bool = False) -> str:
+        """
+        Apply a peer diff to the running interface.
+
+        Args:
+            diff: Changes from plan()
+            desired: Full desired peer set, needed for the syncconf path
+            full: Always use `wg syncconf` with the complete peer set
+
+        Returns:
+            "noop", "set" or "syncconf", describing what was run
+        """
+        if not diff and not full:
+            return "noop"
+
+        if full or len(diff) > SYNCCONF_THRESHOLD:
+            desired = self.desired_peers() if desired is None else desired
+            self.runner(["wg", "syncconf", self.interface, "/dev/stdin"],
+                        self.render(desired, strip=True))
+            return "syncconf"
+
+        # Peers without a preshared key share one `wg set` invocation
+        batch = ["wg", "set", self.interface]
+        for public_key in diff.removed:
+            batch += ["peer", public_key, "remove"]
+        for peer in diff.added + diff.changed:
+            args = ["peer", peer.public_key, "allowed-ips", ",".join(peer.allowed_ips)]
+            if peer.preshared_key:
+                self.runner(["wg", "set", self.interface] + args +
+                            ["preshared-key", "/dev/stdin"], peer.preshared_key + "\n")
+            else:
+                batch += args + ["preshared-key", "/dev/null"]
+        if len(batch) > 3:
+            self.runner(batch, None)
+        return "set"
+
+    def sync(self, write_config: bool = True, dry_run: bool = False,
+             full: bool = False, prune: bool = False) -> Dict:
+        """
+        Regenerate the config file and bring the live interface in line.
+
+        Live peers no client owns are imported first (see import_peers).
+        Any other live peer missing from the desired set stays on the
+        interface and in the config unless prune is set.
+
+        Args:
+            write_config: Rewrite the config file if it changed
+            dry_run: Only compute the diff (nothing is imported)
+            full: Reload every peer with `wg syncconf`
+            prune: Remove live peers that are not in the desired set
+
+        Returns:
+            Dictionary with the diff summary and the actions taken
+        """
+        live = self.live_peers()
+        desired = self.desired_peers()
+        imported = [] if dry_run else self.import_peers(live, desired)
+        if imported:
+            desired = self.desired_peers()
+
+        diff = self.plan(desired, live, prune=prune)
+        # Unpruned strays are written back so the config keeps matching the interface
+        kept = {} if prune else {key: peer for key, peer in live.items() if key not in desired}
+        peers = {**desired, **kept}
+
+        result = {"peers": len(peers), "diff": diff.summary(), "imported": len(imported),
+                  "kept": len(kept), "config_written": False, "method": "noop"}
+        if dry_run:
+            return result
+
+        if write_config:
+            result["config_written"] = self.write(peers)
+        result["method"] = self.apply(diff, peers, full=full)
+        return result
@@ -0,0 +1,143 @@
+"""
+Template Registry
+
+Compiles every Jinja2 template once per process and shares the compiled
+objects between the config generators and report writers.
+"""
+
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from jinja2 import (
+    ChoiceLoader,
+    DictLoader,
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    Template,
+)
+
+# Repository templates/*.template files
+TEMPLATES_DIR = Path(__file__).parent.parent.parent / "templates"
+
+CLIENT_CONFIG_TEMPLATE = "client_config"
+SERVER_PEER_TEMPLATE = "server_peer"
+SERVER_CONFIG_TEMPLATE = "server_config"
+
+# Built-in templates used by ClientConfigGenerator
+BUILTIN_TEMPLATES = {
+    CLIENT_CONFIG_TEMPLATE: """[Interface]
+# {{ client_name }} - Generated on {{ timestamp }}
+PrivateKey = {{ client_private_key }}
+Address = {{ client_ip }}/32
+DNS = {{ dns_servers|join(', ') }}
+
+[Peer]
+# Server
+PublicKey = {{ server_public_key }}
+{% if preshared_key %}PresharedKey = {{ preshared_key }}
+{% endif %}Endpoint = {{ server_endpoint }}:{{ server_port }}
+AllowedIPs = {{ allowed_ips }}
+PersistentKeepalive = 25""",
+
+    SERVER_PEER_TEMPLATE: """
+[Peer]
+# Client: {{ client_ip }}
+PublicKey = {{ client_public_key }}
+{% if preshared_key %}PresharedKey = {{ preshared_key }}
+{% endif %}AllowedIPs = {{ client_ip }}/32""",
+
+    # Used by ServerConfigBuilder; strip=True drops wg-quick-only keys
+    SERVER_CONFIG_TEMPLATE: """[Interface]
+{% if not strip %}# Managed by `vpn.py server sync` - manual peer edits will be overwritten
+{% endif %}PrivateKey = {{ server_private_key }}
+{% if not strip %}Address = {{ server_ip }}/{{ network_prefix }}
+{% endif %}ListenPort = {{ listen_port }}
+{% if not strip %}SaveConfig = false
+{% if internet_interface %}PostUp = iptables -A FORWARD -i %i -j ACCEPT; iptables -A FORWARD -o %i -j ACCEPT; iptables -t nat -A POSTROUTING -o {{ internet_interface }} -j MASQUERADE
+PostDown = iptables -D FORWARD -i %i -j ACCEPT; iptables -D FORWARD -o %i -j ACCEPT; iptables -t nat -D POSTROUTING -o {{ internet_interface }} -j MASQUERADE
+{% endif %}{% endif %}
+{%- for peer in peers %}
+[Peer]
+{% if peer.name and not strip %}# Client: {{ peer.name }}
+{% endif %}PublicKey = {{ peer.public_key }}
+{% if peer.preshared_key %}PresharedKey = {{ peer.preshared_key }}
+{% endif %}AllowedIPs = {{ peer.allowed_ips|join(', ') }}
+{% endfor %}""",
+}
+
+
+class TemplateRegistry:
+    """
+    Cached Jinja2 environment for built-in and file-based templates.
+
+    Named templates resolve through a DictLoader for the built-ins and a
+    FileSystemLoader for `templates/`; auto_reload is off so a compiled
+    template is reused without re-checking the source. Compiled bytecode
+    is also persisted with FileSystemBytecodeCache so new processes skip
+    the parse/compile step. Ad-hoc source strings are compiled once and
+    cached by content hash.
+    """
+
+    def __init__(self, templates_dir: Optional[Path] = TEMPLATES_DIR,
+                 bytecode_cache_dir: Optional[str] = None):
+        self._builtins: Dict[str, str] = dict(BUILTIN_TEMPLATES)
+        loaders = [DictLoader(self._builtins)]
+        if templates_dir is not None:
+            loaders.append(FileSystemLoader(str(templates_dir)))
+
+        self.environment = Environment(
+            loader=ChoiceLoader(loaders),
+            bytecode_cache=FileSystemBytecodeCache(bytecode_cache_dir),
+            auto_reload=False,
+            cache_size=-1,
+        )
+        self._string_cache: Dict[str, Template] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, source: str):
+        """Register (or replace) a named in-memory template."""
+        with self._lock:
+            self._builtins[name] = source
+            self.environment.cache.clear()
+
+    def get(self, name: str) -> Template:
+        """Return the compiled template for a registered or file template."""
+        return self.environment.get_template(name)
+
+    def render(self, name: str, **context) -> str:
+        """Render a named template."""
+        return self.get(name).render(**context)
+
+    def from_string(self, source: str) -> Template:
+        """Return a compiled template for source text, compiling it only once."""
+        key = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        template = self._string_cache.get(key)
+        if template is None:
+            with self._lock:
+                template = self._string_cache.get(key)
+                if template is None:
+                    template = self.environment.from_string(source)
+                    self._string_cache[key] = template
+        return template
+
+
+_registry: Optional[TemplateRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> TemplateRegistry:
+    """Return the process-wide template registry."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TemplateRegistry()
+    return _registry
+
+
+def render_template(name: str, **context) -> str:
+    """Render a named template from the process-wide registry."""
+    return get_registry().render(name, **context)
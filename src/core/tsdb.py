@@ -0,0 +1,439 @@
+"""
+Columnar Monitoring Store
+
+Append-only, per-day segments of fixed-width column files replacing the
+monitor's daily JSONL documents. Peer keys, interfaces and endpoints are
+dictionary-encoded; timestamps and byte counters are delta-encoded.
+Segments are written with the stdlib `array` module and read back as
+memory-mapped NumPy views.
+
+Segment layout (monitoring_data/tsdb/YYYY-MM-DD/):
+    meta.json                      format version and base timestamp
+    peers.tsv                      peer id -> interface, public key, allowed IPs
+    interfaces.txt, endpoints.txt  id -> name (endpoint id 0 is "none")
+    ts_delta, peer_end, iface_end, load, mem_pct      one row per sample
+    iface_id, iface_status                            one row per interface per sample
+    peer_id, rx_delta, tx_delta, handshake_age,
+    endpoint_id, connected                            one row per peer per sample
+    overflow                       (column, row, delta) for deltas beyond int32
+
+Sample columns are appended last, so a sample is committed only when its
+row end offsets are on disk; a torn write is truncated on the next open.
+"""
+
+import json
+import math
+import os
+import shutil
+import sys
+from array import array
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+TSDB_DIR_NAME = "tsdb"
+FORMAT_VERSION = 1
+
+# Column name -> array typecode; all little-endian on disk
+SAMPLE_COLUMNS = {"ts_delta": "i", "peer_end": "I", "iface_end": "I", "load": "f", "mem_pct": "f"}
+IFACE_COLUMNS = {"iface_id": "H", "iface_status": "B"}
+PEER_COLUMNS = {"peer_id": "I", "rx_delta": "i", "tx_delta": "i", "handshake_age": "i",
+                "endpoint_id": "I", "connected": "B"}
+OVERFLOW_COLUMN = ("overflow", "q")
+
+_DTYPES = {"i": "<i4", "I": "<u4", "H": "<u2", "B": "u1", "f": "<f4", "q": "<i8"}
+
+# Counter deltas outside int32 are written as this and kept in "overflow"
+DELTA_ESCAPE = -2 ** 31
+_OVERFLOW_CODES = {"rx_delta": 0, "tx_delta": 1}
+
+# handshake_age for peers that never completed a handshake
+NO_HANDSHAKE = -1
+
+
+def _itemsize(typecode: str) -> int:
+    return array(typecode).itemsize
+
+
+def _append(handle, values: array):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    values.tofile(handle)
+
+
+def to_epoch(timestamp: Union[str, float, int]) -> int:
+    if isinstance(timestamp, str):
+        return int(datetime.fromisoformat(timestamp).timestamp())
+    return int(timestamp)
+
+
+def day_start(day: date) -> int:
+    return int(datetime(day.year, day.month, day.day).timestamp())
+
+
+def _read_lines(path: Path) -> List[str]:
+    if not path.exists():
+        return []
+    return path.read_text(encoding="utf-8").splitlines()
+
+
+class SegmentWriter:
+    """Appends samples to one day's segment."""
+
+    def __init__(self, path: Union[str, Path], day: date):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        meta_file = self.path / "meta.json"
+        if meta_file.exists():
+            self.meta = json.loads(meta_file.read_text())
+        else:
+            self.meta = {"version": FORMAT_VERSION, "day": day.isoformat(), "base_ts": day_start(day)}
+            meta_file.write_text(json.dumps(self.meta))
+
+        self.peers: Dict[Tuple[str, str], int] = {}
+        for peer_id, line in enumerate(_read_lines(self.path / "peers.tsv")):
+            iface, key, _ = (line.split("\t") + ["", ""])[:3]
+            self.peers[(iface, key)] = peer_id
+        self.interfaces = {name: i for i, name in enumerate(_read_lines(self.path / "interfaces.txt"))}
+        self.endpoints = {name: i + 1 for i, name in enumerate(_read_lines(self.path / "endpoints.txt"))}
+
+        self.samples, self.peer_rows, self.iface_rows = self._repair()
+        self.last_ts, self.last_rx, self.last_tx = self._load_state()
+        self._handles = {
+            name: open(self.path / name, "ab")
+            for name in (*PEER_COLUMNS, *IFACE_COLUMNS, OVERFLOW_COLUMN[0], *SAMPLE_COLUMNS)
+        }
+
+    def _column_rows(self, name: str, typecode: str) -> int:
+        column = self.path / name
+        return column.stat().st_size // _itemsize(typecode) if column.exists() else 0
+
+    def _read_column(self, name: str, typecode: str) -> array:
+        values = array(typecode)
+        column = self.path / name
+        if column.exists():
+            values.frombytes(column.read_bytes())
+            if sys.byteorder != "little":
+                values.byteswap()
+        return values
+
+    def _truncate(self, name: str, typecode: str, rows: int):
+        column = self.path / name
+        if column.exists() and column.stat().st_size != rows * _itemsize(typecode):
+            os.truncate(column, rows * _itemsize(typecode))
+
+    def _repair(self) -> Tuple[int, int, int]:
+        """Drop any partially written sample; return committed row counts."""
+        samples = min(self._column_rows(name, code) for name, code in SAMPLE_COLUMNS.items())
+        for name, code in SAMPLE_COLUMNS.items():
+            self._truncate(name, code, samples)
+
+        peer_rows = iface_rows = 0
+        if samples:
+            peer_rows = self._read_column("peer_end", "I")[-1]
+            iface_rows = self._read_column("iface_end", "I")[-1]
+        for name, code in PEER_COLUMNS.items():
+            self._truncate(name, code, peer_rows)
+        for name, code in IFACE_COLUMNS.items():
+            self._truncate(name, code, iface_rows)
+
+        overflow = self._read_column(*OVERFLOW_COLUMN)
+        keep = len(overflow) - len(overflow) % 3
+        while keep >= 3 and overflow[keep - 2] >= peer_rows:
+            keep -= 3
+        self._truncate(OVERFLOW_COLUMN[0], OVERFLOW_COLUMN[1], keep)
+        return samples, peer_rows, iface_rows
+
+    def _load_state(self) -> Tuple[int, Dict[int, int], Dict[int, int]]:
+        """Rebuild the last timestamp and per-peer counters for delta encoding."""
+        last_ts = self.meta["base_ts"] + sum(self._read_column("ts_delta", "i"))
+        overflow = self._read_column(*OVERFLOW_COLUMN)
+        exact = {(overflow[i], overflow[i + 1]): overflow[i + 2] for i in range(0, len(overflow), 3)}
+
+        last = ({}, {})
+        peer_ids = self._read_column("peer_id", "I")
+        for code, name in enumerate(("rx_delta", "tx_delta")):
+            counters = last[code]
+            for row, (peer_id, delta) in enumerate(zip(peer_ids, self._read_column(name, "i"))):
+                if delta == DELTA_ESCAPE:
+                    delta = exact[(code, row)]
+                counters[peer_id] = counters.get(peer_id, 0) + delta
+        return last_ts, last[0], last[1]
+
+    def _dictionary_id(self, table: Dict, key, filename: str, line: str, first_id: int = 0) -> int:
+        found = table.get(key)
+        if found is None:
+            found = table[key] = len(table) + first_id
+            with open(self.path / filename, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        return found
+
+    def append(self, timestamp: int, interfaces: Dict[str, Dict], system: Optional[Dict] = None):
+        """
+        Append one monitoring sample.
+
+        Args:
+            timestamp: Unix time of the sample
+            interfaces: collect_metrics()["interfaces"]
+            system: collect_metrics()["system"]
+        """
+        system = system or {}
+        peer_cols = {name: array(code) for name, code in PEER_COLUMNS.items()}
+        iface_cols = {name: array(code) for name, code in IFACE_COLUMNS.items()}
+        overflow = array(OVERFLOW_COLUMN[1])
+
+        for iface, data in interfaces.items():
+            iface_cols["iface_id"].append(
+                self._dictionary_id(self.interfaces, iface, "interfaces.txt", iface))
+            active = data.get("status") == "active"
+            iface_cols["iface_status"].append(int(active))
+            if not active:
+                continue
+
+            for peer in data.get("peers", []):
+                key = peer.get("public_key", "")
+                peer_id = self._dictionary_id(self.peers, (iface, key), "peers.tsv",
+                                              f"{iface}\t{key}\t{peer.get('allowed_ips') or ''}")
+                row = self.peer_rows + len(peer_cols["peer_id"])
+                peer_cols["peer_id"].append(peer_id)
+
+                for name, last, value in (("rx_delta", self.last_rx, int(peer.get("rx_bytes") or 0)),
+                                          ("tx_delta", self.last_tx, int(peer.get("tx_bytes") or 0))):
+                    delta = value - last.get(peer_id, 0)
+                    last[peer_id] = value
+                    if -2 ** 31 < delta < 2 ** 31:
+                        peer_cols[name].append(delta)
+                    else:
+                        peer_cols[name].append(DELTA_ESCAPE)
+                        overflow.extend((_OVERFLOW_CODES[name], row, delta))
+
+                handshake = str(peer.get("latest_handshake") or "0")
+                handshake = int(handshake) if handshake.isdigit() else 0
+                peer_cols["handshake_age"].append(
+                    max(0, timestamp - handshake) if handshake else NO_HANDSHAKE)
+
+                endpoint = peer.get("endpoint")
+                peer_cols["endpoint_id"].append(
+                    self._dictionary_id(self.endpoints, endpoint, "endpoints.txt", endpoint, first_id=1)
+                    if endpoint else 0)
+                peer_cols["connected"].append(int(bool(peer.get("connected"))))
+
+        self.peer_rows += len(peer_cols["peer_id"])
+        self.iface_rows += len(iface_cols["iface_id"])
+        sample_cols = {
+            "ts_delta": array("i", [timestamp - self.last_ts]),
+            "peer_end": array("I", [self.peer_rows]),
+            "iface_end": array("I", [self.iface_rows]),
+            "load": array("f", [system.get("load_average", math.nan)]),
+            "mem_pct": array("f", [system.get("memory_usage_percent", math.nan)]),
+        }
+        self.last_ts = timestamp
+
+        # Row columns first; the sample row that references them commits the write
+        for columns in (peer_cols, iface_cols, {OVERFLOW_COLUMN[0]: overflow}, sample_cols):
+            for name, values in columns.items():
+                if values:
+                    _append(self._handles[name], values)
+                    self._handles[name].flush()
+        self.samples += 1
+
+    def close(self):
+        for handle in self._handles.values():
+            handle.close()
+        self._handles = {}
+
+
+def _grouped_cumsum(deltas, groups):
+    """Cumulative sum of deltas restarted for every group id."""
+    order = np.argsort(groups, kind="stable")
+    sorted_groups = groups[order]
+    totals = np.cumsum(deltas[order])
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    offsets = np.repeat(totals[starts] - deltas[order][starts], np.diff(np.r_[starts, len(order)]))
+    result = np.empty_like(totals)
+    result[order] = totals - offsets
+    return result
+
+
+class Segment:
+    """
+    Read-only NumPy view of one day's segment.
+
+    Column files are memory-mapped; derived arrays (absolute timestamps
+    and counters) are computed on first access.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text())
+        self.peer_keys = [tuple((line.split("\t") + ["", ""])[:3])
+                          for line in _read_lines(self.path / "peers.tsv")]
+        self.interfaces = _read_lines(self.path / "interfaces.txt")
+        self.endpoints = [None] + _read_lines(self.path / "endpoints.txt")
+
+        samples = min(self._rows(name, code) for name, code in SAMPLE_COLUMNS.items())
+        self.peer_end = self.column("peer_end")[:samples]
+        self.iface_end = self.column("iface_end")[:samples]
+        self.samples = samples
+        self.peer_rows = int(self.peer_end[-1]) if samples else 0
+        self.iface_rows = int(self.iface_end[-1]) if samples else 0
+        self._cache: Dict[str, object] = {}
+
+    def _rows(self, name: str, typecode: str) -> int:
+        column = self.path / name
+        return column.stat().st_size // _itemsize(typecode) if column.exists() else 0
+
+    def column(self, name: str):
+        """Memory-mapped view of a raw column file."""
+        typecode = {**SAMPLE_COLUMNS, **IFACE_COLUMNS, **PEER_COLUMNS, OVERFLOW_COLUMN[0]: OVERFLOW_COLUMN[1]}[name]
+        dtype = np.dtype(_DTYPES[typecode])
+        column = self.path / name
+        if not column.exists() or column.stat().st_size < dtype.itemsize:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(column, dtype=dtype, mode="r",
+                         shape=(column.stat().st_size // dtype.itemsize,))
+
+    def _cached(self, name, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    @property
+    def timestamps(self):
+        """Absolute Unix time of every sample (int64)."""
+        return self._cached("timestamps", lambda: self.meta["base_ts"] + np.cumsum(
+            self.column("ts_delta")[:self.samples], dtype=np.int64))
+
+    @property
+    def peer_sample(self):
+        """Sample index of every peer row."""
+        return self._cached("peer_sample", lambda: np.repeat(
+            np.arange(self.samples), np.diff(self.peer_end, prepend=0).astype(np.int64)))
+
+    @property
+    def iface_sample(self):
+        """Sample index of every interface row."""
+        return self._cached("iface_sample", lambda: np.repeat(
+            np.arange(self.samples), np.diff(self.iface_end, prepend=0).astype(np.int64)))
+
+    @property
+    def peer_id(self):
+        return self.column("peer_id")[:self.peer_rows]
+
+    @property
+    def peer_interface(self):
+        """Interface id of every peer row."""
+        def build():
+            lookup = {name: i for i, name in enumerate(self.interfaces)}
+            by_peer = np.array([lookup.get(key[0], 0) for key in self.peer_keys] or [0], dtype=np.int64)
+            return by_peer[self.peer_id]
+        return self._cached("peer_interface", build)
+
+    def deltas(self, name: str):
+        """Stored per-row counter deltas ("rx_delta"/"tx_delta") as int64, overflow applied."""
+        def build():
+            deltas = self.column(name)[:self.peer_rows].astype(np.int64)
+            overflow = self.column("overflow")
+            overflow = overflow[:len(overflow) - len(overflow) % 3].reshape(-1, 3)
+            overflow = overflow[(overflow[:, 0] == _OVERFLOW_CODES[name]) & (overflow[:, 1] < self.peer_rows)]
+            deltas[overflow[:, 1]] = overflow[:, 2]
+            return deltas
+        return self._cached(name, build)
+
+    def _counter(self, name: str):
+        deltas = self.deltas(name)
+        if not len(deltas):
+            return deltas
+        return _grouped_cumsum(deltas, self.peer_id.astype(np.int64))
+
+    @property
+    def rx_bytes(self):
+        """Absolute receive counter of every peer row."""
+        return self._cached("rx_bytes", lambda: self._counter("rx_delta"))
+
+    @property
+    def tx_bytes(self):
+        """Absolute transmit counter of every peer row."""
+        return self._cached("tx_bytes", lambda: self._counter("tx_delta"))
+
+    @property
+    def latest_handshake(self):
+        """Handshake Unix time of every peer row (0 if none)."""
+        def build():
+            age = self.column("handshake_age")[:self.peer_rows].astype(np.int64)
+            return np.where(age >= 0, self.timestamps[self.peer_sample] - age, 0)
+        return self._cached("latest_handshake", build)
+
+    @property
+    def connected(self):
+        return self.column("connected")[:self.peer_rows].astype(bool)
+
+    @property
+    def iface_id(self):
+        return self.column("iface_id")[:self.iface_rows]
+
+    @property
+    def iface_status(self):
+        return self.column("iface_status")[:self.iface_rows].astype(bool)
+
+
+class MetricsStore:
+    """Per-day columnar segments under monitoring_data/tsdb."""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self._writer: Optional[SegmentWriter] = None
+        self._writer_day: Optional[date] = None
+
+    def segment_path(self, day: date) -> Path:
+        return self.root / day.isoformat()
+
+    def append(self, metrics: Dict):
+        """Append one collect_metrics() result to its day's segment."""
+        timestamp = to_epoch(metrics["timestamp"])
+        day = datetime.fromtimestamp(timestamp).date()
+        if self._writer_day != day:
+            self.close()
+            self._writer = SegmentWriter(self.segment_path(day), day)
+            self._writer_day = day
+        self._writer.append(timestamp, metrics.get("interfaces", {}), metrics.get("system"))
+
+    def days(self) -> List[date]:
+        found = []
+        if self.root.exists():
+            for path in self.root.iterdir():
+                try:
+                    found.append(date.fromisoformat(path.name))
+                except ValueError:
+                    continue
+        return sorted(found)
+
+    def open_day(self, day: date) -> Optional[Segment]:
+        path = self.segment_path(day)
+        return Segment(path) if (path / "meta.json").exists() else None
+
+    def segments(self, start: date, end: date) -> Iterable[Segment]:
+        """Yield segments for each day in [start, end] that has data."""
+        day = start
+        while day <= end:
+            segment = self.open_day(day)
+            if segment is not None and segment.samples:
+                yield segment
+            day += timedelta(days=1)
+
+    def remove_before(self, cutoff: date) -> int:
+        removed = 0
+        for day in self.days():
+            if day < cutoff and day != self._writer_day:
+                shutil.rmtree(self.segment_path(day), ignore_errors=True)
+                removed += 1
+        return removed
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._writer_day = None
@@ -0,0 +1,435 @@
+"""
+WireGuard Status Polling
+
+Parses `wg show all dump` into typed records and publishes immutable
+snapshots from a single background poller, so readers never run `wg`.
+Interface state comes from one `wg show all dump` per read, or straight
+from the kernel over generic netlink when pyroute2 is installed.
+"""
+
+import errno
+import socket
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+try:
+    from pyroute2 import WireGuard as NetlinkWireGuard
+    from pyroute2.netlink.exceptions import NetlinkError
+    PYROUTE2_AVAILABLE = True
+except ImportError:
+    PYROUTE2_AVAILABLE = False
+
+# A peer with a handshake newer than this is considered connected
+CONNECTED_THRESHOLD = 180
+
+Runner = Callable[[], str]
+
+
+@dataclass(frozen=True)
+class PeerState:
+    """One peer line of `wg show all dump` (preshared key omitted)."""
+
+    interface: str
+    public_key: str
+    endpoint: Optional[str]
+    allowed_ips: Tuple[str, ...]
+    latest_handshake: int
+    rx_bytes: int
+    tx_bytes: int
+    persistent_keepalive: Optional[int]
+
+    def is_connected(self, now: Optional[float] = None,
+                     threshold: int = CONNECTED_THRESHOLD) -> bool:
+        if not self.latest_handshake:
+            return False
+        now = time.time() if now is None else now
+        return now - self.latest_handshake < threshold
+
+    def to_dict(self, now: Optional[float] = None) -> Dict:
+        return {
+            "interface": self.interface,
+            "public_key": self.public_key,
+            "endpoint": self.endpoint,
+            "allowed_ips": list(self.allowed_ips),
+            "latest_handshake": self.latest_handshake,
+            "rx_bytes": self.rx_bytes,
+            "tx_bytes": self.tx_bytes,
+            "persistent_keepalive": self.persistent_keepalive,
+            "connected": self.is_connected(now),
+        }
+
+
+@dataclass(frozen=True)
+class InterfaceState:
+    """One interface line of `wg show all dump` (private key omitted)."""
+
+    name: str
+    public_key: str
+    listen_port: int
+    fwmark: Optional[str]
+    peers: Tuple[PeerState, ...] = ()
+
+
+@dataclass(frozen=True)
+class WireGuardSnapshot:
+    """
+    Immutable view of every interface at one poll.
+
+    `seq` grows with every poll; `version` is the seq of the poll where
+    what the snapshot reports (interfaces, error or any peer's connection
+    state) last changed, and `changed_at` that poll's time.
+    """
+
+    seq: int
+    taken_at: float
+    interfaces: Mapping[str, InterfaceState] = field(default_factory=lambda: MappingProxyType({}))
+    error: Optional[str] = None
+    version: int = 0
+    changed_at: float = 0.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self.interfaces)
+
+    def peers(self, interface: Optional[str] = None) -> Tuple[PeerState, ...]:
+        """Return the peers of one interface, or of all interfaces."""
+        if interface is not None:
+            state = self.interfaces.get(interface)
+            return state.peers if state else ()
+        return tuple(peer for state in self.interfaces.values() for peer in state.peers)
+
+
+def _optional(value: str) -> Optional[str]:
+    return None if value in ("(none)", "off", "") else value
+
+
+def _int(value: str) -> int:
+    return int(value) if value.isdigit() else 0
+
+
+def parse_wg_dump(output: str) -> Dict[str, InterfaceState]:
+    """
+    Parse `wg show all dump` output.
+
+    Interface lines have 5 tab-separated fields and peer lines 9; both
+    start with the interface name.
+
+    Args:
+        output: Raw command output
+
+    Returns:
+        Mapping of interface name to InterfaceState
+    """
+    headers: Dict[str, Tuple] = {}
+    peers: Dict[str, list] = {}
+
+    for line in output.splitlines():
+        fields = line.split("\t")
+        if len(fields) == 5:
+            name, _, public_key, listen_port, fwmark = fields
+            headers[name] = (public_key, _int(listen_port), _optional(fwmark))
+            peers.setdefault(name, [])
+        elif len(fields) == 9:
+            name, public_key, _, endpoint, allowed_ips, handshake, rx, tx, keepalive = fields
+            keepalive = _optional(keepalive)
+            peers.setdefault(name, []).append(PeerState(
+                interface=name,
+                public_key=public_key,
+                endpoint=_optional(endpoint),
+                allowed_ips=tuple(allowed_ips.split(",")) if _optional(allowed_ips) else (),
+                latest_handshake=_int(handshake),
+                rx_bytes=_int(rx),
+                tx_bytes=_int(tx),
+                persistent_keepalive=int(keepalive) if keepalive else None,
+            ))
+
+    return {
+        name: InterfaceState(name, *headers.get(name, ("", 0, None)), peers=tuple(peers[name]))
+        for name in peers
+    }
+
+
+def format_wg_dump(interfaces: Mapping[str, InterfaceState]) -> str:
+    """
+    Serialize parsed interfaces back to `wg show all dump` lines.
+
+    Private and preshared keys are not kept by the parser and are
+    written as "(hidden)", so the output is safe to hand to other hosts
+    and parses back to the same records.
+    """
+    lines = []
+    for name, state in interfaces.items():
+        lines.append(f"{name}\t(hidden)\t{state.public_key}\t{state.listen_port}\t{state.fwmark or 'off'}")
+        for peer in state.peers:
+            lines.append("\t".join((
+                name, peer.public_key, "(hidden)", peer.endpoint or "(none)",
+                ",".join(peer.allowed_ips) or "(none)", str(peer.latest_handshake),
+                str(peer.rx_bytes), str(peer.tx_bytes),
+                str(peer.persistent_keepalive) if peer.persistent_keepalive else "off",
+            )))
+    return "".join(line + "\n" for line in lines)
+
+
+def _run_wg_dump() -> str:
+    result = subprocess.run(["wg", "show", "all", "dump"],
+                            capture_output=True, text=True, check=True, timeout=10)
+    return result.stdout
+
+
+class DumpSource:
+    """
+    Reads every interface from one `wg show all dump`.
+
+    One process per read regardless of how many interfaces exist. Pass
+    a runner returning dump text to read canned output in tests.
+    """
+
+    def __init__(self, runner: Optional[Runner] = None):
+        self.runner = runner or _run_wg_dump
+
+    def read(self) -> Dict[str, InterfaceState]:
+        return parse_wg_dump(self.runner())
+
+    def close(self):
+        pass
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value or "")
+
+
+def _endpoint(value) -> Optional[str]:
+    if not value or not value.get("port"):
+        return None
+    addr = _text(value.get("addr"))
+    return f"[{addr}]:{value['port']}" if ":" in addr else f"{addr}:{value['port']}"
+
+
+def _allowed_ip(ip) -> str:
+    # pyroute2 keeps WGALLOWEDIP_A_IPADDR as hex ("0a:00:00:02") and the decoded address under "addr"
+    addr = ip.get("addr")
+    if not addr:
+        raw = bytes.fromhex(_text(ip.get_attr("WGALLOWEDIP_A_IPADDR")).replace(":", ""))
+        addr = socket.inet_ntop(socket.AF_INET if len(raw) == 4 else socket.AF_INET6, raw)
+    return f"{addr}/{ip.get_attr('WGALLOWEDIP_A_CIDR_MASK')}"
+
+
+class NetlinkSource:
+    """
+    Reads interfaces from the kernel over one persistent generic netlink socket.
+
+    No process is started; the kernel answers WG_CMD_GET_DEVICE for each
+    name, and interfaces that do not exist are left out like they are
+    from a dump.
+
+    Args:
+        interfaces: Interface names to query
+    """
+
+    def __init__(self, interfaces: Iterable[str]):
+        if not PYROUTE2_AVAILABLE:
+            raise RuntimeError("pyroute2 is not installed")
+        self.interfaces = list(interfaces)
+        self._socket = NetlinkWireGuard()
+
+    def read(self) -> Dict[str, InterfaceState]:
+        result = {}
+        for name in self.interfaces:
+            try:
+                messages = self._socket.info(name)
+            except NetlinkError as e:
+                if e.code == errno.ENODEV:
+                    continue
+                raise OSError(e.code, f"netlink query for {name} failed: {e}") from e
+            result[name] = self._interface(name, messages)
+        return result
+
+    @staticmethod
+    def _interface(name: str, messages) -> InterfaceState:
+        # Large devices are split over several messages; only the first carries the header
+        header = messages[0]
+        peers = []
+        for message in messages:
+            for peer in message.get_attr("WGDEVICE_A_PEERS") or ():
+                allowed = tuple(_allowed_ip(ip) for ip in peer.get_attr("WGPEER_A_ALLOWEDIPS") or ())
+                handshake = peer.get_attr("WGPEER_A_LAST_HANDSHAKE_TIME") or {}
+                keepalive = peer.get_attr("WGPEER_A_PERSISTENT_KEEPALIVE_INTERVAL")
+                peers.append(PeerState(
+                    interface=name,
+                    public_key=_text(peer.get_attr("WGPEER_A_PUBLIC_KEY")),
+                    endpoint=_endpoint(peer.get_attr("WGPEER_A_ENDPOINT")),
+                    allowed_ips=allowed,
+                    latest_handshake=int(handshake.get("tv_sec", 0)),
+                    rx_bytes=int(peer.get_attr("WGPEER_A_RX_BYTES") or 0),
+                    tx_bytes=int(peer.get_attr("WGPEER_A_TX_BYTES") or 0),
+                    persistent_keepalive=keepalive or None,
+                ))
+        fwmark = header.get_attr("WGDEVICE_A_FWMARK")
+        return InterfaceState(
+            name=name,
+            public_key=_text(header.get_attr("WGDEVICE_A_PUBLIC_KEY")),
+            listen_port=int(header.get_attr("WGDEVICE_A_LISTEN_PORT") or 0),
+            fwmark=hex(fwmark) if fwmark else None,
+            peers=tuple(peers),
+        )
+
+    def close(self):
+        self._socket.close()
+
+
+def wireguard_source(interfaces: Iterable[str], runner: Optional[Runner] = None):
+    """
+    Pick how to read WireGuard state.
+
+    Uses netlink when pyroute2 is installed and the kernel exposes the
+    wireguard genetlink family, otherwise `wg show all dump`. Passing a
+    runner always selects the dump parser.
+    """
+    if runner is None and PYROUTE2_AVAILABLE:
+        try:
+            return NetlinkSource(interfaces)
+        except (NetlinkError, OSError):
+            pass
+    return DumpSource(runner)
+
+
+def _unchanged(previous: WireGuardSnapshot, interfaces: Mapping[str, InterfaceState],
+               error: Optional[str], now: float) -> bool:
+    """True if a poll at `now` reports exactly what `previous` did, connection state included."""
+    if not previous.seq or previous.error != error or previous.interfaces != interfaces:
+        return False
+    return all(peer.is_connected(previous.taken_at) == peer.is_connected(now)
+               for peer in previous.peers())
+
+
+class WireGuardPoller:
+    """
+    Single background thread that polls WireGuard at a fixed interval.
+
+    Each poll publishes a new WireGuardSnapshot by rebinding one
+    attribute, so readers take `poller.snapshot` without locking and
+    always see a complete, consistent view. Failures publish an empty
+    snapshot carrying the error message.
+    """
+
+    def __init__(self, interval: float = 2.0, runner: Optional[Runner] = None):
+        self.interval = interval
+        self.runner = runner or _run_wg_dump
+        self.snapshot = WireGuardSnapshot(seq=0, taken_at=0.0)
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll_once(self) -> WireGuardSnapshot:
+        """Run one poll and publish its snapshot."""
+        previous = self.snapshot
+        seq = previous.seq + 1
+        try:
+            interfaces, error = MappingProxyType(parse_wg_dump(self.runner())), None
+        except (subprocess.SubprocessError, OSError) as e:
+            interfaces, error = MappingProxyType({}), str(e) or type(e).__name__
+        now = time.time()
+        if _unchanged(previous, interfaces, error, now):
+            version, changed_at = previous.version, previous.changed_at
+        else:
+            version, changed_at = seq, now
+        snapshot = WireGuardSnapshot(seq, now, interfaces, error, version, changed_at)
+
+        with self._condition:
+            self.snapshot = snapshot
+            self._condition.notify_all()
+        return snapshot
+
+    def wait_for_update(self, after_seq: int, timeout: Optional[float] = None) -> WireGuardSnapshot:
+        """Block until a snapshot newer than after_seq is published, the poller stops, or timeout."""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self.snapshot.seq > after_seq or self._stop.is_set(), timeout)
+            return self.snapshot
+
+    def start(self):
+        """Poll once synchronously, then keep polling in the background."""
+        if self._thread is not None:
+            return
+        self.poll_once()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="wg-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        # Release readers blocked in wait_for_update
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        next_poll = time.monotonic() + self.interval
+        while not self._stop.wait(max(0.0, next_poll - time.monotonic())):
+            self.poll_once()
+            next_poll += self.interval
+            # Skip ticks missed while `wg` was slow instead of bursting
+            now = time.monotonic()
+            if next_poll < now:
+                next_poll = now + self.interval
+
+
+def _peer_key(peer: PeerState) -> str:
+    return f"{peer.interface}:{peer.public_key}"
+
+
+def diff_snapshots(old: WireGuardSnapshot, new: WireGuardSnapshot,
+                   now: Optional[float] = None) -> Dict:
+    """
+    Describe what changed between two snapshots, field by field.
+
+    Connection state is judged at each snapshot's own time, so a peer
+    whose handshake goes stale between polls is reported as
+    disconnected even when nothing else about it changed.
+
+    Args:
+        old: Snapshot the receiver last saw
+        new: Latest snapshot
+        now: Time to judge the new snapshot at (default: new.taken_at)
+
+    Returns:
+        Dictionary with "updated" (only the changed fields of each peer,
+        with rx/tx as deltas), "added" (full peer dicts) and "removed"
+        (peer ids), keyed by "<interface>:<public_key>"
+    """
+    now = (new.taken_at or time.time()) if now is None else now
+    then = old.taken_at or now
+    before = {_peer_key(peer): peer for peer in old.peers()}
+    updated, added = {}, {}
+
+    for peer in new.peers():
+        peer_id = _peer_key(peer)
+        previous = before.pop(peer_id, None)
+        if previous is None:
+            added[peer_id] = peer.to_dict(now)
+            continue
+
+        changes = {}
+        if peer.latest_handshake != previous.latest_handshake:
+            changes["latest_handshake"] = peer.latest_handshake
+        if peer.endpoint != previous.endpoint:
+            changes["endpoint"] = peer.endpoint
+        if peer.allowed_ips != previous.allowed_ips:
+            changes["allowed_ips"] = list(peer.allowed_ips)
+        if peer.rx_bytes != previous.rx_bytes:
+            changes["rx_delta"] = peer.rx_bytes - previous.rx_bytes
+        if peer.tx_bytes != previous.tx_bytes:
+            changes["tx_delta"] = peer.tx_bytes - previous.tx_bytes
+        connected = peer.is_connected(now)
+        if connected != previous.is_connected(then):
+            changes["connected"] = connected
+        if changes:
+            updated[peer_id] = changes
+
+    return {"updated": updated, "added": added, "removed": sorted(before)}
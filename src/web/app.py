@@ -7,32 +7,91 @@ Provides a web interface for managing WireGuard VPN clients and configurations.
 import os
 import sys
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file, stream_with_context
 from datetime import datetime
-import subprocess
+import hashlib
+import hmac
 import json
+import threading
+import time
 
 # Add src to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from src.core.keys import WireGuardKeyManager
 from src.core.client_config import ClientConfigGenerator
+from src.core.export import resolve_clients, stream_client_archive
+from src.core.fleet import FleetCollector, FleetPoller, fleet_summary, load_fleet
+from src.core.ipam import IPAMStore, IPAM_DB_NAME
+from src.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, PrometheusExporter
+from src.core.qr_cache import QRCodeCache, QR_CACHE_DIR_NAME
+from src.core.qr_render import QR_FORMATS, QR_MIMETYPES
+from src.core.wg_status import WireGuardPoller, diff_snapshots, format_wg_dump
+from src.web.client_index import ClientIndex
+from src.web.perf import PerfMonitor
+from src.web.http_cache import ResponseCompressor, conditional, make_etag, not_modified
+from src.web.jobs import JobQueue, JobQueueClosed, JobQueueFull
+
+# Clients rendered with the page; the rest are fetched as the table scrolls
+CLIENT_PAGE_SIZE = 50
+
+# Largest batch accepted by one /api/client/create request
+MAX_BATCH_SIZE = 500
+
+# Concurrent /api/stream/peers connections per process, and how long each
+# may stay open before the browser is asked to reconnect
+MAX_STREAMS = 8
+STREAM_LIFETIME = 300.0
 
 
 class VPNDashboard:
     """Main VPN management dashboard."""
     
-    def __init__(self, keys_dir="/etc/wireguard", server_endpoint=None):
+    def __init__(self, keys_dir="/etc/wireguard", server_endpoint=None,
+                 poll_interval=2.0, wg_runner=None, job_workers=2, max_pending_jobs=32,
+                 profile_slow_ms=None, profile_dir=None, fleet_file=None, fleet_interval=30.0,
+                 max_streams=MAX_STREAMS, stream_lifetime=STREAM_LIFETIME):
         self.app = Flask(__name__)
+        # Installed first so its timing wraps every other request hook
+        self.perf = PerfMonitor(self.app, slow_ms=profile_slow_ms, profile_dir=profile_dir)
         self.keys_dir = keys_dir
         self.server_endpoint = server_endpoint
         self.key_manager = WireGuardKeyManager(keys_dir)
+        self.ipam = IPAMStore(Path(keys_dir) / IPAM_DB_NAME)
+        self.qr_cache = QRCodeCache(Path(keys_dir) / "clients" / QR_CACHE_DIR_NAME)
+        
+        # Client listing is served from memory and kept current in the background
+        self.client_index = ClientIndex(Path(keys_dir) / "clients")
+        self.client_index.start()
+        
+        # One `wg show all dump` per interval, shared by every request
+        self.wg_poller = WireGuardPoller(interval=poll_interval, runner=wg_runner)
+        self.wg_poller.start()
+        self.metrics = PrometheusExporter(self.wg_poller, names=self._peer_names)
+        
+        # Optional fleet view: other servers collected concurrently in one thread
+        self.fleet_poller = None
+        if fleet_file:
+            collector = FleetCollector(load_fleet(fleet_file))
+            self.fleet_poller = FleetPoller(collector, interval=fleet_interval)
+            self.fleet_poller.start()
+        
+        # Client creation runs off the request thread; names being created are reserved
+        self.jobs = JobQueue(workers=job_workers, max_pending=max_pending_jobs)
+        self._creating = set()
+        self._creating_lock = threading.Lock()
+        
+        # Each live stream holds a request thread, so their number is capped
+        self.stream_lifetime = stream_lifetime
+        self._stream_slots = threading.BoundedSemaphore(max_streams)
+        self._closed = threading.Event()
         
         # Try to load server configuration
         self.server_config = self._load_server_config()
         
         # Set up routes
         self._setup_routes()
+        self.compressor = ResponseCompressor(self.app)
     
     def _load_server_config(self):
         """Load server configuration and public key."""
@@ -67,63 +126,104 @@ class VPNDashboard:
         @self.app.route('/')
         def dashboard():
             """Main dashboard page."""
-            clients = self._get_clients()
+            page = self.client_index.query(limit=CLIENT_PAGE_SIZE)
             server_status = self._get_server_status()
             
             return render_template('dashboard.html', 
-                                 clients=clients,
+                                 clients=page['clients'],
+                                 clients_total=page['total'],
+                                 next_cursor=page['next_cursor'],
+                                 page_size=CLIENT_PAGE_SIZE,
                                  server_status=server_status,
-                                 server_config=self.server_config)
+                                 server_config=self.server_config,
+                                 fleet_enabled=self.fleet_poller is not None)
         
         @self.app.route('/api/clients')
         def api_clients():
-            """API endpoint for client list."""
-            return jsonify(self._get_clients())
+            """
+            API endpoint for client list.
+            
+            Without query parameters this returns the full array as before.
+            With any of limit/cursor/offset/sort/order/prefix/q it returns
+            {"clients", "total", "next_cursor"} for one page.
+            """
+            params = request.args
+            # Read the version before the body so a racing update can only make the ETag stale
+            version = self.client_index.version
+            if not any(k in params for k in ('limit', 'cursor', 'offset', 'sort', 'order', 'prefix', 'q')):
+                return conditional(self.client_index.to_json, make_etag('clients', version))
+            
+            sort = params.get('sort', 'name')
+            handshakes, handshakes_version = self._handshakes() if sort == 'handshake' else (None, None)
+            etag = make_etag('clients', version, handshakes_version or 0,
+                             hashlib.sha1(request.query_string).hexdigest()[:12])
+            cached = not_modified(etag)
+            if cached is not None:
+                return cached
+            try:
+                page = self.client_index.query(
+                    prefix=params.get('prefix') or None,
+                    search=params.get('q') or None,
+                    sort=sort,
+                    descending=params.get('order', 'asc') == 'desc',
+                    limit=int(params.get('limit', CLIENT_PAGE_SIZE)),
+                    cursor=params.get('cursor') or None,
+                    offset=max(0, int(params.get('offset', 0))),
+                    handshakes=handshakes,
+                    handshakes_version=handshakes_version
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            response = jsonify(page)
+            response.headers['ETag'] = etag
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
         
         @self.app.route('/api/client/create', methods=['POST'])
         def api_create_client():
-            """API endpoint for creating new client."""
-            data = request.get_json()
-            client_name = data.get('name')
+            """
+            API endpoint for creating clients.
+            
+            Accepts {"name": ...} or {"names": [...]} and queues one job
+            for the batch. Responds 202 with the job id; poll
+            /api/jobs/<id> for per-client results.
+            """
+            data = request.get_json(silent=True) or {}
+            names = data.get('names') or ([data['name']] if data.get('name') else [])
             
-            if not client_name:
+            if not names:
                 return jsonify({'error': 'Client name required'}), 400
+            if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+                return jsonify({'error': 'names must be a list of strings'}), 400
+            if len(names) > MAX_BATCH_SIZE:
+                return jsonify({'error': f'At most {MAX_BATCH_SIZE} clients per request'}), 413
+            if 'public_key' not in self.server_config:
+                return jsonify({'error': 'Server public key not found'}), 500
             
             try:
-                # Generate client keys
-                client_keys = self.key_manager.save_client_keys(client_name)
-                
-                # Generate configuration
-                if 'public_key' not in self.server_config:
-                    return jsonify({'error': 'Server public key not found'}), 500
-                
-                config_gen = ClientConfigGenerator(
-                    server_public_key=self.server_config['public_key'],
-                    server_endpoint=self.server_config['endpoint'],
-                    server_port=self.server_config['port'],
-                    network_base=self.server_config['network']
-                )
-                
-                result = config_gen.save_client_package(
-                    client_name=client_name,
-                    client_private_key=client_keys['private_key'],
-                    output_dir=Path(self.keys_dir) / "clients",
-                    generate_qr=True
-                )
-                
-                return jsonify({
-                    'success': True,
-                    'client': {
-                        'name': client_name,
-                        'public_key': client_keys['public_key'],
-                        'config_file': result['config_file'],
-                        'qr_file': result.get('qr_file'),
-                        'created': datetime.now().isoformat()
-                    }
-                })
-                
-            except Exception as e:
-                return jsonify({'error': str(e)}), 500
+                job = self.jobs.submit('create_client', names, self._create_client)
+            except JobQueueFull:
+                response = jsonify({'error': 'Too many pending jobs, retry later'})
+                response.headers['Retry-After'] = '5'
+                return response, 429
+            except JobQueueClosed as e:
+                return jsonify({'error': str(e)}), 503
+            
+            return jsonify({
+                'success': True,
+                'job_id': job.id,
+                'status_url': f"/api/jobs/{job.id}",
+                'job': job.to_dict()
+            }), 202
+        
+        @self.app.route('/api/jobs/<job_id>')
+        def api_job_status(job_id):
+            """API endpoint for job status and per-item results."""
+            job = self.jobs.get(job_id)
+            if job is None:
+                return jsonify({'error': 'Job not found'}), 404
+            return jsonify(job.to_dict())
         
         @self.app.route('/api/client/<client_name>/config')
         def api_client_config(client_name):
@@ -133,96 +233,304 @@ class VPNDashboard:
             if not config_file.exists():
                 return jsonify({'error': 'Configuration not found'}), 404
             
-            return send_file(config_file, as_attachment=True, 
-                           mimetype='text/plain; charset=utf-8')
+            # Configs hold private keys: browsers may keep them, shared caches may not
+            config = config_file.read_bytes()
+            response = conditional(config, make_etag('conf', hashlib.sha256(config).hexdigest()[:32]),
+                                   mimetype='text/plain', cache_control='private, no-cache')
+            if response.status_code == 200:
+                response.headers['Content-Disposition'] = f'attachment; filename="{config_file.name}"'
+                response.charset = 'utf-8'
+            return response
         
         @self.app.route('/api/client/<client_name>/qr')
         def api_client_qr(client_name):
-            """Download client QR code."""
-            qr_file = Path(self.keys_dir) / "clients" / client_name / f"{client_name}_qr.png"
+            """Download client QR code, rendering it on first request."""
+            qr_format = request.args.get('format', self.qr_cache.qr_format)
+            if qr_format not in QR_FORMATS:
+                return jsonify({'error': f'Unsupported QR format: {qr_format}'}), 400
+            
+            client_dir = Path(self.keys_dir) / "clients" / client_name
+            qr_file = client_dir / f"{client_name}_qr.png"
+            config_file = client_dir / f"{client_name}.conf"
+            
+            if config_file.exists():
+                config = config_file.read_text(encoding='utf-8')
+                qr_cache = self.qr_cache
+                if qr_format != qr_cache.qr_format:
+                    qr_cache = QRCodeCache(qr_cache.cache_dir, qr_format=qr_format)
+                # The cache key already names the exact image, so a 304 skips rendering
+                return conditional(lambda: qr_cache.get_or_render(config),
+                                   make_etag('qr', qr_cache.key(config)[:32]),
+                                   mimetype=QR_MIMETYPES[qr_format],
+                                   cache_control='private, no-cache')
             
             if not qr_file.exists():
                 return jsonify({'error': 'QR code not found'}), 404
             
             return send_file(qr_file, mimetype='image/png')
         
+        @self.app.route('/api/clients/export.zip')
+        def api_clients_export():
+            """Stream a ZIP of selected (?client=a&client=b) or all client packages."""
+            clients_dir = Path(self.keys_dir) / "clients"
+            requested = [name for value in request.args.getlist('client')
+                         for name in value.split(',') if name]
+            
+            try:
+                names = resolve_clients(clients_dir, requested)
+            except KeyError as e:
+                return jsonify({'error': e.args[0]}), 404
+            
+            filename = f"vpn-clients-{datetime.now().strftime('%Y%m%d')}.zip"
+            return Response(
+                stream_with_context(stream_client_archive(clients_dir, names, self.qr_cache)),
+                mimetype='application/zip',
+                headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+            )
+        
+        @self.app.route('/api/stream/peers')
+        def api_stream_peers():
+            """
+            Server-Sent Events stream of per-peer changes.
+            
+            At most max_streams streams are open per process (503 beyond
+            that); each ends after stream_lifetime seconds or when the
+            dashboard closes, and the browser reconnects on its own.
+            """
+            if self._closed.is_set() or not self._stream_slots.acquire(blocking=False):
+                response = jsonify({'error': 'Too many live streams, retry later'})
+                response.headers['Retry-After'] = '30'
+                return response, 503
+            response = Response(
+                stream_with_context(self._peer_events()),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+            response.call_on_close(self._stream_slots.release)
+            return response
+        
+        @self.app.route('/metrics')
+        def metrics():
+            """Prometheus scrape endpoint rendered from the poller snapshot."""
+            return Response(self.metrics.render(), content_type=METRICS_CONTENT_TYPE)
+        
+        @self.app.route('/api/debug/perf')
+        def api_debug_perf():
+            """Per-route latency histograms, operation counts and slow-request profiles."""
+            return jsonify(self.perf.report())
+        
+        @self.app.route('/fleet')
+        def fleet():
+            """Fleet overview page."""
+            if self.fleet_poller is None:
+                return jsonify({'error': 'Fleet mode not enabled (start with --fleet-file)'}), 404
+            return render_template('fleet.html', interval=self.fleet_poller.interval)
+        
+        @self.app.route('/api/fleet')
+        def api_fleet():
+            """Aggregated status of every fleet server with per-server staleness."""
+            if self.fleet_poller is None:
+                return jsonify({'error': 'Fleet mode not enabled'}), 404
+            summary = fleet_summary(self.fleet_poller.states,
+                                    stale_after=self.fleet_poller.interval * 3)
+            summary['seq'] = self.fleet_poller.seq
+            return jsonify(summary)
+        
+        @self.app.route('/api/server/dump')
+        def api_server_dump():
+            """
+            Sanitized `wg show all dump` of this server for fleet agents.
+            
+            Requires "Authorization: Bearer $VPN_AGENT_TOKEN" when that
+            variable is set.
+            """
+            token = os.environ.get('VPN_AGENT_TOKEN')
+            supplied = request.headers.get('Authorization', '')
+            if token and not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+                return jsonify({'error': 'Unauthorized'}), 401
+            
+            snapshot = self.wg_poller.snapshot
+            if snapshot.error:
+                return jsonify({'error': snapshot.error}), 503
+            return conditional(lambda: format_wg_dump(snapshot.interfaces),
+                               make_etag('dump', snapshot.version), mimetype='text/plain')
+        
         @self.app.route('/api/server/status')
         def api_server_status():
             """API endpoint for server status."""
-            return jsonify(self._get_server_status())
+            version, body = self._server_status_json()
+            return conditional(body, make_etag('status', version))
+    
+    def _create_client(self, client_name):
+        """
+        Generate keys and configuration for one client (runs on a job worker).
+        
+        Args:
+            client_name: Name of the client directory to create
+            
+        Returns:
+            Dictionary describing the new client
+        """
+        if client_name in ('.', '..') or '/' in client_name or client_name.startswith('.'):
+            raise ValueError(f"Invalid client name: {client_name!r}")
+        
+        # Check and reserve in one step so concurrent jobs cannot both create the same client
+        with self._creating_lock:
+            if (client_name in self._creating or
+                    (Path(self.keys_dir) / "clients" / client_name / "public.key").exists()):
+                raise ValueError(f"Client already exists: {client_name}")
+            self._creating.add(client_name)
+        try:
+            return self._write_client(client_name)
+        finally:
+            with self._creating_lock:
+                self._creating.discard(client_name)
+    
+    def _write_client(self, client_name):
+        """Create a reserved client's keys, lease and configuration."""
+        client_keys = self.key_manager.save_client_keys(client_name)
+        
+        config_gen = ClientConfigGenerator(
+            server_public_key=self.server_config['public_key'],
+            server_endpoint=self.server_config['endpoint'],
+            server_port=self.server_config['port'],
+            network_base=self.server_config['network'],
+            ipam=self.ipam,
+            qr_cache=self.qr_cache
+        )
+        
+        # QR codes are rendered lazily by api_client_qr
+        result = config_gen.save_client_package(
+            client_name=client_name,
+            client_private_key=client_keys['private_key'],
+            output_dir=Path(self.keys_dir) / "clients",
+            generate_qr=False
+        )
+        self.client_index.refresh(client_name)
+        
+        return {
+            'name': client_name,
+            'public_key': client_keys['public_key'],
+            'client_ip': result['client_ip'],
+            'config_file': result['config_file'],
+            'qr_url': f"/api/client/{client_name}/qr",
+            'created': datetime.now().isoformat()
+        }
     
     def _get_clients(self):
         """Get list of configured clients."""
-        clients = []
-        clients_dir = Path(self.keys_dir) / "clients"
-        
-        if clients_dir.exists():
-            for client_dir in clients_dir.iterdir():
-                if client_dir.is_dir():
-                    public_key_file = client_dir / "public.key"
-                    config_file = client_dir / f"{client_dir.name}.conf"
-                    qr_file = client_dir / f"{client_dir.name}_qr.png"
-                    
-                    client_info = {
-                        'name': client_dir.name,
-                        'has_config': config_file.exists(),
-                        'has_qr': qr_file.exists(),
-                        'created': datetime.fromtimestamp(client_dir.stat().st_ctime).isoformat()
-                    }
-                    
-                    if public_key_file.exists():
-                        client_info['public_key'] = public_key_file.read_text().strip()
-                    
-                    clients.append(client_info)
-        
-        return clients
+        return self.client_index.clients()
     
-    def _get_server_status(self):
-        """Get WireGuard server status."""
-        status = {
-            'running': False,
-            'interface': None,
-            'peers': [],
-            'error': None
+    def _handshakes(self):
+        """Return (public key -> latest handshake, snapshot seq) from the poller."""
+        snapshot = self.wg_poller.snapshot
+        cached = getattr(self, '_handshake_cache', None)
+        if cached is None or cached[1] != snapshot.seq:
+            cached = ({peer.public_key: peer.latest_handshake for peer in snapshot.peers()},
+                      snapshot.seq)
+            self._handshake_cache = cached
+        return cached
+    
+    def _peer_names(self):
+        """Return (client index version, public key -> client name)."""
+        version = self.client_index.version
+        cached = getattr(self, '_peer_name_cache', None)
+        if cached is None or cached[0] != version:
+            cached = (version, {c['public_key']: c['name']
+                                for c in self.client_index.clients() if c.get('public_key')})
+            self._peer_name_cache = cached
+        return cached
+    
+    def _server_status_json(self):
+        """Return (snapshot version, serialized status), cached per version."""
+        snapshot = self.wg_poller.snapshot
+        cached = getattr(self, '_status_cache', None)
+        if cached is None or cached[0] != snapshot.version:
+            cached = (snapshot.version, json.dumps(self._get_server_status(snapshot)).encode())
+            self._status_cache = cached
+        return cached
+    
+    def _get_server_status(self, snapshot=None):
+        """
+        Get WireGuard server status from a poller snapshot (default: latest).
+        
+        Connection state is evaluated at poll time and only the snapshot
+        version (not the poll seq or time) is included, so the result
+        stays byte-identical across polls that saw no change and can be
+        cached and ETagged by the version.
+        """
+        snapshot = snapshot or self.wg_poller.snapshot
+        now = snapshot.taken_at or time.time()
+        return {
+            'running': snapshot.running,
+            'interface': ', '.join(snapshot.interfaces) or None,
+            'peers': [peer.to_dict(now) for peer in snapshot.peers()],
+            'error': snapshot.error,
+            'version': snapshot.version,
+            'updated': datetime.fromtimestamp(snapshot.changed_at).isoformat() if snapshot.changed_at else None
         }
+    
+    def _peer_events(self, heartbeat=15.0):
+        """
+        Yield SSE messages: one full snapshot, then only changed peer fields.
         
-        try:
-            # Check if WireGuard interface is up
-            result = subprocess.run(['wg', 'show'], capture_output=True, text=True)
-            if result.returncode == 0:
-                status['running'] = True
-                status['interface'] = result.stdout
-                
-                # Parse peer information
-                lines = result.stdout.strip().split('\n')
-                current_peer = None
-                
-                for line in lines:
-                    line = line.strip()
-                    if line.startswith('peer:'):
-                        if current_peer:
-                            status['peers'].append(current_peer)
-                        current_peer = {'public_key': line.split(': ')[1]}
-                    elif current_peer and ':' in line:
-                        key, value = line.split(': ', 1)
-                        current_peer[key.strip()] = value.strip()
-                
-                if current_peer:
-                    status['peers'].append(current_peer)
-            
-        except Exception as e:
-            status['error'] = str(e)
-        
-        return status
+        Each connection blocks on the poller's condition, so idle streams
+        cost nothing until a new snapshot arrives; a comment line is sent
+        every heartbeat seconds to keep proxies from closing the stream.
+        The stream ends after stream_lifetime seconds, or as soon as the
+        dashboard is closed (reload or shutdown), freeing its thread.
+        """
+        deadline = time.monotonic() + self.stream_lifetime
+        last = self.wg_poller.snapshot
+        yield _sse('snapshot', last.seq, {
+            'running': last.running,
+            'peers': [peer.to_dict(last.taken_at or None) for peer in last.peers()]
+        })
+        
+        while not self._closed.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            snapshot = self.wg_poller.wait_for_update(last.seq, timeout=min(heartbeat, remaining))
+            if self._closed.is_set():
+                break
+            if snapshot.seq == last.seq:
+                yield ': keepalive\n\n'
+                continue
+            
+            changes = diff_snapshots(last, snapshot)
+            if snapshot.running != last.running:
+                changes['running'] = snapshot.running
+            last = snapshot
+            if 'running' in changes or changes['updated'] or changes['added'] or changes['removed']:
+                yield _sse('peers', snapshot.seq, changes)
+        
+        # Reconnect promptly; the next stream starts with a fresh snapshot
+        yield 'retry: 1000\n\n'
     
     def run(self, host='0.0.0.0', port=5000, debug=False):
-        """Run the Flask application."""
-        self.app.run(host=host, port=port, debug=debug)
+        """Run the Flask development server (see src.web.serving for production)."""
+        self.app.run(host=host, port=port, debug=debug, threaded=True)
+    
+    def close(self):
+        """End live streams and stop the background poller, index watcher and job workers."""
+        self._closed.set()
+        self.wg_poller.stop()
+        self.client_index.stop()
+        if self.fleet_poller is not None:
+            self.fleet_poller.stop()
+        self.jobs.shutdown(wait=False)
+
+
+def _sse(event, event_id, data):
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\nid: {event_id}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
 
 
 def main():
     """Main entry point for the web dashboard."""
     import click
+    from src.web.serving import resolve_server, serve, serving_options
     
     @click.command()
     @click.option('--host', default='0.0.0.0', help='Host to bind to')
@@ -230,17 +538,30 @@ def main():
     @click.option('--debug', is_flag=True, help='Enable debug mode')
     @click.option('--keys-dir', default='/etc/wireguard', help='Directory containing keys')
     @click.option('--server-endpoint', help='Server public IP/endpoint')
-    def run_dashboard(host, port, debug, keys_dir, server_endpoint):
+    @click.option('--poll-interval', default=2.0, help='Seconds between WireGuard status polls')
+    @click.option('--profile-slow-ms', type=float, help='Write folded-stack profiles for requests slower than this')
+    @click.option('--fleet-file', type=click.Path(exists=True, dir_okay=False), help='JSON list of servers for the fleet view')
+    @click.option('--fleet-interval', default=30.0, help='Seconds between fleet refreshes')
+    @serving_options
+    def run_dashboard(host, port, debug, keys_dir, server_endpoint, poll_interval, profile_slow_ms,
+                      fleet_file, fleet_interval, server_name, workers, threads, streams, keepalive,
+                      graceful_timeout):
         """Run the VPN management web dashboard."""
-        dashboard = VPNDashboard(keys_dir=keys_dir, server_endpoint=server_endpoint)
+        server_name = resolve_server(server_name, workers, debug)
         
-        click.echo(f"🌐 Starting VPN Dashboard on http://{host}:{port}")
+        click.echo(f"🌐 Starting VPN Dashboard on http://{host}:{port} ({server_name})")
         click.echo(f"📁 Keys directory: {keys_dir}")
         
         if debug:
             click.echo("🐛 Debug mode enabled")
         
-        dashboard.run(host=host, port=port, debug=debug)
+        serve(lambda: VPNDashboard(keys_dir=keys_dir, server_endpoint=server_endpoint,
+                                   poll_interval=poll_interval, profile_slow_ms=profile_slow_ms,
+                                   fleet_file=fleet_file, fleet_interval=fleet_interval,
+                                   max_streams=streams),
+              host=host, port=port, server_name=server_name, workers=workers,
+              threads=threads, streams=streams, keepalive=keepalive, graceful_timeout=graceful_timeout,
+              debug=debug)
     
     run_dashboard()
 
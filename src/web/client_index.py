@@ -0,0 +1,401 @@
+"""
+Dashboard Client Index
+
+In-memory index of client directories, built once and kept current by
+inotify (or mtime polling where inotify is unavailable) plus explicit
+refresh hooks from the create path.
+"""
+
+import base64
+import json
+import os
+import select
+import struct
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+try:
+    import ctypes
+    import ctypes.util
+    _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    _inotify_init1 = _libc.inotify_init1
+    _inotify_add_watch = _libc.inotify_add_watch
+    _inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    INOTIFY_AVAILABLE = True
+except (OSError, AttributeError):
+    INOTIFY_AVAILABLE = False
+
+# inotify(7) event bits
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_DIR_EVENTS = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+_CLIENT_EVENTS = _DIR_EVENTS | IN_CLOSE_WRITE | IN_ATTRIB | IN_DELETE_SELF
+_EVENT_HEADER = struct.Struct("iIII")
+
+SORT_FIELDS = ("name", "created", "handshake")
+MAX_PAGE_SIZE = 500
+
+
+def _encode_cursor(sort: str, key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort, *key]).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str) -> tuple:
+    """Return the sort key a cursor continues after; it must come from the same sort."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(key, list) or len(key) != 3:
+            raise ValueError
+    except (ValueError, TypeError):
+        raise ValueError("Malformed cursor")
+    if key[0] != sort:
+        raise ValueError("Cursor does not match the sort field")
+    return tuple(key[1:])
+
+
+def scan_client(client_dir: Path) -> Optional[Dict]:
+    """Read one client directory into its dashboard listing entry."""
+    name = client_dir.name
+    try:
+        created = client_dir.stat().st_ctime
+    except FileNotFoundError:
+        return None
+
+    config_file = client_dir / f"{name}.conf"
+    public_key_file = client_dir / "public.key"
+    has_config = config_file.exists()
+
+    client_info = {
+        'name': name,
+        'has_config': has_config,
+        'has_qr': has_config or any(client_dir.glob(f"{name}_qr.*")),
+        'created': datetime.fromtimestamp(created).isoformat()
+    }
+    try:
+        client_info['public_key'] = public_key_file.read_text().strip()
+    except FileNotFoundError:
+        pass
+    return client_info
+
+
+class ClientIndex:
+    """
+    Cached listing of `clients/` for the dashboard.
+
+    Readers get an immutable snapshot (a list plus its pre-serialized
+    JSON) swapped in under a lock whenever an entry changes, so a listing
+    request never touches the disk. `version` increases with every
+    change and can be used as a cache validator.
+    """
+
+    def __init__(self, clients_dir: Union[str, Path], poll_interval: float = 2.0):
+        self.clients_dir = Path(clients_dir)
+        self.poll_interval = poll_interval
+        self.version = 0
+        self._entries: Dict[str, Dict] = {}
+        self._snapshot: List[Dict] = []
+        self._json: Optional[bytes] = None
+        self._orders: Dict[str, Tuple[List[tuple], List[Dict]]] = {}
+        self._handshake_order: Optional[Tuple[object, List[tuple], List[Dict]]] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.mode = None
+        self.rebuild()
+
+    # Reads
+
+    def clients(self) -> List[Dict]:
+        """Return the current client list (shared; do not mutate)."""
+        return self._snapshot
+
+    def get(self, name: str) -> Optional[Dict]:
+        return self._entries.get(name)
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+    def to_json(self) -> bytes:
+        """Return the client list serialized as JSON, cached per version."""
+        data = self._json
+        if data is None:
+            with self._lock:
+                if self._json is None:
+                    self._json = json.dumps(self._snapshot).encode()
+                data = self._json
+        return data
+
+    def _order(self, sort: str, handshakes: Optional[Mapping[str, int]],
+               handshakes_version: object) -> Tuple[List[tuple], List[Dict]]:
+        """
+        Return (sort_keys, entries) in ascending order for a sort field.
+
+        Orders are built once per index version (and, for handshake
+        order, once per handshakes_version) and then reused by every
+        request until something changes.
+        """
+        # Built and stored under the lock so an order is never cached
+        # against a snapshot _publish has already replaced
+        with self._lock:
+            snapshot = self._snapshot
+            if sort in ("name", "created"):
+                cached = self._orders.get(sort)
+                if cached is None:
+                    if sort == "name":
+                        cached = ([(c['name'], c['name']) for c in snapshot], snapshot)
+                    else:
+                        pairs = sorted(((c['created'], c['name']), c) for c in snapshot)
+                        cached = ([key for key, _ in pairs], [c for _, c in pairs])
+                    self._orders[sort] = cached
+                return cached
+
+            handshakes = handshakes or {}
+            cached = self._handshake_order
+            if cached is None or cached[0] != (self.version, handshakes_version):
+                pairs = sorted(((handshakes.get(c.get('public_key'), 0), c['name']), c) for c in snapshot)
+                cached = ((self.version, handshakes_version),
+                          [key for key, _ in pairs], [c for _, c in pairs])
+                self._handshake_order = cached
+            return cached[1], cached[2]
+
+    def query(self, prefix: Optional[str] = None, search: Optional[str] = None,
+              sort: str = "name", descending: bool = False, limit: int = 50,
+              cursor: Optional[str] = None, offset: int = 0,
+              handshakes: Optional[Mapping[str, int]] = None,
+              handshakes_version: object = None) -> Dict:
+        """
+        Return one page of clients from the cached sort orders.
+
+        Args:
+            prefix: Only names starting with this (binary search on name order)
+            search: Only names containing this, case-insensitively
+            sort: "name", "created" or "handshake"
+            descending: Reverse the sort order
+            limit: Page size (capped at MAX_PAGE_SIZE)
+            cursor: Opaque next_cursor from the previous page
+            offset: Entries to skip when no cursor is given
+            handshakes: Public key to latest handshake, for sort="handshake"
+            handshakes_version: Changes whenever handshakes does
+
+        Returns:
+            Dictionary with "clients", "total" matches and "next_cursor"
+
+        Raises:
+            ValueError: On an unknown sort field or malformed cursor
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Unknown sort field: {sort}")
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        keys, entries = self._order(sort, handshakes, handshakes_version)
+
+        # Candidate range in ascending order
+        lo, hi = 0, len(entries)
+        if prefix and sort == "name":
+            lo = bisect_left(keys, (prefix,))
+            hi = bisect_left(keys, (prefix + "\U0010ffff",), lo)
+
+        def matches(client: Dict) -> bool:
+            name = client['name']
+            if prefix and not name.startswith(prefix):
+                return False
+            return not search or search.lower() in name.lower()
+
+        filtered = bool(search or (prefix and sort != "name"))
+        total = sum(1 for p in range(lo, hi) if matches(entries[p])) if filtered else hi - lo
+
+        if cursor:
+            after = _decode_cursor(cursor, sort)
+            try:
+                if descending:
+                    hi = min(hi, bisect_left(keys, after, lo, hi))
+                else:
+                    lo = max(lo, bisect_right(keys, after, lo, hi))
+            except TypeError:
+                raise ValueError("Cursor does not match the sort field")
+
+        positions = range(hi - 1, lo - 1, -1) if descending else range(lo, hi)
+        page, skipped, last, has_more = [], 0, None, False
+        for position in positions:
+            client = entries[position]
+            if filtered and not matches(client):
+                continue
+            if not cursor and skipped < offset:
+                skipped += 1
+                continue
+            if len(page) == limit:
+                has_more = True
+                break
+            page.append(client)
+            last = position
+
+        return {
+            "clients": page,
+            "total": total,
+            "next_cursor": _encode_cursor(sort, keys[last]) if has_more else None,
+        }
+
+    # Updates
+
+    def _publish(self):
+        """Swap in a new snapshot; callers hold the lock."""
+        self._snapshot = [self._entries[name] for name in sorted(self._entries)]
+        self._json = None
+        self._orders = {}
+        self._handshake_order = None
+        self.version += 1
+
+    def _is_client_dir(self, path: Path) -> bool:
+        return not path.name.startswith('.') and path.is_dir()
+
+    def rebuild(self):
+        """Rescan every client directory."""
+        entries = {}
+        if self.clients_dir.exists():
+            for client_dir in self.clients_dir.iterdir():
+                if self._is_client_dir(client_dir):
+                    info = scan_client(client_dir)
+                    if info is not None:
+                        entries[client_dir.name] = info
+        with self._lock:
+            self._entries = entries
+            self._publish()
+
+    def refresh(self, name: str):
+        """Re-read one client (create/update hook); drops it if it is gone."""
+        client_dir = self.clients_dir / name
+        info = scan_client(client_dir) if self._is_client_dir(client_dir) else None
+        with self._lock:
+            if info is None:
+                if self._entries.pop(name, None) is None:
+                    return
+            elif self._entries.get(name) == info:
+                return
+            else:
+                self._entries[name] = info
+            self._publish()
+
+    def remove(self, name: str):
+        with self._lock:
+            if self._entries.pop(name, None) is not None:
+                self._publish()
+
+    # Watching
+
+    def start(self, use_inotify: bool = True) -> str:
+        """
+        Start the background watcher thread.
+
+        Returns:
+            "inotify" or "poll", whichever mode is running
+        """
+        if self._thread is not None:
+            return self.mode
+
+        self.clients_dir.mkdir(parents=True, exist_ok=True)
+        target = self._poll_loop
+        self.mode = "poll"
+        if use_inotify and INOTIFY_AVAILABLE:
+            fd = _inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+                self._watches: Dict[int, Optional[str]] = {}
+                self._add_watch(self.clients_dir, None, _DIR_EVENTS)
+                for name in list(self._entries):
+                    self._add_watch(self.clients_dir / name, name, _CLIENT_EVENTS)
+                target = self._inotify_loop
+                self.mode = "inotify"
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=target, name="client-index", daemon=True)
+        self._thread.start()
+        return self.mode
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _add_watch(self, path: Path, name: Optional[str], mask: int):
+        wd = _inotify_add_watch(self._fd, os.fsencode(str(path)), mask)
+        if wd >= 0:
+            self._watches[wd] = name
+
+    def _inotify_loop(self):
+        try:
+            while not self._stop.is_set():
+                ready, _, _ = select.select([self._fd], [], [], 0.5)
+                if not ready:
+                    continue
+                try:
+                    buffer = os.read(self._fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                self._handle_events(buffer)
+        finally:
+            os.close(self._fd)
+
+    def _handle_events(self, buffer: bytes):
+        dirty = set()
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            filename = os.fsdecode(buffer[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                self.rebuild()
+                return
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+
+            owner = self._watches.get(wd)
+            if owner is None:
+                # Event on clients/ itself: a client directory came or went
+                if not filename or filename.startswith('.') or not mask & IN_ISDIR:
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_watch(self.clients_dir / filename, filename, _CLIENT_EVENTS)
+                dirty.add(filename)
+            else:
+                dirty.add(owner)
+
+        for name in dirty:
+            self.refresh(name)
+
+    def _dir_mtimes(self) -> Dict[str, int]:
+        try:
+            return {entry.name: entry.stat().st_mtime_ns
+                    for entry in os.scandir(self.clients_dir)
+                    if entry.is_dir() and not entry.name.startswith('.')}
+        except FileNotFoundError:
+            return {}
+
+    def _poll_loop(self):
+        """Fallback: compare directory mtimes, rescanning only what changed."""
+        mtimes = self._dir_mtimes()
+        while not self._stop.wait(self.poll_interval):
+            current = self._dir_mtimes()
+            for name, mtime in current.items():
+                if mtimes.get(name) != mtime or name not in self._entries:
+                    self.refresh(name)
+            for name in set(mtimes) - set(current):
+                self.remove(name)
+            mtimes = current
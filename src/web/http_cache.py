@@ -0,0 +1,182 @@
+"""
+HTTP Caching for the Dashboard
+
+Strong ETags, If-None-Match handling and gzip/brotli compression of
+JSON responses. ETags are derived from versions the dashboard already
+tracks (client index version, poller snapshot seq, QR cache keys), so
+a revalidation is answered without building the response body.
+"""
+
+import gzip
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from flask import Flask, Response, request
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 512
+
+# Compressed bodies kept per (ETag, encoding)
+COMPRESSED_CACHE_SIZE = 64
+
+COMPRESSIBLE_MIMETYPES = ("application/json",)
+
+# Version counters restart with the process; this keeps old ETags from matching
+BOOT_ID = uuid.uuid4().hex[:8]
+
+_ETAG_SUFFIX = re.compile(r"-(gzip|br)$")
+
+
+def make_etag(*parts) -> str:
+    """Build a quoted strong ETag from version parts."""
+    return '"' + "-".join([BOOT_ID, *(str(part) for part in parts)]) + '"'
+
+
+def matching_etag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """
+    Find the tag in an If-None-Match header that matches an identity ETag.
+
+    Tags of compressed variants (suffixed -gzip/-br) match their
+    identity ETag; weak comparison is used as RFC 9110 requires here.
+
+    Returns:
+        The matching tag as the client sent it, or None
+    """
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    wanted = etag.strip('"')
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        opaque = tag[2:] if tag.startswith("W/") else tag
+        if _ETAG_SUFFIX.sub("", opaque.strip('"')) == wanted:
+            return opaque
+    return None
+
+
+def not_modified(etag: str, cache_control: str = "no-cache") -> Optional[Response]:
+    """Return a 304 for the current request if the client already has etag."""
+    matched = matching_etag(request.headers.get("If-None-Match"), etag)
+    if matched is None:
+        return None
+    response = Response(status=304)
+    # Echo the client's variant tag so its cached representation stays valid
+    response.headers["ETag"] = matched
+    response.headers["Cache-Control"] = cache_control
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def conditional(body, etag: str, mimetype: str = "application/json",
+                cache_control: str = "no-cache") -> Response:
+    """
+    Build a response carrying etag, or a 304 if the client has it.
+
+    Args:
+        body: Response body, or a callable producing it (skipped on 304)
+        etag: Quoted strong ETag from make_etag()
+        mimetype: Content type of the body
+        cache_control: Cache-Control value; "no-cache" makes browsers revalidate
+
+    Returns:
+        Flask response
+    """
+    cached = not_modified(etag, cache_control)
+    if cached is not None:
+        return cached
+    response = Response(body() if callable(body) else body, mimetype=mimetype)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0."""
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+
+    if BROTLI_AVAILABLE and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", accepted.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+class ResponseCompressor:
+    """
+    after_request hook compressing JSON bodies.
+
+    Compressed bodies are cached by ETag, so every dashboard polling the
+    same client index version or snapshot shares one compression.
+    """
+
+    def __init__(self, app: Flask, min_size: int = MIN_COMPRESS_SIZE,
+                 cache_size: int = COMPRESSED_CACHE_SIZE):
+        self.min_size = min_size
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        app.after_request(self)
+
+    def __call__(self, response: Response) -> Response:
+        if (response.status_code != 200 or response.is_streamed
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or "Content-Encoding" in response.headers):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        etag = response.headers.get("ETag")
+        key = (etag, encoding)
+        body = None
+        if etag:
+            with self._lock:
+                body = self._cache.get(key)
+                if body is not None:
+                    self._cache.move_to_end(key)
+        if body is None:
+            body = compress(data, encoding)
+            if etag:
+                with self._lock:
+                    self._cache[key] = body
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        if etag:
+            # Each encoding is a different representation and needs its own strong tag
+            response.headers["ETag"] = etag[:-1] + f'-{encoding}"'
+        return response
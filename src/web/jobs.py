@@ -0,0 +1,161 @@
+"""
+Dashboard Job Queue
+
+Runs slow dashboard operations (client creation) on a bounded pool of
+worker threads and keeps per-item results for status polling.
+"""
+
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Seconds an idle worker waits before re-checking for shutdown
+WORKER_POLL_INTERVAL = 0.5
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobQueueClosed(Exception):
+    """Raised when a job is submitted after shutdown."""
+
+
+class Job:
+    """A batch of items processed in order by one worker."""
+
+    def __init__(self, kind: str, items: Iterable[Any]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.items: List[Dict] = [{"item": item, "status": "pending"} for item in items]
+        self.done = threading.Event()
+
+    def to_dict(self) -> Dict:
+        counts = {"succeeded": 0, "failed": 0, "pending": 0}
+        for entry in self.items:
+            key = {"ok": "succeeded", "error": "failed"}.get(entry["status"], "pending")
+            counts[key] += 1
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "total": len(self.items),
+            **counts,
+            "items": [dict(entry) for entry in self.items],
+        }
+
+
+class JobQueue:
+    """
+    Bounded FIFO of jobs served by a fixed number of worker threads.
+
+    submit() never blocks: once max_pending jobs are waiting it raises
+    JobQueueFull so the caller can push back on the client. Finished jobs
+    are kept for lookup until `history` newer ones have finished.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 32, history: int = 1000):
+        self.history = history
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_pending)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, kind: str, items: Iterable[Any], func: Callable[[Any], Any]) -> Job:
+        """
+        Queue a job that calls func(item) for every item.
+
+        Raises:
+            JobQueueFull: If max_pending jobs are already waiting
+            JobQueueClosed: If the queue has been shut down
+        """
+        job = Job(kind, items)
+        with self._lock:
+            # Checked under the lock shutdown() closes with, so nothing lands after its sentinels
+            if self._closed:
+                raise JobQueueClosed("Job queue is shutting down")
+            self._jobs[job.id] = job
+            try:
+                self._queue.put_nowait((job, func))
+            except queue.Full:
+                del self._jobs[job.id]
+                raise JobQueueFull(f"{self._queue.maxsize} jobs already pending")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def _worker(self):
+        while True:
+            try:
+                entry = self._queue.get(timeout=WORKER_POLL_INTERVAL)
+            except queue.Empty:
+                # A full queue may have had no room for this worker's sentinel
+                if self._closed:
+                    return
+                continue
+            if entry is None:
+                return
+            job, func = entry
+            job.status = "running"
+            job.started = time.time()
+
+            for item in job.items:
+                try:
+                    item["result"] = func(item["item"])
+                    item["status"] = "ok"
+                except Exception as e:
+                    item["error"] = str(e)
+                    item["status"] = "error"
+
+            failed = sum(1 for item in job.items if item["status"] == "error")
+            job.status = "done" if not failed else "failed" if failed == len(job.items) else "partial"
+            job.finished = time.time()
+            job.done.set()
+            self._forget_old_jobs()
+
+    def _forget_old_jobs(self):
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+            for job_id in finished[:max(0, len(finished) - self.history)]:
+                del self._jobs[job_id]
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop accepting jobs and let workers exit after queued work.
+        
+        Never blocks unless wait is set, even when the queue is full.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                # Workers notice _closed once the queue drains
+                break
+        if wait:
+            for thread in self._threads:
+                thread.join()
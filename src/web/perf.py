@@ -0,0 +1,280 @@
+"""
+Dashboard Request Instrumentation
+
+Per-route latency histograms, per-request counts of subprocess launches
+and filesystem operations (via audit hooks), template render time, and
+an opt-in statistical profiler that writes folded stacks for slow
+requests (load them in speedscope or pipe them to flamegraph.pl).
+"""
+
+import bisect
+import contextvars
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from flask import Flask, before_render_template, g, request, template_rendered
+
+# Upper bounds of the latency histogram buckets in milliseconds
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+SUBPROCESS_EVENTS = frozenset({
+    "subprocess.Popen", "os.system", "os.posix_spawn", "os.spawn", "os.exec", "os.fork",
+})
+FILESYSTEM_EVENTS = frozenset({
+    "open", "os.listdir", "os.scandir", "os.remove", "os.rename", "os.mkdir", "os.rmdir",
+    "os.chmod", "os.chown", "os.truncate", "os.utime", "os.link", "os.symlink",
+    "shutil.copyfile", "shutil.rmtree", "shutil.move",
+})
+
+# Slow-request profiles listed by /api/debug/perf
+RECENT_PROFILES = 20
+
+_current: "contextvars.ContextVar[Optional[RequestPerf]]" = contextvars.ContextVar(
+    "dashboard_request_perf", default=None)
+_hook_installed = False
+_hook_lock = threading.Lock()
+
+
+def _audit(event: str, args):
+    perf = _current.get()
+    if perf is None:
+        return
+    if event in SUBPROCESS_EVENTS:
+        perf.subprocesses += 1
+    elif event in FILESYSTEM_EVENTS:
+        perf.fs_ops += 1
+
+
+def _install_audit_hook():
+    # Audit hooks cannot be removed, so install one for the whole process
+    global _hook_installed
+    with _hook_lock:
+        if not _hook_installed:
+            sys.addaudithook(_audit)
+            _hook_installed = True
+
+
+class RequestPerf:
+    """Counters for one in-flight request."""
+
+    __slots__ = ("start", "thread_id", "subprocesses", "fs_ops", "template_ms",
+                 "template_started", "samples")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.thread_id = threading.get_ident()
+        self.subprocesses = 0
+        self.fs_ops = 0
+        self.template_ms = 0.0
+        self.template_started: Optional[float] = None
+        self.samples: Counter = Counter()
+
+
+class RouteStats:
+    """Aggregated latency and operation counts for one route."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.subprocesses = 0
+        self.fs_ops = 0
+        self.template_ms = 0.0
+        self.slow = 0
+
+    def add(self, elapsed_ms: float, perf: RequestPerf):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.subprocesses += perf.subprocesses
+        self.fs_ops += perf.fs_ops
+        self.template_ms += perf.template_ms
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bucket bound containing the given fraction of requests."""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS + (float("inf"),), self.buckets):
+            seen += count
+            if seen >= target:
+                return bound if bound != float("inf") else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict:
+        count = self.count or 1
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / count, 3),
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.percentile(0.50),
+            "p99_ms": self.percentile(0.99),
+            "histogram_ms": {
+                **{str(bound): n for bound, n in zip(LATENCY_BUCKETS_MS, self.buckets)},
+                "+Inf": self.buckets[-1],
+            },
+            "subprocesses_per_request": round(self.subprocesses / count, 3),
+            "fs_ops_per_request": round(self.fs_ops / count, 3),
+            "template_ms_per_request": round(self.template_ms / count, 3),
+            "slow_requests": self.slow,
+        }
+
+
+class StackSampler:
+    """
+    One background thread sampling the stacks of in-flight requests.
+
+    Every interval it reads sys._current_frames() once and adds each
+    registered request's stack to that request's sample Counter, so the
+    cost is independent of the number of routes.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._active: Dict[int, RequestPerf] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, perf: RequestPerf):
+        with self._lock:
+            self._active[perf.thread_id] = perf
+            self._wake.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="perf-sampler", daemon=True)
+                self._thread.start()
+
+    def unregister(self, perf: RequestPerf):
+        with self._lock:
+            if self._active.get(perf.thread_id) is perf:
+                del self._active[perf.thread_id]
+
+    def _run(self):
+        while True:
+            # Sleep until a request registers instead of ticking while idle
+            self._wake.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.items())
+                if not active:
+                    self._wake.clear()
+                    continue
+            frames = sys._current_frames()
+            for thread_id, perf in active:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    perf.samples[_fold(frame)] += 1
+
+
+def _fold(frame) -> str:
+    """Render a stack root-first as one folded-stack line key."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class PerfMonitor:
+    """
+    Flask instrumentation for VPNDashboard.
+
+    Timing covers the view function and after_request hooks, not the
+    streaming of generator bodies (exports, Server-Sent Events).
+
+    Args:
+        app: Flask application to instrument
+        slow_ms: Profile requests slower than this; None disables profiling
+        profile_dir: Directory for folded-stack files
+        sample_interval: Seconds between stack samples while profiling
+    """
+
+    def __init__(self, app: Flask, slow_ms: Optional[float] = None,
+                 profile_dir: Union[str, Path, None] = None, sample_interval: float = 0.005):
+        self.slow_ms = slow_ms
+        self.profile_dir = Path(profile_dir) if profile_dir else Path("perf_profiles")
+        self.sampler = StackSampler(sample_interval) if slow_ms is not None else None
+        self.routes: Dict[str, RouteStats] = {}
+        self.profiles: deque = deque(maxlen=RECENT_PROFILES)
+        self._lock = threading.Lock()
+
+        _install_audit_hook()
+        app.before_request(self._before)
+        app.teardown_request(self._teardown)
+        before_render_template.connect(self._template_start, app)
+        template_rendered.connect(self._template_done, app)
+
+    def _before(self):
+        perf = RequestPerf()
+        g._perf_token = _current.set(perf)
+        g._perf = perf
+        if self.sampler is not None:
+            self.sampler.register(perf)
+
+    def _teardown(self, exc=None):
+        perf = g.pop("_perf", None)
+        if perf is None:
+            return
+        elapsed_ms = (time.perf_counter() - perf.start) * 1e3
+        _current.reset(g.pop("_perf_token"))
+        if self.sampler is not None:
+            self.sampler.unregister(perf)
+
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        slow = self.slow_ms is not None and elapsed_ms >= self.slow_ms
+        with self._lock:
+            stats = self.routes.setdefault(route, RouteStats())
+            stats.add(elapsed_ms, perf)
+            stats.slow += slow
+        if slow and perf.samples:
+            self._write_profile(route, elapsed_ms, perf.samples)
+
+    def _template_start(self, sender, template, context, **extra):
+        perf = _current.get()
+        if perf is not None:
+            perf.template_started = time.perf_counter()
+
+    def _template_done(self, sender, template, context, **extra):
+        perf = _current.get()
+        if perf is not None and perf.template_started is not None:
+            perf.template_ms += (time.perf_counter() - perf.template_started) * 1e3
+            perf.template_started = None
+
+    def _write_profile(self, route: str, elapsed_ms: float, samples: Counter):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        slug = route.strip("/").replace("/", "_").replace("<", "").replace(">", "") or "index"
+        path = self.profile_dir / f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{slug}-{elapsed_ms:.0f}ms.folded"
+        path.write_text("".join(f"{stack} {count}\n" for stack, count in samples.most_common()))
+        with self._lock:
+            self.profiles.append({
+                "route": route,
+                "elapsed_ms": round(elapsed_ms, 3),
+                "samples": sum(samples.values()),
+                "file": str(path),
+            })
+
+    def report(self) -> Dict:
+        """Return route statistics and recent slow-request profiles."""
+        with self._lock:
+            return {
+                "routes": {route: stats.to_dict() for route, stats in sorted(self.routes.items())},
+                "profiling": {
+                    "enabled": self.sampler is not None,
+                    "slow_ms": self.slow_ms,
+                    "profile_dir": str(self.profile_dir),
+                    "recent": list(self.profiles),
+                },
+            }
+
+    def reset(self):
+        with self._lock:
+            self.routes.clear()
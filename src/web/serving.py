@@ -0,0 +1,241 @@
+"""
+Dashboard Serving
+
+Runs the dashboard under Flask's development server, waitress (threads,
+one process) or gunicorn (pre-forked workers, Unix only).
+
+Each process builds its own VPNDashboard, so the WireGuard poller,
+client index and job queue are per process. With several gunicorn
+workers a job's status is only known to the worker that accepted it;
+prefer waitress with --threads when the dashboard creates clients.
+
+Every open /api/stream/peers connection holds a request thread, so
+--streams threads are added on top of --threads for them and the
+dashboard refuses streams beyond that. Streams end on reload and stop.
+"""
+
+import os
+import signal
+import threading
+from typing import Callable
+
+import click
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import waitress
+    WAITRESS_AVAILABLE = True
+except ImportError:
+    WAITRESS_AVAILABLE = False
+    waitress = None
+
+try:
+    from gunicorn.app.base import BaseApplication
+    GUNICORN_AVAILABLE = True
+except ImportError:
+    GUNICORN_AVAILABLE = False
+    BaseApplication = object
+
+SERVERS = ("auto", "dev", "waitress", "gunicorn")
+
+# The factory builds a fresh VPNDashboard; serve() calls it once per process
+DashboardFactory = Callable[[], "VPNDashboard"]
+
+
+def default_server() -> str:
+    """Return the best installed production server, or "dev"."""
+    if WAITRESS_AVAILABLE:
+        return "waitress"
+    if GUNICORN_AVAILABLE:
+        return "gunicorn"
+    return "dev"
+
+
+def serving_options(func):
+    """Options shared by every command that serves the dashboard."""
+    options = [
+        click.option('--server', 'server_name', type=click.Choice(SERVERS), default='auto',
+                     help='WSGI server (default: auto = waitress, then gunicorn, then dev)'),
+        click.option('--workers', default=1, help='Worker processes (gunicorn only, default: 1)'),
+        click.option('--threads', default=8, help='Request threads per process (default: 8)'),
+        click.option('--streams', default=8, help='Live event streams per process, on extra threads (default: 8)'),
+        click.option('--keepalive', default=5, help='Seconds to keep idle connections open (default: 5)'),
+        click.option('--graceful-timeout', default=30, help='Seconds to finish requests on reload/stop (default: 30)'),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+class _GunicornApplication(BaseApplication):
+    """Embedded gunicorn master that builds one dashboard per worker."""
+
+    def __init__(self, factory: DashboardFactory, options: dict):
+        self.factory = factory
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # Called in each worker after fork, so background threads live there
+        dashboard = self.factory()
+        worker_exit = signal.getsignal(signal.SIGTERM)
+
+        def on_sigterm(signum, frame):
+            # The master sends SIGTERM on reload and stop; end live streams
+            # so the worker's graceful shutdown is not held up by them
+            threading.Thread(target=dashboard.close, name="dashboard-close", daemon=True).start()
+            if callable(worker_exit):
+                worker_exit(signum, frame)
+
+        signal.signal(signal.SIGTERM, on_sigterm)
+        return dashboard.app
+
+
+class RequestTracker:
+    """
+    WSGI wrapper that forwards to a swappable app and counts running requests.
+
+    A request counts as running until the server closes its response
+    body, so streamed responses are tracked for their whole lifetime.
+
+    Args:
+        app: WSGI application to forward to; replace .app to reload
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._active = 0
+        self._idle = threading.Condition()
+
+    def __call__(self, environ, start_response):
+        with self._idle:
+            self._active += 1
+        try:
+            body = self.app(environ, start_response)
+        except BaseException:
+            self._finished()
+            raise
+        return ClosingIterator(body, self._finished)
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def _finished(self):
+        with self._idle:
+            self._active -= 1
+            self._idle.notify_all()
+
+    def wait_idle(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for running requests; True if none are left."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._active == 0, timeout)
+
+
+def _run_waitress(factory: DashboardFactory, host: str, port: int, threads: int,
+                  keepalive: int, graceful_timeout: int):
+    dashboard = factory()
+    tracker = RequestTracker(dashboard.app)
+    server = waitress.create_server(
+        tracker, host=host, port=port, threads=threads, channel_timeout=max(keepalive, 1),
+    )
+    current = {"dashboard": dashboard}
+
+    def reload():
+        # New requests go to a freshly loaded dashboard; closing the old
+        # one ends its streams, other in-flight requests finish on it
+        fresh = factory()
+        tracker.app = fresh.app
+        old, current["dashboard"] = current["dashboard"], fresh
+        old.close()
+        click.echo("🔄 Dashboard reloaded")
+
+    def stop():
+        current["dashboard"].close()
+        if not tracker.wait_idle(graceful_timeout):
+            click.echo(f"⚠️  Stopping with {tracker.active} request(s) still running", err=True)
+        # Waitress leaves its loop on KeyboardInterrupt
+        os.kill(os.getpid(), signal.SIGINT)
+
+    def on_sighup(signum, frame):
+        threading.Thread(target=reload, name="dashboard-reload", daemon=True).start()
+
+    def on_sigterm(signum, frame):
+        threading.Thread(target=stop, name="dashboard-stop", daemon=True).start()
+
+    signal.signal(signal.SIGHUP, on_sighup)
+    signal.signal(signal.SIGTERM, on_sigterm)
+    try:
+        server.run()
+    finally:
+        current["dashboard"].close()
+
+
+def resolve_server(server_name: str = "auto", workers: int = 1, debug: bool = False) -> str:
+    """
+    Pick the concrete server for a --server choice and check it can run.
+
+    Raises:
+        click.ClickException: If the server is not installed or cannot
+            honour the requested workers
+    """
+    if server_name == "auto":
+        server_name = "dev" if debug else default_server()
+
+    if server_name == "waitress" and not WAITRESS_AVAILABLE:
+        raise click.ClickException("waitress is not installed (pip install waitress)")
+    if server_name == "gunicorn" and not GUNICORN_AVAILABLE:
+        raise click.ClickException("gunicorn is not installed (pip install gunicorn)")
+    if workers > 1 and server_name != "gunicorn":
+        raise click.ClickException("--workers needs --server gunicorn; use --threads instead")
+    return server_name
+
+
+def serve(factory: DashboardFactory, host: str = "127.0.0.1", port: int = 5000,
+          server_name: str = "auto", workers: int = 1, threads: int = 8, streams: int = 8,
+          keepalive: int = 5, graceful_timeout: int = 30, debug: bool = False):
+    """
+    Serve the dashboard until interrupted.
+
+    SIGHUP reloads the dashboard without dropping the listening socket
+    (gunicorn replaces its workers; waitress swaps the application) and
+    SIGTERM ends live streams and lets other running requests finish
+    for up to graceful_timeout.
+
+    Args:
+        factory: Callable returning a new VPNDashboard
+        host: Address to bind to
+        port: Port to bind to
+        server_name: One of SERVERS
+        workers: Worker processes (gunicorn only)
+        threads: Request threads per process
+        streams: Extra threads per process reserved for live event streams;
+            the factory's dashboard should cap its streams at this number
+        keepalive: Idle keep-alive timeout in seconds
+        graceful_timeout: Seconds allowed for in-flight requests on reload/stop
+        debug: Run Flask's debugger (forces the development server)
+    """
+    server_name = resolve_server(server_name, workers, debug)
+    threads += streams
+
+    if server_name == "gunicorn":
+        _GunicornApplication(factory, {
+            "bind": f"{host}:{port}",
+            "workers": workers,
+            "threads": threads,
+            "worker_class": "gthread",
+            "keepalive": keepalive,
+            "graceful_timeout": graceful_timeout,
+        }).run()
+    elif server_name == "waitress":
+        _run_waitress(factory, host, port, threads, keepalive, graceful_timeout)
+    else:
+        dashboard = factory()
+        try:
+            dashboard.run(host=host, port=port, debug=debug)
+        finally:
+            dashboard.close()
@@ -0,0 +1,110 @@
+# Dashboard client index tests
+
+import json
+import shutil
+import tempfile
+import time
+import unittest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.web.client_index import INOTIFY_AVAILABLE, ClientIndex
+
+
+def add_client(clients_dir: Path, name: str):
+    client_dir = clients_dir / name
+    client_dir.mkdir()
+    (client_dir / "public.key").write_text(f"{name}-PUB=\n")
+    (client_dir / f"{name}.conf").write_text("[Interface]\n")
+
+
+class TestClientIndex(unittest.TestCase):
+    """Test the in-memory client listing and its watchers."""
+
+    def setUp(self):
+        self.clients_dir = Path(tempfile.mkdtemp(prefix="vpn_index_test"))
+        add_client(self.clients_dir, "Dr-Smith")
+        (self.clients_dir / ".qr_cache").mkdir()
+        self.index = ClientIndex(self.clients_dir, poll_interval=0.05)
+
+    def tearDown(self):
+        self.index.stop()
+        shutil.rmtree(self.clients_dir, ignore_errors=True)
+
+    def wait_for(self, names):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            if [c["name"] for c in self.index.clients()] == names:
+                return
+            time.sleep(0.02)
+        self.fail(f"index never reached {names}: {self.index.clients()}")
+
+    def test_initial_listing(self):
+        self.assertEqual(json.loads(self.index.to_json()), [{
+            "name": "Dr-Smith",
+            "has_config": True,
+            "has_qr": True,
+            "created": self.index.get("Dr-Smith")["created"],
+            "public_key": "Dr-Smith-PUB=",
+        }])
+
+    def test_refresh_hook_updates_version_only_on_change(self):
+        version = self.index.version
+        self.index.refresh("Dr-Smith")
+        self.assertEqual(self.index.version, version)
+
+        add_client(self.clients_dir, "Front-Desk")
+        self.index.refresh("Front-Desk")
+        self.assertEqual([c["name"] for c in self.index.clients()], ["Dr-Smith", "Front-Desk"])
+        self.assertGreater(self.index.version, version)
+
+    def test_cursor_pages_follow_the_sort_order(self):
+        for name in ("Dr-Adams", "Dr-Jones", "Front-Desk", "Lab-1"):
+            add_client(self.clients_dir, name)
+        self.index.rebuild()
+
+        def all_pages(**kwargs):
+            names, cursor = [], None
+            while True:
+                page = self.index.query(limit=2, cursor=cursor, **kwargs)
+                names += [c["name"] for c in page["clients"]]
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    return names, page["total"]
+
+        self.assertEqual(all_pages(prefix="Dr-"), (["Dr-Adams", "Dr-Jones", "Dr-Smith"], 3))
+        self.assertEqual(all_pages(search="o", descending=True), (["Front-Desk", "Dr-Jones"], 2))
+
+        handshakes = {"Lab-1-PUB=": 200, "Dr-Adams-PUB=": 100}
+        names, _ = all_pages(sort="handshake", descending=True, handshakes=handshakes)
+        self.assertEqual(names[:2], ["Lab-1", "Dr-Adams"])
+
+        with self.assertRaises(ValueError):
+            self.index.query(cursor="not-a-cursor")
+
+        # A cursor only continues the sort that issued it
+        cursor = self.index.query(limit=1)["next_cursor"]
+        with self.assertRaisesRegex(ValueError, "sort field"):
+            self.index.query(limit=1, cursor=cursor, sort="created")
+
+    @unittest.skipUnless(INOTIFY_AVAILABLE, "inotify not available")
+    def test_inotify_watcher(self):
+        self.assertEqual(self.index.start(), "inotify")
+        add_client(self.clients_dir, "Front-Desk")
+        self.wait_for(["Dr-Smith", "Front-Desk"])
+        shutil.rmtree(self.clients_dir / "Dr-Smith")
+        self.wait_for(["Front-Desk"])
+
+    def test_polling_watcher(self):
+        self.assertEqual(self.index.start(use_inotify=False), "poll")
+        add_client(self.clients_dir, "Front-Desk")
+        self.wait_for(["Dr-Smith", "Front-Desk"])
+        shutil.rmtree(self.clients_dir / "Dr-Smith")
+        self.wait_for(["Front-Desk"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+# Monitoring collection tests
+
+import os
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.core.procstats import SystemStats
+from src.core.wg_status import DumpSource
+
+DUMP = (
+    "wg0\tPRIVATE=\tSERVERPUB=\t51820\toff\n"
+    "wg0\tPEER1_0123456789abcdef=\t(none)\t198.51.100.7:41000\t10.0.0.2/32\t9999999999\t1024\t2048\t25\n"
+    "wg0\tPEER2_0123456789abcdef=\tPSK=\t(none)\t10.0.0.3/32,fd00::3/128\t0\t10\t20\toff\n"
+    "wg2\tPRIVATE2=\tOTHERPUB=\t51822\toff\n"
+)
+
+MEMINFO = (
+    "MemTotal:        2000000 kB\n"
+    "MemFree:          300000 kB\n"
+    "MemAvailable:     500000 kB\n"
+    "Buffers:           10000 kB\n"
+)
+
+
+class TestCollection(unittest.TestCase):
+    """Test single-snapshot WireGuard collection and /proc sampling."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_collect_metrics_from_one_dump(self):
+        from src.cli.monitoring import VPNMonitor
+
+        calls = []
+        monitor = VPNMonitor()
+        monitor.config["interfaces"] = ["wg0", "wg1"]
+        monitor.wireguard = DumpSource(lambda: calls.append(1) or DUMP)
+
+        metrics = monitor.collect_metrics()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(metrics["interfaces"]), ["wg0", "wg1"])
+        self.assertEqual(metrics["interfaces"]["wg1"], {"status": "inactive", "error": "Interface not found"})
+
+        wg0 = metrics["interfaces"]["wg0"]
+        self.assertEqual((wg0["total_rx"], wg0["total_tx"]), (1034, 2068))
+        first, second = wg0["peers"]
+        self.assertEqual(first["public_key"], "PEER1_0123456789...")
+        self.assertEqual(first["endpoint"], "198.51.100.7:41000")
+        self.assertTrue(first["connected"])
+        self.assertEqual(second["allowed_ips"], "10.0.0.3/32,fd00::3/128")
+        self.assertEqual(second["latest_handshake"], "0")
+        self.assertFalse(second["connected"])
+
+        # A missing `wg` binary marks every interface inactive instead of raising
+        def missing():
+            raise FileNotFoundError(2, "No such file or directory", "wg")
+        monitor.wireguard = DumpSource(missing)
+        metrics = monitor.collect_metrics()
+        self.assertEqual({data["status"] for data in metrics["interfaces"].values()}, {"inactive"})
+        monitor.rollups.close()
+
+    def test_system_stats_reread_open_files(self):
+        proc = Path(self.tmp.name) / "proc"
+        proc.mkdir()
+        (proc / "loadavg").write_text("0.50 0.40 0.30 1/100 4242\n")
+        (proc / "meminfo").write_text(MEMINFO)
+
+        stats = SystemStats(str(proc))
+        first = stats.read()
+        self.assertEqual(first["load_average"], 0.5)
+        self.assertEqual(first["memory_total"], 2000000 * 1024)
+        self.assertEqual(first["memory_usage_percent"], 75.0)
+
+        # Rewriting in place is seen through the same descriptor
+        with open(proc / "loadavg", "r+") as f:
+            f.write("1.25")
+        self.assertEqual(stats.read()["load_average"], 1.25)
+        stats.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+# Client export tests
+
+import io
+import shutil
+import tempfile
+import unittest
+import zipfile
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.core.export import resolve_clients, stream_client_archive
+from src.core.qr_cache import QRCodeCache
+
+
+class TestClientExport(unittest.TestCase):
+    """Test streaming ZIP export of client packages."""
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix="vpn_export_test"))
+        self.clients_dir = self.test_dir / "clients"
+        for name in ("Dr-Smith", "Front-Desk"):
+            client_dir = self.clients_dir / name
+            client_dir.mkdir(parents=True)
+            (client_dir / f"{name}.conf").write_text(f"[Interface]\n# {name}\n")
+            (client_dir / "private.key").write_text("secret")
+        (self.clients_dir / "Dr-Smith" / "Dr-Smith_qr.png").write_bytes(b"\x89PNG" + b"\0" * 200_000)
+        (self.clients_dir / ".qr_cache").mkdir()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_archive_contents(self):
+        cache = QRCodeCache(self.test_dir / "cache")
+        chunks = list(stream_client_archive(self.clients_dir, qr_cache=cache, chunk_size=4096))
+
+        self.assertGreater(len(chunks), 2)
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(sorted(archive.namelist()), [
+                "Dr-Smith/Dr-Smith.conf",
+                "Dr-Smith/Dr-Smith_qr.png",
+                "Front-Desk/Front-Desk.conf",
+                "Front-Desk/Front-Desk_qr.png",
+            ])
+            self.assertEqual(archive.read("Front-Desk/Front-Desk.conf"), b"[Interface]\n# Front-Desk\n")
+            self.assertEqual(archive.read("Front-Desk/Front-Desk_qr.png"),
+                             cache.get("[Interface]\n# Front-Desk\n"))
+
+    def test_first_chunk_arrives_before_archive_is_built(self):
+        stream = stream_client_archive(self.clients_dir)
+        first = next(stream)
+        self.assertTrue(first.startswith(b"PK\x03\x04"))
+        self.assertLess(len(first), 64 * 1024)
+
+    def test_selected_clients(self):
+        self.assertEqual(resolve_clients(self.clients_dir, ["Front-Desk"]), ["Front-Desk"])
+        with self.assertRaises(KeyError):
+            resolve_clients(self.clients_dir, ["../etc"])
+
+
+if __name__ == "__main__":
+    unittest.main()
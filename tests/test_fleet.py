@@ -0,0 +1,130 @@
+# Fleet status collection tests
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.core.fleet import (
+    FleetCollector, FleetServer, SSHTransport, StubTransport, _exec, fleet_summary, load_fleet,
+)
+
+DUMP = (
+    "wg0\t(hidden)\tSERVERPUB=\t51820\toff\n"
+    "wg0\tPEER1=\t(hidden)\t198.51.100.7:41000\t10.0.0.2/32\t1700000000\t1024\t2048\t25\n"
+)
+
+
+class SlowTransport:
+    """Runs a real child process that records its pid and never answers in time."""
+
+    kind = "local"
+
+    def __init__(self, pid_file: Path):
+        self.pid_file = pid_file
+
+    async def dump(self, timeout: float) -> str:
+        script = f"import os, time; open({str(self.pid_file)!r}, 'w').write(str(os.getpid())); time.sleep(30)"
+        return await _exec([sys.executable, "-c", script], timeout)
+
+
+class TestFleet(unittest.TestCase):
+    """Test concurrent collection, staleness and fleet file loading."""
+
+    def test_collection_is_concurrent(self):
+        servers = [FleetServer(f"practice-{i:02d}", StubTransport(DUMP, delay=0.2)) for i in range(40)]
+        collector = FleetCollector(servers)
+
+        start = time.monotonic()
+        states = collector.collect_sync()
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(len(states), 40)
+        self.assertTrue(all(len(state.peers()) == 1 for state in states.values()))
+
+    def test_failures_keep_last_good_data_and_go_stale(self):
+        transport = StubTransport(DUMP)
+        collector = FleetCollector([FleetServer("lab", transport),
+                                    FleetServer("slow", StubTransport(DUMP, delay=5))], timeout=0.2)
+        collector.collect_sync()
+
+        transport.error = "ssh: connect to host lab port 22: Connection refused"
+        states = collector.collect_sync()
+        summary = fleet_summary(states, stale_after=60, now=states["lab"].last_success + 120)
+        lab, slow = summary["servers"]
+
+        self.assertFalse(lab["ok"])
+        self.assertIn("Connection refused", lab["error"])
+        self.assertEqual((lab["peers"], lab["rx_bytes"]), (1, 1024))
+        self.assertTrue(lab["stale"])
+        self.assertEqual(slow["staleness"], None)
+        self.assertEqual(summary["totals"]["reachable"], 0)
+
+    def assertChildGone(self, pid_file: Path):
+        pid = int(pid_file.read_text())
+        with self.assertRaises(ProcessLookupError):
+            os.kill(pid, 0)
+
+    def test_timed_out_child_is_killed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pid_file = Path(tmp) / "pid"
+            collector = FleetCollector([FleetServer("slow", SlowTransport(pid_file))], timeout=0.5)
+
+            state = collector.collect_sync()["slow"]
+
+            self.assertEqual(state.error, "timed out after 0.5s")
+            self.assertChildGone(pid_file)
+
+    def test_cancelled_collection_kills_child(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pid_file = Path(tmp) / "pid"
+
+            async def cancel_midway():
+                task = asyncio.ensure_future(SlowTransport(pid_file).dump(30))
+                while not pid_file.exists() or not pid_file.read_text():
+                    await asyncio.sleep(0.02)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+
+            asyncio.run(cancel_midway())
+            self.assertChildGone(pid_file)
+
+    def test_load_fleet(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump({"servers": [
+                {"name": "practice-01", "transport": "ssh", "host": "203.0.113.5", "user": "vpn", "sudo": True},
+                {"name": "practice-02", "transport": "agent", "url": "https://203.0.113.6/api/server/dump"},
+            ]}, f)
+        servers = load_fleet(f.name)
+        Path(f.name).unlink()
+
+        self.assertEqual([s.transport.kind for s in servers], ["ssh", "agent"])
+        command = servers[0].transport.command(10)
+        self.assertEqual(command[-3:], ["--", "vpn@203.0.113.5", "sudo -n wg show all dump"])
+        self.assertIsInstance(servers[0].transport, SSHTransport)
+
+    def test_load_fleet_rejects_bad_options(self):
+        for entry, message in (
+            ({"name": "practice-01", "host": "203.0.113.5", "hostname": "typo"}, "Unknown ssh options"),
+            ({"name": "practice-02", "transport": "agent"}, "Missing agent options"),
+        ):
+            with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+                json.dump({"servers": [entry]}, f)
+            try:
+                with self.assertRaisesRegex(ValueError, message):
+                    load_fleet(f.name)
+            finally:
+                Path(f.name).unlink()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+# Dashboard HTTP caching tests
+
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+
+from flask import Flask
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.web.http_cache import (
+    ResponseCompressor, choose_encoding, conditional, make_etag, matching_etag,
+)
+
+
+class TestHTTPCache(unittest.TestCase):
+    """Test ETag matching, 304s and JSON compression."""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.version = 1
+        self.builds = 0
+        ResponseCompressor(self.app)
+
+        @self.app.route('/items')
+        def items():
+            def body():
+                self.builds += 1
+                return json.dumps([{"name": f"client-{i}"} for i in range(100)])
+            return conditional(body, make_etag('items', self.version))
+
+        self.client = self.app.test_client()
+
+    def test_etag_matching(self):
+        etag = make_etag('clients', 7)
+        self.assertEqual(matching_etag(f'"other", {etag}', etag), etag)
+        self.assertEqual(matching_etag(f'W/{etag[:-1]}-gzip"', etag), etag[:-1] + '-gzip"')
+        self.assertIsNone(matching_etag(make_etag('clients', 8), etag))
+        self.assertEqual(matching_etag('*', etag), etag)
+
+    def test_choose_encoding(self):
+        self.assertEqual(choose_encoding("gzip, deflate"), "gzip")
+        self.assertIsNone(choose_encoding("gzip;q=0, identity"))
+        self.assertIsNone(choose_encoding(None))
+
+    def test_revalidation_skips_the_body(self):
+        first = self.client.get('/items', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(first.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(first.data))), 100)
+
+        again = self.client.get('/items', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual((again.status_code, again.data, self.builds), (304, b'', 1))
+
+        self.version = 2
+        changed = self.client.get('/items', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual((changed.status_code, self.builds), (200, 2))
+        self.assertNotIn('Content-Encoding', changed.headers)
+
+
+class TestServerStatusCaching(unittest.TestCase):
+    """Test that polls which see no change keep the status ETag."""
+
+    def setUp(self):
+        from src.web.app import VPNDashboard
+
+        self.dump = "wg0\tPRIVATE=\tSERVERPUB=\t51820\toff\n"
+        self.keys_dir = Path(tempfile.mkdtemp(prefix="vpn_status_test"))
+        self.dashboard = VPNDashboard(keys_dir=str(self.keys_dir), poll_interval=3600,
+                                      wg_runner=lambda: self.dump)
+        self.client = self.dashboard.app.test_client()
+
+    def tearDown(self):
+        self.dashboard.close()
+        shutil.rmtree(self.keys_dir, ignore_errors=True)
+
+    def test_identical_polls_return_304(self):
+        for path in ('/api/server/status', '/api/server/dump'):
+            first = self.client.get(path)
+            self.dashboard.wg_poller.poll_once()
+            self.dashboard.wg_poller.poll_once()
+
+            again = self.client.get(path, headers={'If-None-Match': first.headers['ETag']})
+            self.assertEqual(again.status_code, 304, path)
+
+        first = self.client.get('/api/server/status')
+        self.dump += "wg0\tPEER1=\t(none)\t(none)\t10.0.0.2/32\t0\t0\t0\toff\n"
+        self.dashboard.wg_poller.poll_once()
+        changed = self.client.get('/api/server/status', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(len(changed.get_json()['peers']), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
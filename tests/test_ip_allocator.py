@@ -0,0 +1,78 @@
+# IP allocator tests
+
+import unittest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.core.ip_allocator import IPAllocator
+from src.core.client_config import ClientConfigGenerator
+
+
+class TestIPAllocator(unittest.TestCase):
+    """Test address allocation, pinning, reservation and release."""
+
+    def test_sequential_allocation_skips_server(self):
+        allocator = IPAllocator("10.0.0.0/24")
+        self.assertEqual([allocator.allocate() for _ in range(3)],
+                         ["10.0.0.2", "10.0.0.3", "10.0.0.4"])
+
+    def test_exhaustion(self):
+        allocator = IPAllocator("10.0.0.0/29")
+        allocated = [allocator.allocate() for _ in range(5)]
+        self.assertEqual(allocated[-1], "10.0.0.6")
+        with self.assertRaises(ValueError):
+            allocator.allocate()
+
+    def test_release_reuses_lowest_address(self):
+        allocator = IPAllocator("10.0.0.0/24")
+        for _ in range(5):
+            allocator.allocate()
+        allocator.release("10.0.0.5")
+        allocator.release("10.0.0.3")
+        self.assertEqual(allocator.allocate(), "10.0.0.3")
+        self.assertEqual(allocator.allocate(), "10.0.0.5")
+        self.assertEqual(allocator.allocate(), "10.0.0.7")
+
+    def test_pin_and_reserve(self):
+        allocator = IPAllocator("10.0.0.0/24")
+        allocator.pin("10.0.0.3")
+        allocator.reserve("10.0.0.4/30")
+        self.assertEqual(allocator.allocate(), "10.0.0.2")
+        self.assertEqual(allocator.allocate(), "10.0.0.8")
+        with self.assertRaises(ValueError):
+            allocator.pin("10.0.0.3")
+        with self.assertRaises(ValueError):
+            allocator.pin("10.0.0.5")
+        with self.assertRaises(ValueError):
+            allocator.pin("10.0.1.5")
+        with self.assertRaises(ValueError):
+            allocator.release("10.0.0.1")
+
+    def test_large_pools(self):
+        allocator = IPAllocator("10.10.0.0/16")
+        allocator.reserve("10.10.0.0/24")
+        self.assertEqual(allocator.allocate(), "10.10.1.0")
+
+        allocator = IPAllocator("fd00:1::/64")
+        self.assertEqual(allocator.allocate(), "fd00:1::2")
+        allocator.pin("fd00:1::ffff:ffff")
+        self.assertIn("fd00:1::ffff:ffff", allocator)
+        self.assertEqual(len(allocator), 2)
+
+
+class TestClientConfigAllocation(unittest.TestCase):
+    """Test that ClientConfigGenerator uses the allocator."""
+
+    def test_explicit_ip_is_pinned(self):
+        generator = ClientConfigGenerator("DEQ0g/nJrVXhS0jm5CHVHJy9Z5pJvCpn1RODqDQ5Jn4=",
+                                          "203.0.113.10")
+        generator.generate_config("A", "key", client_ip="10.0.0.2")
+        self.assertEqual(generator.allocate_client_ip(), "10.0.0.3")
+        self.assertEqual(generator.allocated_ips, {"10.0.0.2", "10.0.0.3"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+# Persistent IPAM store tests
+
+import shutil
+import tempfile
+import threading
+import unittest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.core.client_config import ClientConfigGenerator
+from src.core.ipam import IPAMStore
+
+NETWORK = "10.0.0.0/24"
+
+
+class TestIPAMStore(unittest.TestCase):
+    """Test durable, shared address leases."""
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix="vpn_ipam_test"))
+        self.db_path = self.test_dir / "ipam.db"
+        self.store = IPAMStore(self.db_path)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_allocation_is_shared_between_instances(self):
+        self.assertEqual(self.store.allocate(NETWORK, "A"), "10.0.0.2")
+        other = IPAMStore(self.db_path)
+        self.assertEqual(other.allocate(NETWORK, "B"), "10.0.0.3")
+        self.assertEqual(other.lookup(NETWORK, "A"), "10.0.0.2")
+        other.close()
+
+    def test_allocation_is_idempotent_per_client(self):
+        first = self.store.allocate(NETWORK, "A")
+        self.assertEqual(self.store.allocate(NETWORK, "A"), first)
+
+    def test_pin_release_and_reuse(self):
+        self.store.pin(NETWORK, "10.0.0.3", "Pinned")
+        self.assertEqual(self.store.allocate(NETWORK, "A"), "10.0.0.2")
+        self.assertEqual(self.store.allocate(NETWORK, "B"), "10.0.0.4")
+        with self.assertRaises(ValueError):
+            self.store.pin(NETWORK, "10.0.0.4", "C")
+
+        self.assertEqual(self.store.release(NETWORK, client_name="A"), "10.0.0.2")
+        self.assertEqual(self.store.allocate(NETWORK, "C"), "10.0.0.2")
+        self.assertEqual(self.store.owner(NETWORK, "10.0.0.3"), "Pinned")
+
+    def test_concurrent_allocations_never_collide(self):
+        results = []
+        lock = threading.Lock()
+
+        def worker(index):
+            store = IPAMStore(self.db_path)
+            address = store.allocate(NETWORK, f"client-{index}")
+            store.close()
+            with lock:
+                results.append(address)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 20)
+        self.assertEqual(len(set(results)), 20)
+
+    def test_ipv6_pool(self):
+        self.assertEqual(self.store.allocate("fd00::/64", "A"), "fd00::2")
+        self.store.pin("fd00::/64", "fd00::ffff:ffff:ffff:fffe", "B")
+        self.assertEqual(self.store.owner("fd00::/64", "fd00::ffff:ffff:ffff:fffe"), "B")
+
+    def test_generators_share_store(self):
+        key = "DEQ0g/nJrVXhS0jm5CHVHJy9Z5pJvCpn1RODqDQ5Jn4="
+        first = ClientConfigGenerator(key, "203.0.113.10", ipam=self.store)
+        second = ClientConfigGenerator(key, "203.0.113.10", ipam=self.store)
+        self.assertEqual(first.allocate_client_ip("A"), "10.0.0.2")
+        self.assertEqual(second.allocate_client_ip("B"), "10.0.0.3")
+        self.assertEqual(second.allocated_ips, {"10.0.0.2", "10.0.0.3"})
+
+    def test_new_pool_is_seeded_from_existing_configs(self):
+        alice_key = "ALICEPUBKEYAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA="
+        alice = self.test_dir / "clients" / "Alice"
+        alice.mkdir(parents=True)
+        (alice / "public.key").write_text(alice_key + "\n")
+        (alice / "Alice.conf").write_text(
+            "[Interface]\nPrivateKey = x\nAddress = 10.0.0.2/32\n\n"
+            "[Peer]\nPublicKey = s\nAllowedIPs = 0.0.0.0/0\n")
+        (self.test_dir / "clients" / "DrKover-Bob.conf").write_text(
+            "[Interface]\nPrivateKey = y\nAddress = 10.0.0.3/32\n")
+        (self.test_dir / "wg0.conf").write_text(
+            "[Interface]\nPrivateKey = z\nAddress = 10.0.0.1/24\nListenPort = 51820\n\n"
+            f"[Peer]\nPublicKey = {alice_key}\nAllowedIPs = 10.0.0.2/32\n\n"
+            "[Peer]\n# Client: 10.0.0.4\nPublicKey = k4\nAllowedIPs = 10.0.0.4/32\n\n"
+            "[Peer]\n# Peer: Carol (professionally added 2024-01-01 10:00:00)\n"
+            "PublicKey = k5\nAllowedIPs = 10.0.0.5/32, 192.168.50.0/24\n")
+
+        self.assertEqual(self.store.allocate(NETWORK, "New"), "10.0.0.6")
+        owners = {lease["address"]: lease["client_name"] for lease in self.store.leases(NETWORK)}
+        self.assertEqual(owners, {"10.0.0.1": "__server__", "10.0.0.2": "Alice",
+                                  "10.0.0.3": "DrKover-Bob", "10.0.0.4": None,
+                                  "10.0.0.5": "Carol", "10.0.0.6": "New"})
+
+
+if __name__ == "__main__":
+    unittest.main()
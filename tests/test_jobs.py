@@ -0,0 +1,124 @@
+# Dashboard job queue tests
+
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.web.jobs import JobQueue, JobQueueClosed, JobQueueFull
+
+
+class TestJobQueue(unittest.TestCase):
+    """Test batching, per-item errors and backpressure."""
+
+    def setUp(self):
+        self.jobs = JobQueue(workers=1, max_pending=1, history=2)
+
+    def tearDown(self):
+        self.jobs.shutdown()
+
+    def test_per_item_results_and_errors(self):
+        def create(name):
+            if name.startswith("."):
+                raise ValueError(f"Invalid client name: {name!r}")
+            return {"name": name}
+
+        job = self.jobs.submit("create_client", ["Dr-Smith", ".bad", "Front-Desk"], create)
+        self.assertTrue(job.done.wait(5))
+
+        status = self.jobs.get(job.id).to_dict()
+        self.assertEqual(status["status"], "partial")
+        self.assertEqual((status["total"], status["succeeded"], status["failed"]), (3, 2, 1))
+        self.assertEqual(status["items"][0]["result"], {"name": "Dr-Smith"})
+        self.assertIn("Invalid client name", status["items"][1]["error"])
+
+    def test_full_queue_rejects_instead_of_blocking(self):
+        release = threading.Event()
+        running = self.jobs.submit("block", [None], lambda _: release.wait(5))
+        while running.status == "queued":
+            release.wait(0.01)
+
+        self.jobs.submit("queued", [None], lambda _: None)
+        with self.assertRaises(JobQueueFull):
+            self.jobs.submit("rejected", [None], lambda _: None)
+
+        release.set()
+        self.assertTrue(running.done.wait(5))
+
+    def test_shutdown_with_full_queue_does_not_block(self):
+        release = threading.Event()
+        running = self.jobs.submit("block", [None], lambda _: release.wait(5))
+        while running.status == "queued":
+            release.wait(0.01)
+        queued = self.jobs.submit("queued", [None], lambda _: None)
+
+        stopper = threading.Thread(target=self.jobs.shutdown, kwargs={"wait": False})
+        stopper.start()
+        stopper.join(1)
+        self.assertFalse(stopper.is_alive())
+
+        # Queued work still runs, then the worker exits without a sentinel
+        release.set()
+        self.assertTrue(queued.done.wait(5))
+        self.jobs._threads[0].join(5)
+        self.assertFalse(self.jobs._threads[0].is_alive())
+
+    def test_old_jobs_are_forgotten_and_closed_queue_refuses(self):
+        finished = []
+        for _ in range(4):
+            job = self.jobs.submit("noop", [None], lambda _: None)
+            job.done.wait(5)
+            finished.append(job.id)
+
+        self.assertIsNone(self.jobs.get(finished[0]))
+        self.assertIsNotNone(self.jobs.get(finished[-1]))
+
+        self.jobs.shutdown()
+        with self.assertRaises(JobQueueClosed):
+            self.jobs.submit("late", [None], lambda _: None)
+
+
+class TestClientCreationJobs(unittest.TestCase):
+    """Test that concurrent jobs cannot create the same client twice."""
+
+    def setUp(self):
+        from src.web.app import VPNDashboard
+
+        self.keys_dir = Path(tempfile.mkdtemp(prefix="vpn_jobs_test"))
+        (self.keys_dir / "server_public.key").write_text("DEQ0g/nJrVXhS0jm5CHVHJy9Z5pJvCpn1RODqDQ5Jn4=\n")
+        self.dashboard = VPNDashboard(keys_dir=str(self.keys_dir), wg_runner=lambda: "",
+                                      job_workers=2)
+
+    def tearDown(self):
+        self.dashboard.close()
+        shutil.rmtree(self.keys_dir, ignore_errors=True)
+
+    def test_same_name_in_parallel_jobs_is_created_once(self):
+        save_client_keys = self.dashboard.key_manager.save_client_keys
+
+        def slow_save(name):
+            # Widen the window between the existence check and the key files appearing
+            time.sleep(0.2)
+            return save_client_keys(name)
+
+        self.dashboard.key_manager.save_client_keys = slow_save
+        jobs = [self.dashboard.jobs.submit("create_client", ["Dr-Smith"], self.dashboard._create_client)
+                for _ in range(2)]
+        for job in jobs:
+            self.assertTrue(job.done.wait(5))
+
+        items = [job.to_dict()["items"][0] for job in jobs]
+        self.assertEqual(sorted("error" in item for item in items), [False, True])
+        self.assertIn("already exists", next(item["error"] for item in items if "error" in item))
+        self.assertEqual([lease["client_name"] for lease in self.dashboard.ipam.leases()
+                          if lease["kind"] == "lease"], ["Dr-Smith"])
+
+
+if __name__ == "__main__":
+    unittest.main()
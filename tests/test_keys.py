@@ -0,0 +1,104 @@
+# Key backend tests
+
+import base64
+import shutil
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.core.keys import (
+    CryptographyKeyBackend,
+    KeyBackend,
+    SubprocessKeyBackend,
+    WireGuardKeyManager,
+    check_wireguard_installation,
+    get_key_backend,
+)
+
+
+class TestCryptographyKeyBackend(unittest.TestCase):
+    """Test the in-process Curve25519 backend."""
+
+    def setUp(self):
+        self.backend = CryptographyKeyBackend()
+
+    def test_key_format_matches_wg(self):
+        """Keys are 44-char base64 strings of 32 bytes, like `wg genkey`."""
+        private_key, public_key = self.backend.generate_key_pair()
+        psk = self.backend.generate_preshared_key()
+
+        for key in (private_key, public_key, psk):
+            self.assertEqual(len(key), 44)
+            self.assertTrue(key.endswith("="))
+            self.assertEqual(len(base64.b64decode(key)), 32)
+
+    def test_private_key_is_clamped(self):
+        """Private keys are clamped the same way `wg genkey` clamps them."""
+        raw = base64.b64decode(self.backend.generate_key_pair()[0])
+        self.assertEqual(raw[0] & 7, 0)
+        self.assertEqual(raw[31] & 128, 0)
+        self.assertEqual(raw[31] & 64, 64)
+
+    def test_public_key_derivation(self):
+        """Public key derivation is deterministic and matches the pair."""
+        private_key, public_key = self.backend.generate_key_pair()
+        self.assertEqual(self.backend.public_key(private_key), public_key)
+
+    def test_known_vector(self):
+        """RFC 7748 Alice key pair derives the published public key."""
+        private_raw = bytes.fromhex(
+            "77076d0a7318a57d3c16c17251b26645df4c2f87ebc0992ab177fba51db92c2a")
+        public_raw = bytes.fromhex(
+            "8520f0098930a754748b7ddcb43ef75a0dbf3a0d26381af4eba4a98eaa9b4e6a")
+        self.assertEqual(
+            self.backend.public_key(base64.b64encode(private_raw).decode()),
+            base64.b64encode(public_raw).decode()
+        )
+
+    @unittest.skipUnless(check_wireguard_installation(), "wg tools not installed")
+    def test_matches_wg_pubkey(self):
+        """In-process public keys match `wg pubkey` output."""
+        private_key, public_key = self.backend.generate_key_pair()
+        self.assertEqual(SubprocessKeyBackend().public_key(private_key), public_key)
+
+
+class TestKeyManagerBackend(unittest.TestCase):
+    """Test backend selection in WireGuardKeyManager."""
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix="vpn_keys_test"))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_default_backend_is_in_process(self):
+        manager = WireGuardKeyManager(str(self.test_dir))
+        self.assertIsInstance(manager.backend, CryptographyKeyBackend)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_key_backend("nope")
+
+    def test_incomplete_backend_cannot_be_created(self):
+        class PartialBackend(KeyBackend):
+            def generate_key_pair(self):
+                return "", ""
+
+        with self.assertRaises(TypeError):
+            PartialBackend()
+
+    def test_save_client_keys(self):
+        manager = WireGuardKeyManager(str(self.test_dir))
+        result = manager.save_client_keys("Dr-Smith-Laptop")
+        self.assertEqual(
+            Path(result["public_file"]).read_text(),
+            manager.backend.public_key(result["private_key"])
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
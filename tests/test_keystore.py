@@ -0,0 +1,117 @@
+# Keystore session tests
+
+import shutil
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+from unittest import mock
+
+from click.testing import CliRunner
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.cli.keystore import keys
+from src.core import keystore
+from src.core.keys import WireGuardKeyManager
+from src.core.keystore import KeystoreSession, is_encrypted_key, replace_files
+
+
+class TestKeystoreSession(unittest.TestCase):
+    """Test cached PBKDF2 derivation and wipe-on-close."""
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix="vpn_keystore_test"))
+        self.manager = WireGuardKeyManager(str(self.test_dir))
+        self.private_keys = [self.manager.generate_key_pair()[0] for _ in range(3)]
+        self.encrypted = [self.manager.encrypt_private_key(k, "hunter2") for k in self.private_keys]
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_decrypts_manager_format_once_per_salt(self):
+        with KeystoreSession("hunter2", workers=2) as session:
+            self.assertEqual(session.decrypt_many(self.encrypted), self.private_keys)
+            self.assertEqual(session.decrypt(self.encrypted[0]), self.private_keys[0])
+            self.assertEqual(session.derivations, 3)
+
+    def test_session_encryption_is_manager_compatible(self):
+        with KeystoreSession("hunter2") as session:
+            tokens = [session.encrypt(k) for k in self.private_keys]
+            self.assertEqual(session.derivations, 1)
+
+        self.assertEqual(self.manager.decrypt_private_key(tokens[2], "hunter2"), self.private_keys[2])
+
+    def test_expired_keys_are_wiped_and_rederived(self):
+        session = KeystoreSession("hunter2", ttl=10)
+        session.decrypt(self.encrypted[0])
+        cached_key = next(iter(session._cache.values()))[0]
+
+        with mock.patch.object(keystore.time, "monotonic", return_value=keystore.time.monotonic() + 60):
+            session.decrypt(self.encrypted[0])
+
+        self.assertEqual(bytes(cached_key), bytes(32))
+        self.assertEqual(session.derivations, 2)
+        session.close()
+
+    def test_close_wipes_and_blocks_use(self):
+        session = KeystoreSession("hunter2")
+        session.decrypt(self.encrypted[0])
+        cached_key = next(iter(session._cache.values()))[0]
+
+        session.close()
+
+        self.assertEqual(bytes(cached_key), bytes(32))
+        with self.assertRaises(RuntimeError):
+            session.decrypt(self.encrypted[0])
+
+
+class TestKeyFiles(unittest.TestCase):
+    """Test the encrypted key marker and all-or-nothing password changes."""
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix="vpn_keyfiles_test"))
+        self.manager = WireGuardKeyManager(str(self.test_dir))
+        self.private_keys = [self.manager.generate_key_pair()[0] for _ in range(3)]
+        self.files = [self.test_dir / f"site{i}_private.key" for i in range(3)]
+        for path, key in zip(self.files, self.private_keys):
+            path.write_text(self.manager.encrypt_private_key(key, "hunter2"))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_encrypted_keys_are_marked(self):
+        encrypted = self.files[0].read_text()
+        self.assertTrue(encrypted.startswith(keystore.ENCRYPTED_KEY_PREFIX))
+        self.assertTrue(is_encrypted_key(encrypted))
+        self.assertFalse(is_encrypted_key(self.private_keys[0] + "\n"))
+        # Files from before the marker still unlock
+        legacy = encrypted[len(keystore.ENCRYPTED_KEY_PREFIX):]
+        self.assertTrue(is_encrypted_key(legacy))
+        self.assertEqual(self.manager.decrypt_private_key(legacy, "hunter2"), self.private_keys[0])
+
+    def test_failed_write_changes_no_file(self):
+        before = [path.read_text() for path in self.files]
+        contents = {path: "new" for path in self.files}
+        contents[self.test_dir / "missing" / "private.key"] = "new"
+
+        with self.assertRaises(OSError):
+            replace_files(contents)
+
+        self.assertEqual([path.read_text() for path in self.files], before)
+        self.assertEqual(sorted(p.name for p in self.test_dir.iterdir()), [p.name for p in self.files])
+
+    def test_passwd_reencrypts_every_key(self):
+        result = CliRunner().invoke(keys, ["passwd", "--keys-dir", str(self.test_dir), "--workers", "1"],
+                                    input="hunter2\nswordfish\nswordfish\n")
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        with KeystoreSession("swordfish", workers=1) as session:
+            unlocked = session.unlock_files(self.files)
+        self.assertEqual([unlocked[str(path)] for path in self.files], self.private_keys)
+        self.assertEqual({path.stat().st_mode & 0o777 for path in self.files}, {0o600})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+# Prometheus metrics tests
+
+import unittest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.core.metrics import PrometheusExporter, render_prometheus
+from src.core.wg_status import WireGuardPoller
+
+DUMP = (
+    "wg0\tPRIVATE=\tSERVERPUB=\t51820\toff\n"
+    "wg0\tPEER1=\t(none)\t198.51.100.7:41000\t10.0.0.2/32\t{handshake}\t1024\t2048\t25\n"
+    "wg0\tPEER2=\t(none)\t(none)\t10.0.0.3/32\t0\t0\t0\toff\n"
+)
+
+
+class TestPrometheusMetrics(unittest.TestCase):
+    """Test exposition rendering and per-snapshot caching."""
+
+    def setUp(self):
+        self.runs = 0
+
+        def runner():
+            self.runs += 1
+            return DUMP.format(handshake=1700000000)
+
+        self.poller = WireGuardPoller(runner=runner)
+
+    def test_render_snapshot(self):
+        snapshot = self.poller.poll_once()
+        text = render_prometheus(snapshot, names={"PEER1=": 'Dr "Smith"'})
+        lines = text.splitlines()
+
+        self.assertIn('wireguard_peers{interface="wg0"} 2', lines)
+        self.assertIn('wireguard_interface_receive_bytes_total{interface="wg0"} 1024', lines)
+        self.assertIn('wireguard_peer_transmit_bytes_total'
+                      '{interface="wg0",public_key="PEER1=",name="Dr \\"Smith\\""} 2048', lines)
+        self.assertIn('wireguard_peer_connected{interface="wg0",public_key="PEER2="} 0', lines)
+        # Peers that never handshook have no age series
+        self.assertEqual(sum(line.startswith("wireguard_peer_handshake_age_seconds") for line in lines), 1)
+        self.assertIn("# TYPE wireguard_peer_receive_bytes_total counter", lines)
+
+    def test_scrapes_reuse_the_snapshot_render(self):
+        exporter = PrometheusExporter(self.poller)
+        self.poller.poll_once()
+
+        first = exporter.render()
+        self.assertIs(exporter.render(), first)
+        self.assertEqual(self.runs, 1)
+
+        self.poller.poll_once()
+        self.assertIn(b"wireguard_snapshot_seq 2", exporter.render())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+# Monitoring engine tests
+
+import asyncio
+import threading
+import time
+import unittest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.core.monitor_engine import MonitoringEngine
+
+INTERVAL = 0.05
+
+
+class TestMonitoringEngine(unittest.TestCase):
+    """Test fixed-cadence ticks, stage isolation and missed-tick records."""
+
+    def setUp(self):
+        self.collected = []
+        self.stored = []
+        self.missed = []
+        self.release_smtp = threading.Event()
+
+    def engine(self, collect_delay=0.0, interval=INTERVAL, **kwargs):
+        def collect():
+            self.collected.append(time.monotonic())
+            time.sleep(collect_delay)
+            return {"n": len(self.collected)}
+
+        return MonitoringEngine(
+            collect=collect,
+            store=self.stored.append,
+            evaluate=lambda metrics: [{"n": metrics["n"]}],
+            notify=lambda alerts: self.release_smtp.wait(5),
+            interval=interval,
+            on_missed=self.missed.append,
+            drain_timeout=0.2,
+            **kwargs
+        )
+
+    def test_slow_notifier_does_not_delay_collection(self):
+        engine = self.engine(queue_size=2)
+        asyncio.run(engine.run(max_ticks=10))
+        self.release_smtp.set()
+
+        # Ticks stay on the start-anchored grid while SMTP is stuck
+        self.assertEqual(len(self.collected), 10)
+        offsets = [t - self.collected[0] - i * INTERVAL for i, t in enumerate(self.collected)]
+        self.assertLess(max(offsets), INTERVAL / 2)
+        self.assertEqual(len(self.stored), 10)
+        stats = engine.stats()
+        self.assertEqual(stats["notifications"], 0)
+        self.assertGreater(stats["dropped"]["notify"], 0)
+        self.assertEqual(stats["missed_ticks"], 0)
+
+    def test_overrunning_collection_records_missed_ticks(self):
+        engine = self.engine(collect_delay=0.15, interval=0.1)
+        self.release_smtp.set()
+        asyncio.run(engine.run(max_ticks=6))
+
+        self.assertEqual(len(self.collected), 3)
+        self.assertEqual([record["tick"] for record in self.missed], [1, 3, 5])
+        self.assertEqual({record["reason"] for record in self.missed}, {"collection still running"})
+        self.assertEqual(engine.stats()["notifications"], 3)
+
+    def test_late_wakeup_is_recorded(self):
+        now = [0.0]
+        engine = self.engine(clock=lambda: now[0])
+        self.release_smtp.set()
+
+        async def main():
+            task = asyncio.create_task(engine.run(max_ticks=5))
+            await asyncio.sleep(0.01)
+            # The process was suspended for three and a half intervals
+            now[0] = INTERVAL * 3.5
+            await task
+
+        asyncio.run(main())
+        self.assertEqual([record["tick"] for record in self.missed], [1, 2])
+        self.assertEqual(len(self.collected), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+# Dashboard request instrumentation tests
+
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+import sys
+from pathlib import Path
+
+from flask import Flask
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.web.perf import PerfMonitor, RouteStats, RequestPerf
+
+
+class TestPerfMonitor(unittest.TestCase):
+    """Test per-route statistics and slow-request profiles."""
+
+    def setUp(self):
+        self.profile_dir = Path(tempfile.mkdtemp(prefix="vpn_perf_test"))
+        self.app = Flask(__name__)
+        self.perf = PerfMonitor(self.app, slow_ms=30, profile_dir=self.profile_dir,
+                                sample_interval=0.001)
+
+        @self.app.route('/client/<name>')
+        def client(name):
+            (self.profile_dir / "x.txt").write_text(name)
+            subprocess.run([sys.executable, "-c", "pass"], check=True)
+            return name
+
+        @self.app.route('/slow')
+        def slow():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+            return 'done'
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+    def test_counts_operations_per_route(self):
+        self.client.get('/client/a')
+        self.client.get('/client/b')
+
+        stats = self.perf.report()["routes"]["/client/<name>"]
+        self.assertEqual(stats["count"], 2)
+        self.assertEqual(stats["subprocesses_per_request"], 1)
+        self.assertGreaterEqual(stats["fs_ops_per_request"], 1)
+        self.assertEqual(sum(stats["histogram_ms"].values()), 2)
+
+    def test_slow_requests_write_folded_stacks(self):
+        self.client.get('/slow')
+
+        report = self.perf.report()
+        self.assertEqual(report["routes"]["/slow"]["slow_requests"], 1)
+        profile = Path(report["profiling"]["recent"][0]["file"])
+        lines = profile.read_text().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertIn("slow (test_perf.py:", stack)
+        self.assertGreater(int(count), 0)
+
+    def test_percentiles_come_from_buckets(self):
+        stats = RouteStats()
+        for elapsed in (0.5, 3, 3, 40):
+            stats.add(elapsed, RequestPerf())
+        self.assertEqual(stats.percentile(0.5), 5)
+        self.assertEqual(stats.percentile(0.99), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
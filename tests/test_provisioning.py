@@ -0,0 +1,109 @@
+# Bulk provisioning tests
+
+import json
+import shutil
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.core.client_config import ClientConfigGenerator
+from src.core.keys import WireGuardKeyManager
+from src.core.provisioning import BulkProvisioner, load_roster
+
+SERVER_KEY = "DEQ0g/nJrVXhS0jm5CHVHJy9Z5pJvCpn1RODqDQ5Jn4="
+
+
+class TestBulkProvisioning(unittest.TestCase):
+    """Test roster loading and batch provisioning."""
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix="vpn_provision_test"))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_load_csv_roster(self):
+        roster_file = self.test_dir / "roster.csv"
+        roster_file.write_text("name,ip,dns\nFront-Desk,10.0.0.50,9.9.9.9;1.1.1.1\nDr-Smith,,\n,,\n")
+
+        roster = load_roster(str(roster_file))
+
+        self.assertEqual([r["name"] for r in roster], ["Front-Desk", "Dr-Smith"])
+        self.assertEqual(roster[0]["dns"], ["9.9.9.9", "1.1.1.1"])
+        self.assertFalse(roster[1]["ip"])
+
+    def test_load_json_roster(self):
+        roster_file = self.test_dir / "roster.json"
+        roster_file.write_text(json.dumps(["A", {"name": "B", "ip": "10.0.0.9"}]))
+
+        self.assertEqual(load_roster(str(roster_file)),
+                         [{"name": "A"}, {"name": "B", "ip": "10.0.0.9"}])
+
+    def test_provision_writes_manifest(self):
+        generator = ClientConfigGenerator(SERVER_KEY, "203.0.113.10")
+        provisioner = BulkProvisioner(
+            WireGuardKeyManager(str(self.test_dir / "keys")), generator,
+            output_dir=str(self.test_dir / "clients"), workers=1
+        )
+
+        roster = [{"name": "A"}, {"name": "B", "ip": "10.0.0.2"}, {"name": "A"}]
+        manifest = provisioner.provision(roster, generate_qr=False)
+
+        self.assertEqual(manifest["provisioned"], 2)
+        self.assertEqual(manifest["errors"], [{"name": "A", "error": "Duplicate client name"}])
+        ips = {c["name"]: c["client_ip"] for c in manifest["clients"]}
+        self.assertEqual(ips, {"A": "10.0.0.3", "B": "10.0.0.2"})
+        self.assertTrue(Path(manifest["manifest_file"]).exists())
+        self.assertEqual(Path(manifest["server_peers_file"]).read_text().count("[Peer]"), 2)
+
+    def test_roster_ips_are_validated(self):
+        generator = ClientConfigGenerator(SERVER_KEY, "203.0.113.10")
+        provisioner = BulkProvisioner(
+            WireGuardKeyManager(str(self.test_dir / "keys")), generator,
+            output_dir=str(self.test_dir / "clients"), workers=1
+        )
+
+        roster = [{"name": "A", "ip": "10.0.0.5"}, {"name": "B", "ip": "10.0.0.5"},
+                  {"name": "C", "ip": "10.0.0.999"}, {"name": "D"}]
+        manifest = provisioner.provision(roster, generate_qr=False)
+
+        self.assertEqual([c["name"] for c in manifest["clients"]], ["A", "D"])
+        errors = {e["name"]: e["error"] for e in manifest["errors"]}
+        self.assertIn("also assigned to A", errors["B"])
+        self.assertIn("Invalid IP address", errors["C"])
+
+    def test_failed_qr_render_keeps_batch(self):
+        class FlakyQRCache:
+            extension = "png"
+
+            def contains(self, config):
+                return False
+
+            def write_to(self, config, qr_file):
+                if config.startswith("[Interface]\n# B - "):
+                    raise OSError("disk full")
+                Path(qr_file).write_bytes(b"png")
+
+        generator = ClientConfigGenerator(SERVER_KEY, "203.0.113.10")
+        provisioner = BulkProvisioner(
+            WireGuardKeyManager(str(self.test_dir / "keys")), generator,
+            output_dir=str(self.test_dir / "clients"), workers=1, qr_cache=FlakyQRCache()
+        )
+
+        manifest = provisioner.provision([{"name": "A"}, {"name": "B"}, {"name": "C"}])
+
+        self.assertEqual(manifest["provisioned"], 3)
+        self.assertEqual((manifest["failed"], manifest["qr_failed"]), (0, 1))
+        self.assertEqual(manifest["errors"], [{"name": "B", "error": "QR code not written: disk full"}])
+        qr_files = {c["name"]: c.get("qr_file") for c in manifest["clients"]}
+        self.assertIsNone(qr_files["B"])
+        self.assertTrue(Path(qr_files["C"]).exists())
+        self.assertTrue(Path(manifest["manifest_file"]).exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+# QR cache tests
+
+import shutil
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.core.client_config import ClientConfigGenerator
+from src.core.qr_cache import QRCodeCache
+from src.core.qr_render import NUMPY_AVAILABLE, qr_matrix, render_qr
+
+SERVER_KEY = "DEQ0g/nJrVXhS0jm5CHVHJy9Z5pJvCpn1RODqDQ5Jn4="
+
+
+class CountingRenderer:
+    """Renders normally and counts the calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        return render_qr(*args)
+
+
+class TestQRCodeCache(unittest.TestCase):
+    """Test content-addressed QR caching."""
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix="vpn_qr_test"))
+        self.render = CountingRenderer()
+        self.cache = QRCodeCache(self.test_dir / "cache", renderer=self.render)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_renders_once(self):
+        first = self.cache.get_or_render("[Interface]\nA")
+        second = self.cache.get_or_render("[Interface]\nA")
+        self.cache.get_or_render("[Interface]\nB")
+
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith(b"\x89PNG"))
+        self.assertEqual(self.render.calls, 2)
+
+    def test_unchanged_config_is_not_rerendered(self):
+        generator = ClientConfigGenerator(SERVER_KEY, "203.0.113.10", qr_cache=self.cache)
+        out = self.test_dir / "clients"
+
+        # Make the saved package look like it was generated on an earlier run
+        first = generator.save_client_package("A", "key", str(out), client_ip="10.0.0.2")
+        earlier = first["config"].replace("Generated on", "Generated on 1999")
+        Path(first["config_file"]).write_text(earlier, encoding="utf-8")
+        self.cache.write_to(earlier, first["qr_file"])
+        calls = self.render.calls
+
+        second = generator.save_client_package("A", "key", str(out), client_ip="10.0.0.2")
+
+        self.assertEqual(self.render.calls, calls)
+        self.assertEqual(second["config"], earlier)
+        self.assertNotIn("qr_base64", second)
+        self.assertEqual(Path(second["qr_file"]).read_bytes(), self.cache.get(earlier))
+
+    def test_formats_are_cached_separately(self):
+        pil_cache = QRCodeCache(self.test_dir / "cache", qr_format="pil")
+        self.assertNotEqual(self.cache.key("[Interface]\nA"), pil_cache.key("[Interface]\nA"))
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "numpy not installed")
+class TestVectorizedRenderer(unittest.TestCase):
+    """Test the NumPy QR renderer against qrcode's reference output."""
+
+    def test_matrix_matches_qrcode(self):
+        import qrcode
+
+        for config in ("[Interface]\nA", "[Interface]\n" + "PrivateKey = x\n" * 12):
+            qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L, border=4)
+            qr.add_data(config)
+            qr.make(fit=True)
+            self.assertEqual(qr_matrix(config).tolist(), qr.get_matrix())
+
+    def test_png_and_svg_output(self):
+        self.assertTrue(render_qr("[Interface]\nA", "png").startswith(b"\x89PNG"))
+        self.assertIn(b"<svg", render_qr("[Interface]\nA", "svg"))
+        with self.assertRaises(ValueError):
+            render_qr("[Interface]\nA", "gif")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+# Counter rate engine tests
+
+import tempfile
+import unittest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.core.rates import RateEngine, counter_deltas
+from src.core.rollups import rate_series
+from src.core.tsdb import MetricsStore
+
+BASE = int(datetime(2026, 3, 1, 23).timestamp())
+
+
+class TestRates(unittest.TestCase):
+    """Test reset-aware deltas and bytes/sec series."""
+
+    def test_counter_deltas(self):
+        deltas = counter_deltas([150, 30, 100, 2 ** 40], [100, 100, -1, 2 ** 39])
+        self.assertEqual(deltas.tolist(), [50, 30, 0, 2 ** 39])
+
+    def test_engine_tracks_peers_between_samples(self):
+        engine = RateEngine({("wg0", "A"): (1000, 500)})
+        first = engine.update(BASE, [("wg0", "A"), ("wg0", "B")], [1600, 40], [500, 10])
+        self.assertEqual(first.rx_delta.tolist(), [600, 0])
+        self.assertTrue(np.isnan(first.rx_rate).all())
+
+        # B appears first now; A restarted from zero
+        second = engine.update(BASE + 60, [("wg0", "B"), ("wg0", "A")], [640, 120], [10, 60])
+        self.assertEqual(second.rx_delta.tolist(), [600, 120])
+        self.assertEqual(second.rx_rate.tolist(), [10.0, 2.0])
+        self.assertEqual(engine.counters(), {("wg0", "A"): (120, 60), ("wg0", "B"): (640, 10)})
+
+    def test_series_from_segments(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = MetricsStore(Path(tmp) / "tsdb")
+            # Crosses midnight; the counter resets at sample 5, B skips sample 3
+            counters = [0, 3000, 6000, 9000, 12000, 600, 3600, 6600]
+            for i, counter in enumerate(counters):
+                peers = [{"public_key": "A...", "rx_bytes": counter, "tx_bytes": 0}]
+                if i != 3:
+                    peers.append({"public_key": "B...", "rx_bytes": 100 * i, "tx_bytes": 0})
+                store.append({
+                    "timestamp": datetime.fromtimestamp(BASE + 1500 + i * 300).isoformat(),
+                    "interfaces": {"wg0": {"status": "active", "peers": peers}},
+                })
+            store.close()
+
+            series = rate_series(store, BASE, BASE + 6 * 3600)
+            a = series.for_peer(("wg0", "A..."))
+            self.assertEqual(a.rx_delta.tolist(), [0, 3000, 3000, 3000, 3000, 600, 3000, 3000])
+            self.assertEqual(a.rx_rate[1:].tolist(), [10.0] * 4 + [2.0, 10.0, 10.0])
+
+            b = series.for_peer(("wg0", "B..."))
+            self.assertEqual(b.elapsed[1:].tolist(), [300, 300, 600, 300, 300, 300])
+
+            summary = series.summary()
+            self.assertEqual(summary[("wg0", "A...")]["rx_bytes"], 18600)
+            self.assertEqual(summary[("wg0", "A...")]["peak_rx_bps"], 10.0)
+            self.assertEqual(summary[("wg0", "B...")]["avg_rx_bps"], round(700 / 2100, 1))
+
+            # A window starting mid-day still measures from the previous reading
+            late = rate_series(store, BASE + 1500 + 4 * 300, BASE + 6 * 3600).for_peer(("wg0", "B..."))
+            self.assertEqual(late.elapsed.tolist(), [600, 300, 300, 300])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+# Monitoring rollup tests
+
+import json
+import os
+import tempfile
+import unittest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.core.rollups import RollupStore, raw_totals
+from src.core.tsdb import MetricsStore
+
+BASE = int(datetime(2026, 3, 1).timestamp())
+STEP = 600
+
+
+def sample(index):
+    """Two days of samples: peer B's counter resets at sample 100, wg1 is down for a while."""
+    counter = 1000 * index if index < 100 else 7 * (index - 99)
+    peers = [
+        {"public_key": "A...", "rx_bytes": 5000 * index, "tx_bytes": 100 * index,
+         "connected": index % 3 != 0},
+        {"public_key": "B...", "rx_bytes": counter, "tx_bytes": counter, "connected": True},
+    ]
+    wg1 = {"status": "inactive"} if 150 <= index < 170 else {
+        "status": "active", "peers": peers[:1] if index > 200 else []}
+    return {
+        "timestamp": datetime.fromtimestamp(BASE + index * STEP).isoformat(),
+        "interfaces": {"wg0": {"status": "active", "peers": peers}, "wg1": wg1},
+    }
+
+
+class TestRollups(unittest.TestCase):
+    """Test that rollups answer windows exactly like a raw scan."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.store = MetricsStore(self.root / "tsdb")
+        self.rollups = RollupStore(self.root / "rollups.db")
+        self.samples = [sample(i) for i in range(2 * 86400 // STEP)]
+        for metrics in self.samples:
+            self.store.append(metrics)
+            self.rollups.add(metrics)
+        self.store.close()
+
+    def tearDown(self):
+        self.rollups.close()
+        self.tmp.cleanup()
+
+    def assertSameTotals(self, first, second):
+        self.assertEqual(first.samples, second.samples)
+        self.assertEqual(first.interfaces, second.interfaces)
+        self.assertEqual(first.peers, second.peers)
+
+    def test_windows_match_raw_scan(self):
+        end = BASE + 2 * 86400
+        for start, stop in ((BASE, end), (BASE + 1234, end - 4321), (BASE + 50000, BASE + 52000)):
+            self.assertSameTotals(self.rollups.usage(start, stop, self.store),
+                                  raw_totals(self.store, start, stop))
+
+        totals = self.rollups.usage(BASE, end, self.store)
+        self.assertEqual(totals.samples, len(self.samples))
+        # A's counter only grows; B's reset keeps the bytes sent after it
+        self.assertEqual(totals.peers[("wg0", "A...")][1], 5000 * (len(self.samples) - 1))
+        self.assertEqual(totals.peers[("wg0", "B...")][1], 1000 * 99 + 7 * (len(self.samples) - 100))
+        self.assertEqual(totals.interfaces["wg1"][:3], [len(self.samples), len(self.samples) - 20, 1])
+
+    def test_rebuild_matches_incremental(self):
+        rebuilt = RollupStore(self.root / "rebuilt.db")
+        rebuilt.rebuild(self.store)
+        self.assertTrue(rebuilt.built)
+        self.assertEqual(rebuilt.last_ts, self.rollups.last_ts)
+        self.assertSameTotals(rebuilt.usage(BASE + 700, BASE + 90000, self.store),
+                              self.rollups.usage(BASE + 700, BASE + 90000, self.store))
+        rebuilt.close()
+
+    def test_rebuild_elsewhere_keeps_daemon_counters(self):
+        # The daemon appended a sample, then a report process rebuilt before the daemon's add()
+        extra = [sample(i) for i in range(len(self.samples), len(self.samples) + 3)]
+        self.store.append(extra[0])
+        self.store.close()
+        report = RollupStore(self.root / "rollups.db")
+        report.rebuild(self.store)
+        report.close()
+
+        for metrics in extra:
+            if metrics is not extra[0]:
+                self.store.append(metrics)
+            self.rollups.add(metrics)
+        self.store.close()
+
+        rebuilt = RollupStore(self.root / "rebuilt.db")
+        rebuilt.rebuild(self.store)
+        # Whole days, so the new samples come from the daily rollups
+        end = BASE + 3 * 86400
+        self.assertSameTotals(self.rollups.usage(BASE, end, self.store), rebuilt.usage(BASE, end, self.store))
+        self.assertEqual(self.rollups.usage(BASE, end, self.store).samples, len(self.samples) + 3)
+        rebuilt.close()
+
+    def test_report_imports_legacy_jsonl(self):
+        from src.cli.monitoring import VPNMonitor
+
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        try:
+            Path("monitoring_data").mkdir()
+            day = datetime.now().strftime("%Y-%m-%d")
+            now = datetime.now().timestamp()
+            with open(f"monitoring_data/metrics_{day}.jsonl", "w") as f:
+                for i, metrics in enumerate(self.samples[:3]):
+                    metrics = dict(metrics, timestamp=datetime.fromtimestamp(now - 30 + i * 10).isoformat())
+                    f.write(json.dumps(metrics) + "\n")
+
+            monitor = VPNMonitor()
+            report = monitor.generate_usage_report(days=1)
+            self.assertEqual(report["summary"]["total_samples"], 3)
+            self.assertEqual(report["interfaces"]["wg0"]["peak_concurrent_peers"], 2)
+            self.assertEqual(monitor.store.days(), [datetime.now().date()])
+            monitor.rollups.close()
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+# Server config builder tests
+
+import shutil
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.core.ipam import IPAMStore
+from src.core.server_config import ServerConfigBuilder, ServerPeer, diff_peers, parse_peer_dump
+
+NETWORK = "10.0.0.0/24"
+
+
+class FakeWireGuard:
+    """Records wg invocations and serves a canned `wg show dump`."""
+
+    def __init__(self, dump: str):
+        self.dump = dump
+        self.calls = []
+
+    def __call__(self, args, input=None):
+        self.calls.append((list(args), input))
+        return self.dump if args[1] == "show" else ""
+
+
+class TestServerConfigBuilder(unittest.TestCase):
+    """Test config rendering and minimal peer diffs."""
+
+    def setUp(self):
+        self.keys_dir = Path(tempfile.mkdtemp(prefix="vpn_server_test"))
+        (self.keys_dir / "server_private.key").write_text("sMUpwCKO1iUmCaE74uAouM0dEQvpKataD+yi3U+bGH4=\n")
+        self.ipam = IPAMStore(self.keys_dir / "ipam.db")
+        for name in ("Dr-Smith", "Front-Desk"):
+            self.ipam.allocate(NETWORK, name)
+            client_dir = self.keys_dir / "clients" / name
+            client_dir.mkdir(parents=True)
+            (client_dir / "public.key").write_text(f"{name}-PUB=\n")
+
+    def tearDown(self):
+        self.ipam.close()
+        shutil.rmtree(self.keys_dir, ignore_errors=True)
+
+    def builder(self, dump: str) -> ServerConfigBuilder:
+        self.wg = FakeWireGuard("PRIV\tPUB\t51820\toff\n" + dump)
+        return ServerConfigBuilder(str(self.keys_dir), NETWORK, ipam=self.ipam, runner=self.wg)
+
+    def test_render_includes_every_leased_client(self):
+        config = self.builder("").render()
+
+        self.assertIn("Address = 10.0.0.1/24", config)
+        self.assertIn("PublicKey = Dr-Smith-PUB=\nAllowedIPs = 10.0.0.2/32", config)
+        self.assertIn("PublicKey = Front-Desk-PUB=\nAllowedIPs = 10.0.0.3/32", config)
+        self.assertNotIn("Address", self.builder("").render(strip=True))
+
+    def test_adding_one_peer_touches_one_peer(self):
+        builder = self.builder("Dr-Smith-PUB=\t(none)\t(none)\t10.0.0.2/32\t0\t0\t0\toff\n")
+
+        result = builder.sync(write_config=False)
+
+        self.assertEqual(result["diff"], {"added": 1, "changed": 0, "removed": 0})
+        self.assertEqual(self.wg.calls[-1][0], [
+            "wg", "set", "wg0", "peer", "Front-Desk-PUB=",
+            "allowed-ips", "10.0.0.3/32", "preshared-key", "/dev/null",
+        ])
+
+    def test_in_sync_interface_runs_nothing(self):
+        builder = self.builder(
+            "Dr-Smith-PUB=\t(none)\t(none)\t10.0.0.2/32\t0\t0\t0\toff\n"
+            "Front-Desk-PUB=\t(none)\t1.2.3.4:5\t10.0.0.3/32\t0\t0\t0\toff\n"
+        )
+
+        self.assertEqual(builder.sync(write_config=False)["method"], "noop")
+        self.assertEqual(len(self.wg.calls), 1)
+
+    def test_write_is_skipped_when_unchanged(self):
+        builder = self.builder("")
+        self.assertTrue(builder.write())
+        self.assertFalse(builder.write())
+        self.assertEqual(builder.config_file.stat().st_mode & 0o777, 0o600)
+
+    def test_unmanaged_peers_are_imported_not_removed(self):
+        unmanaged = "HANDADDEDPEERAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA="
+        builder = self.builder(
+            "Dr-Smith-PUB=\t(none)\t(none)\t10.0.0.2/32\t0\t0\t0\toff\n"
+            "Front-Desk-PUB=\t(none)\t(none)\t10.0.0.3/32\t0\t0\t0\toff\n"
+            f"{unmanaged}\tPSK=\t(none)\t10.0.0.7/32\t0\t0\t0\toff\n"
+            "SITE-PUB=\t(none)\t(none)\t10.0.0.8/32,192.168.50.0/24\t0\t0\t0\toff\n"
+        )
+
+        result = builder.sync()
+
+        self.assertEqual((result["imported"], result["kept"]), (1, 1))
+        self.assertEqual(result["method"], "noop")
+        self.assertEqual(len(self.wg.calls), 1)
+        name = self.ipam.owner(NETWORK, "10.0.0.7")
+        self.assertTrue(name.startswith("imported-"))
+        self.assertEqual((self.keys_dir / "clients" / name / "preshared.key").read_text().strip(), "PSK=")
+        config = builder.config_file.read_text()
+        self.assertIn(f"PublicKey = {unmanaged}\nPresharedKey = PSK=\nAllowedIPs = 10.0.0.7/32", config)
+        self.assertIn("PublicKey = SITE-PUB=\nAllowedIPs = 10.0.0.8/32, 192.168.50.0/24", config)
+
+    def test_revoked_peers_are_only_removed_with_prune(self):
+        self.ipam.release(NETWORK, client_name="Front-Desk")
+        dump = ("Dr-Smith-PUB=\t(none)\t(none)\t10.0.0.2/32\t0\t0\t0\toff\n"
+                "Front-Desk-PUB=\t(none)\t(none)\t10.0.0.3/32\t0\t0\t0\toff\n")
+
+        result = self.builder(dump).sync(write_config=False)
+        self.assertEqual((result["diff"]["removed"], result["kept"]), (0, 1))
+        self.assertEqual(result["method"], "noop")
+
+        result = self.builder(dump).sync(write_config=False, prune=True)
+        self.assertEqual(result["diff"]["removed"], 1)
+        self.assertEqual(self.wg.calls[-1][0], ["wg", "set", "wg0", "peer", "Front-Desk-PUB=", "remove"])
+
+    def test_preshared_key_is_read_from_client_config(self):
+        (self.keys_dir / "clients" / "Dr-Smith" / "Dr-Smith.conf").write_text(
+            "[Interface]\nAddress = 10.0.0.2/32\n\n[Peer]\nPublicKey = SERVER\nPresharedKey = PSK=\n")
+        builder = self.builder(
+            "Dr-Smith-PUB=\tPSK=\t(none)\t10.0.0.2/32\t0\t0\t0\toff\n"
+            "Front-Desk-PUB=\t(none)\t(none)\t10.0.0.3/32\t0\t0\t0\toff\n"
+        )
+
+        self.assertEqual(builder.desired_peers()["Dr-Smith-PUB="].preshared_key, "PSK=")
+        self.assertEqual(builder.sync(write_config=False)["method"], "noop")
+
+    def test_diff_detects_changes_and_removals(self):
+        current = parse_peer_dump("iface\nA\t(none)\t(none)\t10.0.0.2/32\nB\t(none)\t(none)\t10.0.0.3/32\n")
+        desired = {"A": ServerPeer("A", ("10.0.0.9/32",))}
+
+        diff = diff_peers(current, desired)
+
+        self.assertEqual([p.public_key for p in diff.changed], ["A"])
+        self.assertEqual(diff.removed, ["B"])
+
+
+if __name__ == "__main__":
+    unittest.main()
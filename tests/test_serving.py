@@ -0,0 +1,125 @@
+# Dashboard serving mode tests
+
+import shutil
+import tempfile
+import threading
+import unittest
+import sys
+from pathlib import Path
+from unittest import mock
+
+import click
+from click.testing import CliRunner
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.web import serving
+
+
+class TestResolveServer(unittest.TestCase):
+    """Test server selection for the dashboard command."""
+
+    def test_auto_prefers_installed_production_server(self):
+        self.assertEqual(serving.resolve_server("auto"), serving.default_server())
+        self.assertEqual(serving.resolve_server("auto", debug=True), "dev")
+
+    def test_workers_need_gunicorn(self):
+        with self.assertRaises(click.ClickException):
+            serving.resolve_server("dev", workers=4)
+
+    @unittest.skipIf(serving.WAITRESS_AVAILABLE, "waitress is installed")
+    def test_missing_server_is_reported(self):
+        with self.assertRaises(click.ClickException):
+            serving.resolve_server("waitress")
+
+
+class TestPeerStreams(unittest.TestCase):
+    """Test that live streams are capped and end when the dashboard closes."""
+
+    def setUp(self):
+        from src.web.app import VPNDashboard
+
+        self.keys_dir = Path(tempfile.mkdtemp(prefix="vpn_serving_test"))
+        self.dashboard = VPNDashboard(keys_dir=str(self.keys_dir), wg_runner=lambda: "", max_streams=1)
+        self.client = self.dashboard.app.test_client()
+
+    def tearDown(self):
+        self.dashboard.close()
+        shutil.rmtree(self.keys_dir, ignore_errors=True)
+
+    def test_streams_beyond_the_cap_are_refused(self):
+        first = self.client.get("/api/stream/peers", buffered=False)
+        self.assertEqual(first.status_code, 200)
+
+        refused = self.client.get("/api/stream/peers")
+        self.assertEqual(refused.status_code, 503)
+        self.assertIn("Retry-After", refused.headers)
+
+        first.close()
+        second = self.client.get("/api/stream/peers", buffered=False)
+        self.assertEqual(second.status_code, 200)
+        second.close()
+
+    def test_close_ends_open_streams(self):
+        response = self.client.get("/api/stream/peers", buffered=False)
+        body = iter(response.response)
+        self.assertTrue(next(body).startswith(b"event: snapshot"))
+
+        threading.Timer(0.1, self.dashboard.close).start()
+        self.assertEqual(b"".join(body), b"retry: 1000\n\n")
+        response.close()
+
+
+class TestRequestTracker(unittest.TestCase):
+    """Test request counting across app swaps."""
+
+    def test_request_runs_until_its_body_is_closed(self):
+        tracker = serving.RequestTracker(lambda environ, start_response: [b"old"])
+        body = tracker({}, None)
+        tracker.app = lambda environ, start_response: [b"new"]
+
+        second = tracker({}, None)
+        self.assertEqual(list(second), [b"new"])
+        second.close()
+        self.assertFalse(tracker.wait_idle(0))
+        body.close()
+        self.assertTrue(tracker.wait_idle(0))
+
+
+class TestDashboardCommands(unittest.TestCase):
+    """Test that every serving option reaches serve() and the dashboard."""
+
+    ARGS = ["--server", "dev", "--threads", "4", "--streams", "3"]
+
+    def assertOptionsBound(self, run):
+        with mock.patch.object(serving, "serve") as serve, \
+                mock.patch("src.web.app.VPNDashboard") as dashboard:
+            run()
+            factory = serve.call_args.args[0]
+            factory()
+        self.assertEqual((serve.call_args.kwargs["threads"], serve.call_args.kwargs["streams"]), (4, 3))
+        self.assertEqual(dashboard.call_args.kwargs["max_streams"], 3)
+
+    def test_vpn_dashboard_command(self):
+        import vpn
+
+        runner = CliRunner()
+        self.assertEqual(runner.invoke(vpn.cli, ["dashboard", "--help"]).exit_code, 0)
+
+        def run():
+            result = runner.invoke(vpn.cli, ["dashboard", *self.ARGS], catch_exceptions=False)
+            self.assertEqual(result.exit_code, 0, result.output)
+        self.assertOptionsBound(run)
+
+    def test_app_main_command(self):
+        from src.web import app
+
+        def run():
+            with mock.patch.object(sys, "argv", ["app", *self.ARGS]), self.assertRaises(SystemExit) as exit:
+                app.main()
+            self.assertEqual(exit.exception.code, 0)
+        self.assertOptionsBound(run)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+# Template registry tests
+
+import shutil
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+from unittest import mock
+
+from jinja2 import Template
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.core.templates import (
+    CLIENT_CONFIG_TEMPLATE, SERVER_PEER_TEMPLATE, TEMPLATES_DIR, TemplateRegistry,
+)
+
+# The templates ClientConfigGenerator used to build inline for every config
+LEGACY_CLIENT_CONFIG = """[Interface]
+# {{ client_name }} - Generated on {{ timestamp }}
+PrivateKey = {{ client_private_key }}
+Address = {{ client_ip }}/32
+DNS = {{ dns_servers|join(', ') }}
+
+[Peer]
+# Server
+PublicKey = {{ server_public_key }}
+{% if preshared_key %}PresharedKey = {{ preshared_key }}
+{% endif %}Endpoint = {{ server_endpoint }}:{{ server_port }}
+AllowedIPs = {{ allowed_ips }}
+PersistentKeepalive = 25"""
+
+LEGACY_SERVER_PEER = """
+[Peer]
+# Client: {{ client_ip }}
+PublicKey = {{ client_public_key }}
+{% if preshared_key %}PresharedKey = {{ preshared_key }}
+{% endif %}AllowedIPs = {{ client_ip }}/32"""
+
+
+class TestTemplateRegistry(unittest.TestCase):
+    """Test compile-once caching, built-in output and file overrides."""
+
+    def setUp(self):
+        self.templates_dir = Path(tempfile.mkdtemp(prefix="vpn_templates_test"))
+        self.bytecode_dir = tempfile.mkdtemp(prefix="vpn_bytecode_test")
+        self.registry = TemplateRegistry(self.templates_dir, self.bytecode_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.templates_dir, ignore_errors=True)
+        shutil.rmtree(self.bytecode_dir, ignore_errors=True)
+
+    def count_compiles(self):
+        environment = self.registry.environment
+        return mock.patch.object(environment, "compile", wraps=environment.compile)
+
+    def test_get_compiles_once(self):
+        with self.count_compiles() as compile:
+            first = self.registry.get(CLIENT_CONFIG_TEMPLATE)
+            second = self.registry.get(CLIENT_CONFIG_TEMPLATE)
+
+        self.assertIs(first, second)
+        self.assertEqual(compile.call_count, 1)
+
+    def test_from_string_caches_by_content(self):
+        source = "Hello {{ name }}"
+        with self.count_compiles() as compile:
+            first = self.registry.from_string(source)
+            again = self.registry.from_string("".join(["Hello ", "{{ name }}"]))
+            other = self.registry.from_string("Bye {{ name }}")
+
+        self.assertIs(first, again)
+        self.assertIsNot(first, other)
+        self.assertEqual(compile.call_count, 2)
+        self.assertEqual(first.render(name="Dr-Smith"), "Hello Dr-Smith")
+
+    def test_builtins_match_legacy_inline_templates(self):
+        client = {
+            "client_name": "Dr-Smith", "timestamp": "2026-03-01 09:00:00",
+            "client_private_key": "PRIV=", "client_ip": "10.0.0.2",
+            "dns_servers": ["1.1.1.1", "1.0.0.1"], "server_public_key": "SERVERPUB=",
+            "server_endpoint": "vpn.example.com", "server_port": 51820, "allowed_ips": "0.0.0.0/0",
+        }
+        peer = {"client_public_key": "PUB=", "client_ip": "10.0.0.2"}
+
+        for preshared_key in ("PSK=", None):
+            self.assertEqual(
+                self.registry.render(CLIENT_CONFIG_TEMPLATE, preshared_key=preshared_key, **client),
+                Template(LEGACY_CLIENT_CONFIG).render(preshared_key=preshared_key, **client))
+            self.assertEqual(
+                self.registry.render(SERVER_PEER_TEMPLATE, preshared_key=preshared_key, **peer),
+                Template(LEGACY_SERVER_PEER).render(preshared_key=preshared_key, **peer))
+
+    def test_file_templates_are_loaded_from_templates_dir(self):
+        (self.templates_dir / "welcome.template").write_text("Welcome, {{ client_name }}!")
+
+        self.assertEqual(self.registry.render("welcome.template", client_name="Front-Desk"),
+                         "Welcome, Front-Desk!")
+        self.assertIs(self.registry.get("welcome.template"), self.registry.get("welcome.template"))
+
+        # The default registry reads the repository's templates/ directory
+        repository = TemplateRegistry(bytecode_cache_dir=self.bytecode_dir)
+        for path in TEMPLATES_DIR.glob("*.template"):
+            self.assertEqual(repository.get(path.name).filename, str(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+# Columnar monitoring store tests
+
+import tempfile
+import unittest
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.core.tsdb import MetricsStore
+
+DAY = date(2026, 3, 1)
+BASE = datetime(2026, 3, 1).timestamp()
+
+
+def sample(minute, rx, inactive=False):
+    timestamp = BASE + minute * 60
+    peers = [{
+        "public_key": f"PEER{i}KEY0000000...",
+        "endpoint": f"198.51.100.{i}:51820" if i else None,
+        "allowed_ips": f"10.0.0.{i + 2}/32",
+        "latest_handshake": str(int(timestamp) - 30) if i else "0",
+        "rx_bytes": value,
+        "tx_bytes": value // 2,
+        "connected": bool(i),
+    } for i, value in enumerate(rx)]
+    wg0 = {"status": "inactive", "error": "Interface not found"} if inactive else {
+        "status": "active", "peers": peers, "total_rx": sum(rx), "total_tx": sum(rx) // 2}
+    return {
+        "timestamp": datetime.fromtimestamp(timestamp).isoformat(),
+        "interfaces": {"wg0": wg0},
+        "system": {"load_average": 0.25, "memory_usage_percent": 40.0},
+    }
+
+
+class TestMetricsStore(unittest.TestCase):
+    """Test segment round trips and torn-write repair."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.samples = [
+            sample(0, [100, 1000]),
+            sample(5, [50, 1000 + 2 ** 33]),  # counter reset, delta beyond int32
+            sample(10, [80, 1000 + 2 ** 33]),
+            sample(15, [], inactive=True),
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        store = MetricsStore(self.root / "tsdb")
+        for metrics in self.samples:
+            store.append(metrics)
+        store.close()
+
+        segment = store.open_day(DAY)
+        self.assertEqual(segment.samples, 4)
+        self.assertEqual((segment.timestamps - BASE).tolist(), [0, 300, 600, 900])
+        self.assertEqual(segment.rx_bytes.tolist(), [100, 1000, 50, 1000 + 2 ** 33, 80, 1000 + 2 ** 33])
+        self.assertEqual(segment.latest_handshake.tolist()[:2], [0, BASE - 30])
+        self.assertEqual(segment.iface_status.tolist(), [True, True, True, False])
+        self.assertEqual(segment.endpoints[1], "198.51.100.1:51820")
+
+    def test_torn_write_is_truncated(self):
+        store = MetricsStore(self.root / "tsdb")
+        for metrics in self.samples[:2]:
+            store.append(metrics)
+        store.close()
+
+        # A crash after the row columns but before the sample columns
+        path = store.segment_path(DAY)
+        with open(path / "peer_id", "ab") as f:
+            f.write(b"\x01\x00\x00\x00\x02")
+        with open(path / "ts_delta", "ab") as f:
+            f.write(b"\x05\x00")
+
+        store = MetricsStore(self.root / "tsdb")
+        store.append(self.samples[2])
+        store.close()
+        segment = store.open_day(DAY)
+        self.assertEqual(segment.samples, 3)
+        self.assertEqual(segment.rx_bytes[-2:].tolist(), [80, 1000 + 2 ** 33])
+
+
+if __name__ == "__main__":
+    unittest.main()
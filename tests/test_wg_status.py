@@ -0,0 +1,149 @@
+# WireGuard status poller tests
+
+import subprocess
+import unittest
+import sys
+from pathlib import Path
+from types import MappingProxyType
+from unittest import mock
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from src.core.wg_status import (
+    NetlinkSource, WireGuardPoller, WireGuardSnapshot, diff_snapshots, parse_wg_dump,
+)
+
+DUMP = (
+    "wg0\tPRIVATE=\tSERVERPUB=\t51820\toff\n"
+    "wg0\tPEER1=\t(none)\t198.51.100.7:41000\t10.0.0.2/32\t1700000000\t1024\t2048\t25\n"
+    "wg0\tPEER2=\tPSK=\t(none)\t10.0.0.3/32,fd00::3/128\t0\t0\t0\toff\n"
+    "wg1\tPRIVATE1=\tSITEPUB=\t51821\t0x1234\n"
+)
+
+
+class FakeNLA(dict):
+    """Stands in for a decoded pyroute2 message: NLAs via get_attr(), fields via get()."""
+
+    def __init__(self, attrs, **fields):
+        super().__init__(fields)
+        self.attrs = attrs
+
+    def get_attr(self, name):
+        return self.attrs.get(name)
+
+
+def allowed_ip(hex_addr, mask, **fields):
+    return FakeNLA({"WGALLOWEDIP_A_IPADDR": hex_addr, "WGALLOWEDIP_A_CIDR_MASK": mask}, **fields)
+
+
+class TestWireGuardStatus(unittest.TestCase):
+    """Test dump parsing and snapshot publication."""
+
+    def test_parse_all_dump(self):
+        interfaces = parse_wg_dump(DUMP)
+
+        self.assertEqual(sorted(interfaces), ["wg0", "wg1"])
+        self.assertEqual(interfaces["wg1"].fwmark, "0x1234")
+        self.assertEqual(interfaces["wg1"].peers, ())
+
+        first, second = interfaces["wg0"].peers
+        self.assertEqual(first.endpoint, "198.51.100.7:41000")
+        self.assertEqual((first.rx_bytes, first.tx_bytes, first.persistent_keepalive), (1024, 2048, 25))
+        self.assertTrue(first.is_connected(now=1700000060))
+        self.assertEqual(second.allowed_ips, ("10.0.0.3/32", "fd00::3/128"))
+        self.assertIsNone(second.endpoint)
+        self.assertFalse(second.is_connected())
+
+    def test_snapshots_are_sequenced_and_immutable(self):
+        outputs = iter([DUMP, subprocess.CalledProcessError(1, "wg")])
+
+        def runner():
+            result = next(outputs)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        poller = WireGuardPoller(runner=runner)
+        first = poller.poll_once()
+        second = poller.poll_once()
+
+        self.assertEqual((first.seq, second.seq), (1, 2))
+        self.assertEqual(len(first.peers()), 2)
+        self.assertFalse(second.running)
+        self.assertIsNotNone(second.error)
+        self.assertIs(poller.wait_for_update(1, timeout=0), second)
+        with self.assertRaises(TypeError):
+            first.interfaces["wg2"] = None
+
+    def test_version_only_moves_when_reported_state_changes(self):
+        poller = WireGuardPoller(runner=lambda: DUMP)
+        # PEER1 handshook at 1700000000 and goes stale at the third poll
+        with mock.patch("src.core.wg_status.time.time", side_effect=[1700000010, 1700000020, 1700000200]):
+            first, second, third = poller.poll_once(), poller.poll_once(), poller.poll_once()
+
+        self.assertEqual([s.seq for s in (first, second, third)], [1, 2, 3])
+        self.assertEqual((second.version, second.changed_at), (1, 1700000010))
+        self.assertEqual((third.version, third.changed_at), (3, 1700000200))
+
+    def test_diff_reports_only_changed_fields(self):
+        later = DUMP.replace("1700000000\t1024\t2048", "1700000100\t1524\t2048") \
+                    .replace("wg0\tPEER2=\tPSK=\t(none)\t10.0.0.3/32,fd00::3/128\t0\t0\t0\toff\n", "")
+        dumps = iter([DUMP, later])
+        poller = WireGuardPoller(runner=lambda: next(dumps))
+
+        changes = diff_snapshots(poller.poll_once(), poller.poll_once(), now=1700000250)
+
+        self.assertEqual(changes["updated"], {"wg0:PEER1=": {
+            "latest_handshake": 1700000100, "rx_delta": 500, "connected": True,
+        }})
+        self.assertEqual(changes["removed"], ["wg0:PEER2="])
+        self.assertEqual(changes["added"], {})
+
+    def test_diff_reports_handshake_ageing_out(self):
+        interfaces = MappingProxyType(parse_wg_dump(DUMP.replace("1700000000", "1000")))
+        old = WireGuardSnapshot(1, 1060, interfaces)
+        new = WireGuardSnapshot(2, 1181, interfaces)
+
+        changes = diff_snapshots(old, new)
+
+        self.assertEqual(changes["updated"], {"wg0:PEER1=": {"connected": False}})
+        self.assertEqual(diff_snapshots(new, WireGuardSnapshot(3, 1190, interfaces))["updated"], {})
+
+
+class TestNetlinkSource(unittest.TestCase):
+    """Test decoding of canned WG_CMD_GET_DEVICE messages."""
+
+    def test_messages_decode_like_the_dump(self):
+        # Peers of large devices arrive split over several messages
+        messages = [
+            FakeNLA({
+                "WGDEVICE_A_PUBLIC_KEY": b"SERVERPUB=",
+                "WGDEVICE_A_LISTEN_PORT": 51820,
+                "WGDEVICE_A_PEERS": [FakeNLA({
+                    "WGPEER_A_PUBLIC_KEY": b"PEER1=",
+                    "WGPEER_A_ENDPOINT": {"addr": "198.51.100.7", "port": 41000},
+                    "WGPEER_A_ALLOWEDIPS": [allowed_ip("0a:00:00:02", 32)],
+                    "WGPEER_A_LAST_HANDSHAKE_TIME": {"tv_sec": 1700000000, "tv_nsec": 0},
+                    "WGPEER_A_RX_BYTES": 1024,
+                    "WGPEER_A_TX_BYTES": 2048,
+                    "WGPEER_A_PERSISTENT_KEEPALIVE_INTERVAL": 25,
+                })],
+            }),
+            FakeNLA({"WGDEVICE_A_PEERS": [FakeNLA({
+                "WGPEER_A_PUBLIC_KEY": b"PEER2=",
+                "WGPEER_A_ENDPOINT": {"family": 0},
+                "WGPEER_A_ALLOWEDIPS": [
+                    allowed_ip("0a:00:00:03", 32, addr="10.0.0.3"),
+                    allowed_ip("fd:00" + ":00" * 13 + ":03", 128),
+                ],
+                "WGPEER_A_LAST_HANDSHAKE_TIME": {"tv_sec": 0, "tv_nsec": 0},
+                "WGPEER_A_PERSISTENT_KEEPALIVE_INTERVAL": 0,
+            })]}),
+        ]
+
+        self.assertEqual(NetlinkSource._interface("wg0", messages), parse_wg_dump(DUMP)["wg0"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Dashboard Load Test
+
+Starts `vpn.py dashboard` under each available server and reports
+requests/sec and latency percentiles for the JSON endpoints, using
+keep-alive connections from a pool of client threads.
+"""
+
+import http.client
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import click
+
+REPO_ROOT = Path(__file__).parent.parent.parent
+
+# Add repository root to path for imports
+sys.path.insert(0, str(REPO_ROOT))
+
+from src.web.serving import GUNICORN_AVAILABLE, WAITRESS_AVAILABLE
+
+PATHS = ("/api/clients", "/api/server/status")
+
+
+def make_keys_dir(clients: int) -> Path:
+    keys_dir = Path(tempfile.mkdtemp(prefix="vpn_bench_dashboard"))
+    (keys_dir / "server_public.key").write_text("HIgo9xNzJMWLKASShiTqIybxZ0U3wGLiUeJ1PKf8ykw=\n")
+    for i in range(clients):
+        client_dir = keys_dir / "clients" / f"client-{i:05d}"
+        client_dir.mkdir(parents=True)
+        (client_dir / "public.key").write_text(f"client-{i:05d}-PUB=\n")
+        (client_dir / f"client-{i:05d}.conf").write_text("[Interface]\n")
+    return keys_dir
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_listening(port: int, proc: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise click.ClickException(f"dashboard exited with code {proc.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise click.ClickException("dashboard did not start listening")
+
+
+def load(port: int, path: str, connections: int, duration: float):
+    """Hammer one path; return (requests/sec, sorted latencies in ms)."""
+    latencies = []
+    errors = []
+    stop_at = time.monotonic() + duration
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        local = []
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(e)
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+                continue
+            local.append((time.perf_counter() - start) * 1e3)
+        conn.close()
+        latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(connections)]
+    begin = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - begin
+
+    if errors:
+        click.echo(f"   ⚠️  {len(errors)} failed requests on {path}")
+    return len(latencies) / elapsed, sorted(latencies)
+
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+@click.command()
+@click.option('--clients', default=1000, help='Client directories to create (default: 1000)')
+@click.option('--connections', default=16, help='Concurrent keep-alive connections (default: 16)')
+@click.option('--duration', default=5.0, help='Seconds per endpoint (default: 5)')
+@click.option('--workers', default=2, help='gunicorn worker processes (default: 2)')
+@click.option('--threads', default=8, help='Request threads per process (default: 8)')
+def main(clients, connections, duration, workers, threads):
+    """Report requests/sec and p99 latency per server and endpoint."""
+    modes = [("dev", [])]
+    if WAITRESS_AVAILABLE:
+        modes.append(("waitress", ["--threads", str(threads)]))
+    if GUNICORN_AVAILABLE:
+        modes.append(("gunicorn", ["--workers", str(workers), "--threads", str(threads)]))
+
+    keys_dir = make_keys_dir(clients)
+    click.echo(f"📊 {clients} clients, {connections} connections, {duration:.0f}s per endpoint")
+    try:
+        for server_name, extra in modes:
+            port = free_port()
+            proc = subprocess.Popen(
+                [sys.executable, str(REPO_ROOT / "vpn.py"), "dashboard",
+                 "--port", str(port), "--keys-dir", str(keys_dir),
+                 "--server", server_name, *extra],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                wait_until_listening(port, proc)
+                for path in PATHS:
+                    rps, latencies = load(port, path, connections, duration)
+                    click.echo(f"   {server_name:<8} {path:<20} {rps:>8.0f} req/s  "
+                               f"p50 {percentile(latencies, 0.50):>6.1f} ms  "
+                               f"p99 {percentile(latencies, 0.99):>6.1f} ms")
+            finally:
+                proc.terminate()
+                proc.wait(timeout=60)
+    finally:
+        shutil.rmtree(keys_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
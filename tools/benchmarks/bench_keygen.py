@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Key Generation Benchmark
+
+Measures WireGuard key pairs per second for each available key backend.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import click
+
+# Add repository root to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.keys import KEY_BACKENDS, check_wireguard_installation
+
+
+def bench_backend(backend, count: int) -> dict:
+    """Time `count` key pair + preshared key generations."""
+    start = time.perf_counter()
+    for _ in range(count):
+        backend.generate_key_pair()
+        backend.generate_preshared_key()
+    elapsed = time.perf_counter() - start
+    return {
+        "backend": backend.name,
+        "count": count,
+        "seconds": elapsed,
+        "keys_per_sec": count / elapsed if elapsed else float("inf"),
+    }
+
+
+@click.command()
+@click.option('--count', default=300, help='Key pairs to generate per backend (default: 300)')
+def main(count):
+    """Compare in-process and `wg` subprocess key generation."""
+    click.echo(f"🔐 Generating {count} key pairs + PSKs per backend")
+
+    for name, backend_cls in KEY_BACKENDS.items():
+        if name == "wg" and not check_wireguard_installation():
+            click.echo(f"   {name:<14} skipped (wg tools not installed)")
+            continue
+        result = bench_backend(backend_cls(), count)
+        click.echo(f"   {name:<14} {result['keys_per_sec']:>10.1f} keys/sec "
+                   f"({result['seconds']:.3f}s total)")
+
+
+if __name__ == '__main__':
+    main()
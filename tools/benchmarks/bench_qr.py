@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+QR Rendering Benchmark
+
+Compares per-code cost of qrcode's PIL image factory against the
+vectorized NumPy PNG and SVG renderers.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import click
+
+# Add repository root to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.keys import CryptographyKeyBackend
+from src.core.qr_render import NUMPY_AVAILABLE, QR_FORMATS, render_qr
+
+CONFIG = """[Interface]
+# client-{index} - Generated on 2025-01-01 00:00:00
+PrivateKey = {private_key}
+Address = 10.0.{high}.{low}/32
+DNS = 1.1.1.1, 8.8.8.8
+
+[Peer]
+# Server
+PublicKey = HIgo9xNzJMWLKASShiTqIybxZ0U3wGLiUeJ1PKf8ykw=
+Endpoint = 203.0.113.10:51820
+AllowedIPs = 0.0.0.0/0
+PersistentKeepalive = 25"""
+
+
+def per_code_ms(qr_format: str, configs) -> float:
+    start = time.perf_counter()
+    for config in configs:
+        render_qr(config, qr_format)
+    return (time.perf_counter() - start) / len(configs) * 1e3
+
+
+@click.command()
+@click.option('--count', default=1000, help='QR codes per renderer (default: 1000)')
+def main(count):
+    """Report milliseconds per QR code for each renderer."""
+    backend = CryptographyKeyBackend()
+    configs = [
+        CONFIG.format(index=i, private_key=backend.generate_key_pair()[0],
+                      high=(i + 2) // 256, low=(i + 2) % 256)
+        for i in range(count)
+    ]
+
+    formats = QR_FORMATS if NUMPY_AVAILABLE else ("pil",)
+    results = {qr_format: per_code_ms(qr_format, configs) for qr_format in formats}
+
+    click.echo(f"🔳 Rendering {count} distinct client QR codes")
+    for qr_format, ms in results.items():
+        speedup = results["pil"] / ms
+        click.echo(f"   {qr_format:<4} {ms:>8.2f} ms/code  {speedup:>5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
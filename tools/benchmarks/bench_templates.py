@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Template Rendering Benchmark
+
+Compares per-render cost of compiling a jinja2.Template on every call
+against rendering through the cached TemplateRegistry.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import click
+from jinja2 import Template
+
+# Add repository root to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.templates import BUILTIN_TEMPLATES, CLIENT_CONFIG_TEMPLATE, TemplateRegistry
+
+CONTEXT = {
+    "client_name": "Dr-Smith-Laptop",
+    "client_private_key": "yAnz5TF+lXXJte14tji3zlMNq+hd2rYUIgJBgB3fBmk=",
+    "client_ip": "10.0.0.2",
+    "dns_servers": ["1.1.1.1", "8.8.8.8"],
+    "server_public_key": "HIgo9xNzJMWLKASShiTqIybxZ0U3wGLiUeJ1PKf8ykw=",
+    "preshared_key": None,
+    "server_endpoint": "203.0.113.10",
+    "server_port": 51820,
+    "allowed_ips": "0.0.0.0/0",
+    "timestamp": "2025-01-01 00:00:00",
+}
+
+
+def per_render_us(render, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        render()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+@click.command()
+@click.option('--count', default=2000, help='Renders per strategy (default: 2000)')
+def main(count):
+    """Report microseconds per client config render, before and after."""
+    source = BUILTIN_TEMPLATES[CLIENT_CONFIG_TEMPLATE]
+    registry = TemplateRegistry()
+
+    before = per_render_us(lambda: Template(source).render(**CONTEXT), count)
+    after = per_render_us(lambda: registry.render(CLIENT_CONFIG_TEMPLATE, **CONTEXT), count)
+
+    click.echo(f"📄 Rendering the client config template {count} times")
+    click.echo(f"   compile per call   {before:>9.1f} µs/render")
+    click.echo(f"   cached registry    {after:>9.1f} µs/render")
+    click.echo(f"   speedup            {before / after:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -19,7 +19,11 @@ from src.cli.multi_site import multi_site
 from src.cli.monitoring import monitor
 from src.cli.compliance import compliance
 from src.cli.backup import backup
+from src.cli.export import export
+from src.cli.server import server
+from src.cli.keystore import keys
 from src.web.app import main as dashboard_main
+from src.web.serving import serving_options
 from src.utils.testing import main as testing_main
 
 # Import screenshot CLI integration
@@ -60,6 +64,9 @@ cli.add_command(multi_site, name="multi-site")
 cli.add_command(monitor)
 cli.add_command(compliance)
 cli.add_command(backup)
+cli.add_command(export)
+cli.add_command(server)
+cli.add_command(keys)
 
 # Add screenshot commands if available
 if SCREENSHOT_AVAILABLE:
@@ -72,19 +79,33 @@ if SCREENSHOT_AVAILABLE:
 @click.option('--debug', is_flag=True, help='Enable debug mode')
 @click.option('--keys-dir', default='./keys', help='Directory containing keys')
 @click.option('--server-endpoint', help='Server public IP/endpoint')
-def dashboard(host, port, debug, keys_dir, server_endpoint):
+@click.option('--poll-interval', default=2.0, help='Seconds between WireGuard status polls')
+@click.option('--profile-slow-ms', type=float, help='Write folded-stack profiles for requests slower than this')
+@click.option('--fleet-file', type=click.Path(exists=True, dir_okay=False), help='JSON list of servers for the fleet view')
+@click.option('--fleet-interval', default=30.0, help='Seconds between fleet refreshes')
+@serving_options
+def dashboard(host, port, debug, keys_dir, server_endpoint, poll_interval, profile_slow_ms,
+              fleet_file, fleet_interval, server_name, workers, threads, streams, keepalive,
+              graceful_timeout):
     """Launch the web management dashboard."""
     from src.web.app import VPNDashboard
+    from src.web.serving import resolve_server, serve
     
-    dashboard_app = VPNDashboard(keys_dir=keys_dir, server_endpoint=server_endpoint)
+    server_name = resolve_server(server_name, workers, debug)
     
-    click.echo(f"🌐 Starting VPN Dashboard on http://{host}:{port}")
+    click.echo(f"🌐 Starting VPN Dashboard on http://{host}:{port} ({server_name})")
     click.echo(f"📁 Keys directory: {keys_dir}")
     
     if debug:
         click.echo("🐛 Debug mode enabled")
     
-    dashboard_app.run(host=host, port=port, debug=debug)
+    serve(lambda: VPNDashboard(keys_dir=keys_dir, server_endpoint=server_endpoint,
+                               poll_interval=poll_interval, profile_slow_ms=profile_slow_ms,
+                               fleet_file=fleet_file, fleet_interval=fleet_interval,
+                               max_streams=streams),
+          host=host, port=port, server_name=server_name, workers=workers,
+          threads=threads, streams=streams, keepalive=keepalive, graceful_timeout=graceful_timeout,
+          debug=debug)
 
 
 @cli.command("test")
@@ -104,6 +125,9 @@ def info():
     click.echo("📋 Core Commands:")
     click.echo("  • keygen      - Generate WireGuard keys")
     click.echo("  • client      - Create client configurations") 
+    click.echo("  • export      - Download client packages as a ZIP")
+    click.echo("  • server      - Sync wg0.conf and live peers (no restart)")
+    click.echo("  • keys        - Unlock or re-encrypt encrypted private keys")
     click.echo("  • multi-site  - Multi-location VPN deployments")
     click.echo("  • dashboard   - Launch web management UI")
     click.echo("  • test        - Run diagnostics")